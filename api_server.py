@@ -10,15 +10,18 @@ from typing import Any, Optional
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, HttpUrl
 import uvicorn
 
 from crawler.dynamic_crawler import DynamicCrawler, crawl_custom_url, DynamicCrawlResult
+from crawler.judge import build_judge_payload
 from crawler.pipeline import run_once
 from crawler.runtime import load_settings
 from crawler.proxy_picker import pick_proxies
+from crawler.storage import close_mysql_pools, get_mysql_pool, get_redis_client
+from crawler.warmer import ProxyWarmer
 from tools import check_pool, diagnose_sources, diagnose_pipeline, get_proxy
 
 
@@ -101,6 +104,8 @@ class AppState:
     def __init__(self):
         self.settings = None
         self.executor = ThreadPoolExecutor(max_workers=4)
+        self.redis_client = None
+        self.warmer = None
 
 
 app_state = AppState()
@@ -118,11 +123,32 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"✗ 配置加载失败: {e}")
         app_state.settings = None
+
+    # 预热 MySQL 连接池，首个取代理请求无需再建连；失败时由请求按需重试
+    if (
+        app_state.settings is not None
+        and app_state.settings.storage_backend == "mysql"
+        and app_state.settings.mysql_pool_enabled
+    ):
+        try:
+            get_mysql_pool(app_state.settings)
+        except Exception as e:
+            print(f"✗ MySQL 连接池初始化失败: {e}")
+
+    # 启动预验证热池 warmer，取代理请求共用同一个 Redis 客户端
+    if app_state.settings is not None and app_state.settings.warmer_enabled:
+        app_state.redis_client = get_redis_client(app_state.settings)
+        app_state.warmer = ProxyWarmer(app_state.settings, app_state.redis_client).start()
+        print("✓ 预验证热池 warmer 已启动")
     
     yield
     
     # 关闭时清理资源
+    if app_state.warmer is not None:
+        app_state.warmer.close()
+        app_state.warmer = None
     app_state.executor.shutdown(wait=True)
+    close_mysql_pools()
     print("✓ 资源清理完成")
 
 
@@ -166,6 +192,13 @@ async def health_check():
     return HealthResponse()
 
 
+@app.get("/judge", tags=["系统"])
+async def judge(request: Request):
+    """代理验证 Judge：回显客户端 IP 与转发相关请求头"""
+    client_ip = request.client.host if request.client else ""
+    return build_judge_payload(client_ip, request.headers)
+
+
 @app.post("/api/v1/crawl-custom", response_model=CrawlCustomResponse, tags=["爬虫"])
 async def crawl_custom(request: CrawlCustomRequest):
     """
@@ -308,6 +341,7 @@ async def get_proxies(
                 countries=countries,
                 count=count,
                 require_check=True,
+                redis_client=app_state.redis_client,
             )
         
         result = await _run_in_thread(_get)
@@ -3,12 +3,14 @@ from __future__ import annotations
 import argparse
 import csv
 import importlib.util
+import json
 from pathlib import Path
 
 from crawler.dynamic_crawler import DynamicCrawler, crawl_custom_url
+from crawler.judge import serve_judge
 from crawler.pipeline import run_once
 from crawler.runtime import load_settings
-from tools import check_docs_links, check_pool, diagnose_html, diagnose_pipeline, diagnose_sources, get_proxy, redis_ping
+from tools import archive_pool, benchmark, check_docs_links, check_pool, diagnose_html, diagnose_pipeline, diagnose_sources, get_proxy, probe_proxy, redis_ping, sweep_pool
 import verify_deploy
 
 
@@ -98,6 +100,12 @@ def build_parser() -> argparse.ArgumentParser:
         default=1,
         help="In quick-test mode, process at most N records from the first successful source",
     )
+    run_parser.add_argument(
+        "--engine",
+        choices=["thread", "asyncio"],
+        default=None,
+        help="Validation engine (default: from .env VALIDATE_ENGINE or thread)",
+    )
     crawl_custom_parser = subparsers.add_parser("crawl-custom", help="Crawl one custom URL")
     crawl_custom_parser.add_argument("url", nargs="?", help="Target URL to crawl")
     crawl_custom_parser.add_argument("--max-pages", type=int, default=None, help="Maximum pages to crawl")
@@ -107,12 +115,22 @@ def build_parser() -> argparse.ArgumentParser:
     crawl_custom_parser.add_argument("--verbose", action="store_true", help="Verbose output")
     crawl_custom_parser.add_argument("--output-json", type=str, default=None, help="Export crawl result to JSON file")
     crawl_custom_parser.add_argument("--output-csv", type=str, default=None, help="Export crawl result to CSV file")
-    subparsers.add_parser("check", help="Run TCP check batch")
+    check_parser = subparsers.add_parser("check", help="Run TCP check batch")
+    check_pool.add_arguments(check_parser)
+
+    archive_parser = subparsers.add_parser("archive", help="Move long soft-deleted proxies to the archive table")
+    archive_pool.add_arguments(archive_parser)
+
+    sweep_parser = subparsers.add_parser("sweep", help="Evict stale members from the Redis alive pool")
+    sweep_pool.add_arguments(sweep_parser)
 
     # 复用 get_proxy 的参数定义，保证一致性
     get_parser = subparsers.add_parser("get-proxy", help="Pick proxies from the pool")
     get_proxy.add_arguments(get_parser)
 
+    probe_parser = subparsers.add_parser("probe", help="Detect proxy protocols via native handshakes")
+    probe_proxy.add_arguments(probe_parser)
+
     subparsers.add_parser("diagnose-sources", help="Check raw source availability")
     subparsers.add_parser("diagnose-pipeline", help="Fetch and parse source data")
     subparsers.add_parser("diagnose-html", help="Check HTML parsing hints")
@@ -134,6 +152,13 @@ def build_parser() -> argparse.ArgumentParser:
         help="Maximum broken links to print (default: 100)",
     )
 
+    benchmark_parser = subparsers.add_parser("benchmark", help="Run offline throughput benchmark against fake proxies")
+    benchmark.add_arguments(benchmark_parser)
+
+    judge_parser = subparsers.add_parser("judge", help="Start standalone proxy judge server")
+    judge_parser.add_argument("--host", default="0.0.0.0", help="Judge host (default: 0.0.0.0)")
+    judge_parser.add_argument("--port", type=int, default=8899, help="Judge port (default: 8899)")
+
     # API 服务器
     server_parser = subparsers.add_parser("server", help="Start REST API server")
     server_parser.add_argument(
@@ -158,6 +183,8 @@ def main(argv: list[str] | None = None) -> int:
     if args.command == "run":
         # 运行完整抓取流程
         settings = load_settings(args.env)
+        if args.engine:
+            settings.validate_engine = args.engine
         run_once(
             settings,
             quick_test=args.quick_test,
@@ -223,14 +250,27 @@ def main(argv: list[str] | None = None) -> int:
 
     if args.command == "check":
         # 只执行批量 TCP 检测
-        settings = load_settings(args.env)
+        settings = check_pool.apply_shard(load_settings(args.env), args.shard)
+        if args.reconcile:
+            # 按 MySQL 对账重建 Redis 存活池
+            print(json.dumps(check_pool.reconcile_redis_pool(settings, args.chunk_size), ensure_ascii=False))
+            return 0
         check_pool.run_check_batch(settings)
         return 0
 
+    if args.command == "archive":
+        return archive_pool.run_from_args(args, env_path=args.env)
+
+    if args.command == "sweep":
+        return sweep_pool.run_from_args(args, env_path=args.env)
+
     if args.command == "get-proxy":
         # 代理挑选结果以 JSON 输出
         return get_proxy.run_from_args(args, env_path=args.env)
 
+    if args.command == "probe":
+        return probe_proxy.run_from_args(args, env_path=args.env)
+
     if args.command == "diagnose-sources":
         diagnose_sources.run()
         return 0
@@ -263,6 +303,14 @@ def main(argv: list[str] | None = None) -> int:
             ]
         )
 
+    if args.command == "benchmark":
+        return benchmark.run_from_args(args, env_path=args.env)
+
+    if args.command == "judge":
+        # 独立运行 Judge，建议部署在验证节点附近
+        serve_judge(host=args.host, port=args.port)
+        return 0
+
     if args.command == "server":
         # 启动 API 服务器
         try:
@@ -0,0 +1,214 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from crawler.http_validator import HTTPValidator
+from crawler.protocol_probe import async_probe_handshake, build_connect_request, probe_target
+
+
+ValidationOutcome = Tuple[Dict[str, object], bool, int]
+
+_HTTP_PROTOCOLS = {"http", "https"}
+_READ_LIMIT = 4096
+
+
+def _status_code(status_line: bytes) -> Optional[int]:
+    parts = status_line.split()
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+        return None
+    try:
+        return int(parts[1])
+    except ValueError:
+        return None
+
+
+async def _close_writer(writer: asyncio.StreamWriter) -> None:
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+
+
+async def async_tcp_check(host: str, port: int, timeout: float) -> Tuple[bool, int]:
+    # 异步 TCP 探测，语义与 validator.tcp_check 一致
+    start = time.time()
+    try:
+        _reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False, 0
+    latency_ms = int((time.time() - start) * 1000)
+    await _close_writer(writer)
+    return True, latency_ms
+
+
+async def async_http_check(
+    ip: str,
+    port: int,
+    timeout: float,
+    target_url: Optional[str] = None,
+) -> Tuple[bool, bool, int]:
+    # 通过 HTTP 代理请求验证目标：https 目标走 CONNECT 隧道，http 目标直接 GET 绝对地址
+    # 返回 (协议是否验证成功, 是否可用, 延迟毫秒)
+    url = target_url or HTTPValidator.TEST_URL
+    host, target_port = probe_target(url)
+    is_tunnel = urlsplit(url).scheme == "https"
+    if is_tunnel:
+        request = build_connect_request(host, target_port)
+    else:
+        request = (
+            f"GET {url} HTTP/1.1\r\n"
+            f"Host: {host}\r\nConnection: close\r\n\r\n"
+        ).encode("ascii")
+
+    start = time.time()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout=timeout)
+        writer.write(request)
+        await asyncio.wait_for(writer.drain(), timeout=timeout)
+        status_line = await asyncio.wait_for(reader.readline(), timeout=timeout)
+    except (OSError, asyncio.TimeoutError, ValueError):
+        return False, False, int((time.time() - start) * 1000)
+    finally:
+        if writer is not None:
+            await _close_writer(writer)
+
+    elapsed_ms = int((time.time() - start) * 1000)
+    status_code = _status_code(status_line[:_READ_LIMIT])
+    if status_code is None:
+        return False, False, elapsed_ms
+    if is_tunnel:
+        return True, status_code == 200, elapsed_ms
+    return True, 200 <= status_code < 400, elapsed_ms
+
+
+async def async_check_record(
+    record: Dict[str, object],
+    timeout: float,
+    probe_mode: str = "http",
+    target_url: Optional[str] = None,
+) -> Tuple[bool, int]:
+    # http 模式与 pipeline._check_record 对齐：HTTP 验证不可判定时回退 TCP
+    # handshake 模式按声明协议完成握手，握手失败即视为不可用
+    # target_url 为空时使用 HTTPValidator.TEST_URL，可指向自建 Judge
+    ip = str(record["ip"])
+    port = int(record["port"])
+    protocol = str(record.get("protocol", "http")).lower()
+    url = target_url or HTTPValidator.TEST_URL
+    try:
+        if probe_mode == "handshake":
+            result = await async_probe_handshake(ip, port, protocol, timeout, probe_target(url))
+            return result.supported, result.latency_ms if result.supported else 0
+        if protocol in _HTTP_PROTOCOLS:
+            verified, reachable, latency_ms = await async_http_check(ip, port, timeout, url)
+            if verified:
+                return reachable, latency_ms
+        return await async_tcp_check(ip, port, timeout)
+    except Exception:
+        return False, 0
+
+
+_EXHAUSTED = object()
+
+
+async def _run_window(
+    records: Iterable[Dict[str, object]],
+    timeout: float,
+    concurrency: int,
+    probe_mode: str,
+    target_url: Optional[str],
+    emit,
+) -> None:
+    # 有界在途窗口：只在有空位时从迭代器取下一条记录
+    # 非列表输入（如边抓取边产出的生成器）在线程池中取值，等待上游时在途验证照常进行
+    window = max(1, int(concurrency))
+    iterator = iter(records)
+    blocking = not isinstance(records, (list, tuple))
+    loop = asyncio.get_running_loop()
+    pending: Dict[asyncio.Future, Dict[str, object]] = {}
+    feeder: Optional[asyncio.Future] = None
+    exhausted = False
+
+    def start(record: Dict[str, object]) -> None:
+        pending[asyncio.ensure_future(async_check_record(record, timeout, probe_mode, target_url))] = record
+
+    while pending or not exhausted:
+        if blocking:
+            if feeder is None and not exhausted and len(pending) < window:
+                feeder = loop.run_in_executor(None, next, iterator, _EXHAUSTED)
+        else:
+            while not exhausted and len(pending) < window:
+                record = next(iterator, _EXHAUSTED)
+                if record is _EXHAUSTED:
+                    exhausted = True
+                    break
+                start(record)
+
+        waiting = set(pending)
+        if feeder is not None:
+            waiting.add(feeder)
+        if not waiting:
+            break
+
+        done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+        if feeder is not None and feeder in done:
+            done.discard(feeder)
+            record, feeder = feeder.result(), None
+            if record is _EXHAUSTED:
+                exhausted = True
+            else:
+                start(record)
+        for task in done:
+            record = pending.pop(task)
+            try:
+                success, latency_ms = task.result()
+            except Exception:
+                success, latency_ms = False, 0
+            await emit((record, success, latency_ms))
+
+
+def validate_records(
+    records: Iterable[Dict[str, object]],
+    timeout: float,
+    concurrency: int,
+    probe_mode: str = "http",
+    target_url: Optional[str] = None,
+) -> Iterator[ValidationOutcome]:
+    """
+    在后台线程的事件循环中并发验证记录，按完成顺序产出 (record, success, latency_ms)。
+
+    结果队列有界，消费方（通常是入库逻辑）处理变慢时会反压验证循环。
+    records 可以是边抓取边产出的生成器：取值在线程池中进行，上游未就绪时已在途的验证不受影响。
+    """
+    results: "queue.Queue[object]" = queue.Queue(maxsize=max(1, int(concurrency)) * 2)
+    done_marker = object()
+    errors: list = []
+
+    async def emit(item: ValidationOutcome) -> None:
+        try:
+            results.put_nowait(item)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, results.put, item)
+
+    def worker() -> None:
+        try:
+            asyncio.run(_run_window(records, timeout, concurrency, probe_mode, target_url, emit))
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            results.put(done_marker)
+
+    thread = threading.Thread(target=worker, name="async-validator", daemon=True)
+    thread.start()
+    while True:
+        item = results.get()
+        if item is done_marker:
+            break
+        yield item
+    thread.join()
+    if errors:
+        raise errors[0]
@@ -14,21 +14,72 @@ class Settings:
     user_agent: str = "ip-pool-crawler/0.1"
     source_workers: int = 2
     validate_workers: int = 30
+    validate_engine: str = "thread"
+    async_validate_concurrency: int = 1000
+    tcp_scan_enabled: bool = False
+    tcp_scan_concurrency: int = 1000
+    validate_probe_mode: str = "http"
+    judge_url: str = ""
+    judge_real_ip: str = ""
+    validate_funnel_enabled: bool = False
+    funnel_prefilter: str = "tcp"
+    funnel_prefilter_timeout: float = 2.0
+    funnel_timeout_floor: float = 0.5
+    funnel_timeout_percentile: float = 0.95
+    validation_cache_backend: str = "off"
+    validation_cache_alive_ttl: int = 300
+    validation_cache_dead_ttl: int = 1800
+    write_behind_enabled: bool = False
+    write_behind_queue_size: int = 10000
+    write_behind_batch_size: int = 500
+    write_behind_flush_interval: float = 1.0
+    pick_validate_concurrency: int = 1
+    pick_hedge_delay: float = 0.0
+    pick_validate_pool_size: int = 32
+    warmer_enabled: bool = False
+    warmer_protocols: str = "http,https"
+    warmer_countries: str = ""
+    warmer_pool_size: int = 20
+    warmer_ttl: int = 60
+    warmer_interval: float = 5.0
     check_batch_size: int = 1000
+    check_shard_index: int = 0
+    check_shard_count: int = 1
     check_workers: int = 20
     check_retries: int = 3
     check_retry_delay: int = 3
+    check_flush_size: int = 500
+    check_flush_interval: float = 2.0
+    check_redis_sync: bool = True
     fail_window_hours: int = 24
     fail_threshold: int = 5
+    archive_enabled: bool = False
+    archive_after_hours: int = 168
+    archive_chunk_size: int = 1000
     mysql_host: str = "127.0.0.1"
     mysql_port: int = 3306
     mysql_user: str = "root"
     mysql_password: str = ""
     mysql_database: str = "ip_pool"
+    mysql_pool_enabled: bool = True
+    mysql_pool_min_size: int = 1
+    mysql_pool_max_size: int = 10
+    mysql_pool_timeout: float = 5.0
+    mysql_pool_ping_interval: float = 30.0
+    mysql_compact_keys: bool = False
+    storage_backend: str = "mysql"
+    sqlite_path: str = "./data/ip_pool.db"
+    sqlite_busy_timeout: float = 5.0
     redis_host: str = "127.0.0.1"
     redis_port: int = 6379
     redis_db: int = 0
     redis_password: str = ""
+    redis_write_batch_size: int = 500
+    redis_write_flush_interval: float = 1.0
+    redis_meta_enabled: bool = False
+    redis_index_enabled: bool = False
+    redis_pool_ttl: int = 0
+    redis_sweep_batch_size: int = 500
     
     # API 服务器配置
     api_host: str = "0.0.0.0"
@@ -81,21 +132,84 @@ class Settings:
         user_agent = os.getenv("USER_AGENT", cls.user_agent)
         source_workers = int(os.getenv("SOURCE_WORKERS", str(cls.source_workers)))
         validate_workers = int(os.getenv("VALIDATE_WORKERS", str(cls.validate_workers)))
+        validate_engine = os.getenv("VALIDATE_ENGINE", cls.validate_engine).strip().lower()
+        async_validate_concurrency = int(
+            os.getenv("ASYNC_VALIDATE_CONCURRENCY", str(cls.async_validate_concurrency))
+        )
+        tcp_scan_enabled = os.getenv("TCP_SCAN_ENABLED", "false").lower() == "true"
+        tcp_scan_concurrency = int(os.getenv("TCP_SCAN_CONCURRENCY", str(cls.tcp_scan_concurrency)))
+        validate_probe_mode = os.getenv("VALIDATE_PROBE_MODE", cls.validate_probe_mode).strip().lower()
+        judge_url = os.getenv("JUDGE_URL", cls.judge_url).strip()
+        judge_real_ip = os.getenv("JUDGE_REAL_IP", cls.judge_real_ip).strip()
+        validate_funnel_enabled = os.getenv("VALIDATE_FUNNEL_ENABLED", "false").lower() == "true"
+        funnel_prefilter = os.getenv("FUNNEL_PREFILTER", cls.funnel_prefilter).strip().lower()
+        funnel_prefilter_timeout = float(
+            os.getenv("FUNNEL_PREFILTER_TIMEOUT", str(cls.funnel_prefilter_timeout))
+        )
+        funnel_timeout_floor = float(os.getenv("FUNNEL_TIMEOUT_FLOOR", str(cls.funnel_timeout_floor)))
+        funnel_timeout_percentile = float(
+            os.getenv("FUNNEL_TIMEOUT_PERCENTILE", str(cls.funnel_timeout_percentile))
+        )
+        validation_cache_backend = os.getenv("VALIDATION_CACHE_BACKEND", cls.validation_cache_backend).strip().lower()
+        validation_cache_alive_ttl = int(
+            os.getenv("VALIDATION_CACHE_ALIVE_TTL", str(cls.validation_cache_alive_ttl))
+        )
+        validation_cache_dead_ttl = int(os.getenv("VALIDATION_CACHE_DEAD_TTL", str(cls.validation_cache_dead_ttl)))
+        write_behind_enabled = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+        write_behind_queue_size = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", str(cls.write_behind_queue_size)))
+        write_behind_batch_size = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", str(cls.write_behind_batch_size)))
+        write_behind_flush_interval = float(
+            os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", str(cls.write_behind_flush_interval))
+        )
+        pick_validate_concurrency = int(os.getenv("PICK_VALIDATE_CONCURRENCY", str(cls.pick_validate_concurrency)))
+        pick_hedge_delay = float(os.getenv("PICK_HEDGE_DELAY", str(cls.pick_hedge_delay)))
+        pick_validate_pool_size = int(os.getenv("PICK_VALIDATE_POOL_SIZE", str(cls.pick_validate_pool_size)))
+        warmer_enabled = os.getenv("WARMER_ENABLED", "false").lower() == "true"
+        warmer_protocols = os.getenv("WARMER_PROTOCOLS", cls.warmer_protocols)
+        warmer_countries = os.getenv("WARMER_COUNTRIES", cls.warmer_countries)
+        warmer_pool_size = int(os.getenv("WARMER_POOL_SIZE", str(cls.warmer_pool_size)))
+        warmer_ttl = int(os.getenv("WARMER_TTL", str(cls.warmer_ttl)))
+        warmer_interval = float(os.getenv("WARMER_INTERVAL", str(cls.warmer_interval)))
         check_batch_size = int(os.getenv("CHECK_BATCH_SIZE", str(cls.check_batch_size)))
+        check_shard_index = int(os.getenv("CHECK_SHARD_INDEX", str(cls.check_shard_index)))
+        check_shard_count = int(os.getenv("CHECK_SHARD_COUNT", str(cls.check_shard_count)))
         check_workers = int(os.getenv("CHECK_WORKERS", str(cls.check_workers)))
         check_retries = int(os.getenv("CHECK_RETRIES", str(cls.check_retries)))
         check_retry_delay = int(os.getenv("CHECK_RETRY_DELAY", str(cls.check_retry_delay)))
+        check_flush_size = int(os.getenv("CHECK_FLUSH_SIZE", str(cls.check_flush_size)))
+        check_flush_interval = float(os.getenv("CHECK_FLUSH_INTERVAL", str(cls.check_flush_interval)))
+        check_redis_sync = os.getenv("CHECK_REDIS_SYNC", "true").lower() == "true"
         fail_window_hours = int(os.getenv("FAIL_WINDOW_HOURS", str(cls.fail_window_hours)))
         fail_threshold = int(os.getenv("FAIL_THRESHOLD", str(cls.fail_threshold)))
+        archive_enabled = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+        archive_after_hours = int(os.getenv("ARCHIVE_AFTER_HOURS", str(cls.archive_after_hours)))
+        archive_chunk_size = int(os.getenv("ARCHIVE_CHUNK_SIZE", str(cls.archive_chunk_size)))
         mysql_host = os.getenv("MYSQL_HOST", cls.mysql_host)
         mysql_port = int(os.getenv("MYSQL_PORT", str(cls.mysql_port)))
         mysql_user = os.getenv("MYSQL_USER", cls.mysql_user)
         mysql_password = os.getenv("MYSQL_PASSWORD", cls.mysql_password)
         mysql_database = os.getenv("MYSQL_DATABASE", cls.mysql_database)
+        mysql_pool_enabled = os.getenv("MYSQL_POOL_ENABLED", "true").lower() == "true"
+        mysql_pool_min_size = int(os.getenv("MYSQL_POOL_MIN_SIZE", str(cls.mysql_pool_min_size)))
+        mysql_pool_max_size = int(os.getenv("MYSQL_POOL_MAX_SIZE", str(cls.mysql_pool_max_size)))
+        mysql_pool_timeout = float(os.getenv("MYSQL_POOL_TIMEOUT", str(cls.mysql_pool_timeout)))
+        mysql_pool_ping_interval = float(os.getenv("MYSQL_POOL_PING_INTERVAL", str(cls.mysql_pool_ping_interval)))
+        mysql_compact_keys = os.getenv("MYSQL_COMPACT_KEYS", "false").lower() == "true"
+        storage_backend = os.getenv("STORAGE_BACKEND", cls.storage_backend).strip().lower()
+        sqlite_path = os.getenv("SQLITE_PATH", cls.sqlite_path)
+        sqlite_busy_timeout = float(os.getenv("SQLITE_BUSY_TIMEOUT", str(cls.sqlite_busy_timeout)))
         redis_host = os.getenv("REDIS_HOST", cls.redis_host)
         redis_port = int(os.getenv("REDIS_PORT", str(cls.redis_port)))
         redis_db = int(os.getenv("REDIS_DB", str(cls.redis_db)))
         redis_password = os.getenv("REDIS_PASSWORD", cls.redis_password)
+        redis_write_batch_size = int(os.getenv("REDIS_WRITE_BATCH_SIZE", str(cls.redis_write_batch_size)))
+        redis_write_flush_interval = float(
+            os.getenv("REDIS_WRITE_FLUSH_INTERVAL", str(cls.redis_write_flush_interval))
+        )
+        redis_meta_enabled = os.getenv("REDIS_META_ENABLED", "false").lower() == "true"
+        redis_index_enabled = os.getenv("REDIS_INDEX_ENABLED", "false").lower() == "true"
+        redis_pool_ttl = int(os.getenv("REDIS_POOL_TTL", str(cls.redis_pool_ttl)))
+        redis_sweep_batch_size = int(os.getenv("REDIS_SWEEP_BATCH_SIZE", str(cls.redis_sweep_batch_size)))
         
         # API 服务器配置加载
         api_host = os.getenv("API_HOST", cls.api_host)
@@ -171,21 +285,72 @@ class Settings:
             user_agent=user_agent,
             source_workers=source_workers,
             validate_workers=validate_workers,
+            validate_engine=validate_engine,
+            async_validate_concurrency=async_validate_concurrency,
+            tcp_scan_enabled=tcp_scan_enabled,
+            tcp_scan_concurrency=tcp_scan_concurrency,
+            validate_probe_mode=validate_probe_mode,
+            judge_url=judge_url,
+            judge_real_ip=judge_real_ip,
+            validate_funnel_enabled=validate_funnel_enabled,
+            funnel_prefilter=funnel_prefilter,
+            funnel_prefilter_timeout=funnel_prefilter_timeout,
+            funnel_timeout_floor=funnel_timeout_floor,
+            funnel_timeout_percentile=funnel_timeout_percentile,
+            validation_cache_backend=validation_cache_backend,
+            validation_cache_alive_ttl=validation_cache_alive_ttl,
+            validation_cache_dead_ttl=validation_cache_dead_ttl,
+            write_behind_enabled=write_behind_enabled,
+            write_behind_queue_size=write_behind_queue_size,
+            write_behind_batch_size=write_behind_batch_size,
+            write_behind_flush_interval=write_behind_flush_interval,
+            pick_validate_concurrency=pick_validate_concurrency,
+            pick_hedge_delay=pick_hedge_delay,
+            pick_validate_pool_size=pick_validate_pool_size,
+            warmer_enabled=warmer_enabled,
+            warmer_protocols=warmer_protocols,
+            warmer_countries=warmer_countries,
+            warmer_pool_size=warmer_pool_size,
+            warmer_ttl=warmer_ttl,
+            warmer_interval=warmer_interval,
             check_batch_size=check_batch_size,
+            check_shard_index=check_shard_index,
+            check_shard_count=check_shard_count,
             check_workers=check_workers,
             check_retries=check_retries,
             check_retry_delay=check_retry_delay,
+            check_flush_size=check_flush_size,
+            check_flush_interval=check_flush_interval,
+            check_redis_sync=check_redis_sync,
             fail_window_hours=fail_window_hours,
             fail_threshold=fail_threshold,
+            archive_enabled=archive_enabled,
+            archive_after_hours=archive_after_hours,
+            archive_chunk_size=archive_chunk_size,
             mysql_host=mysql_host,
             mysql_port=mysql_port,
             mysql_user=mysql_user,
             mysql_password=mysql_password,
             mysql_database=mysql_database,
+            mysql_pool_enabled=mysql_pool_enabled,
+            mysql_pool_min_size=mysql_pool_min_size,
+            mysql_pool_max_size=mysql_pool_max_size,
+            mysql_pool_timeout=mysql_pool_timeout,
+            mysql_pool_ping_interval=mysql_pool_ping_interval,
+            mysql_compact_keys=mysql_compact_keys,
+            storage_backend=storage_backend,
+            sqlite_path=sqlite_path,
+            sqlite_busy_timeout=sqlite_busy_timeout,
             redis_host=redis_host,
             redis_port=redis_port,
             redis_db=redis_db,
             redis_password=redis_password,
+            redis_write_batch_size=redis_write_batch_size,
+            redis_write_flush_interval=redis_write_flush_interval,
+            redis_meta_enabled=redis_meta_enabled,
+            redis_index_enabled=redis_index_enabled,
+            redis_pool_ttl=redis_pool_ttl,
+            redis_sweep_batch_size=redis_sweep_batch_size,
             api_host=api_host,
             api_port=api_port,
             log_level=log_level,
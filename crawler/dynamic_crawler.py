@@ -21,7 +21,7 @@ from crawler.storage import (
     insert_page_log,
     insert_review_queue_item,
     set_settings_for_retry,
-    upsert_proxy,
+    upsert_proxies,
     upsert_source,
 )
 from crawler.universal_parser import UniversalParser
@@ -641,6 +641,7 @@ class DynamicCrawler:
 
             stored = 0
             if conn is not None and source_id is not None and valid_proxies:
+                pending = []
                 for proxy in valid_proxies:
                     if session_id is not None and check_duplicate(
                         conn,
@@ -650,16 +651,14 @@ class DynamicCrawler:
                         session_id=session_id,
                     ):
                         continue
-                    upsert_proxy(
-                        conn,
-                        str(proxy["ip"]),
-                        int(proxy["port"]),
-                        str(proxy.get("protocol") or "http"),
-                        None,
-                        None,
-                        source_id,
+                    pending.append(
+                        {
+                            "ip": str(proxy["ip"]),
+                            "port": int(proxy["port"]),
+                            "protocol": str(proxy.get("protocol") or "http"),
+                        }
                     )
-                    stored += 1
+                stored = upsert_proxies(conn, pending, source_id, rehydrate=self.settings.archive_enabled)
 
             if conn is not None and session_id is not None:
                 duration_seconds = int(max(0, time.time() - started))
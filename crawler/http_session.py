@@ -0,0 +1,100 @@
+"""
+验证流量专用的 HTTP 会话：每个工作线程复用一个 requests.Session。
+
+- 同一代理的隧道连接保持在连接池中，重复探测（重试、挑选后复检）可跳过 TCP/TLS 握手
+- 所有连接共享一个预加载 CA 的 SSLContext，避免每次新建连接重新解析证书包
+- 每个会话缓存的代理连接池数量有上限，防止海量代理地址撑爆内存与文件描述符
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+import ssl
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+from urllib3.util.ssl_ import create_urllib3_context
+
+
+# 每个验证线程各自缓存，线程数 × 上限 × POOL_MAXSIZE 即最多占用的连接数，保持较小
+MAX_PROXY_MANAGERS = 32
+POOL_MAXSIZE = 4
+
+_local = threading.local()
+
+
+_ssl_context: Optional[ssl.SSLContext] = None
+_ssl_context_lock = threading.Lock()
+
+
+def shared_ssl_context() -> ssl.SSLContext:
+    # 加锁初始化：并发首批探测只加载一次证书包
+    global _ssl_context
+    if _ssl_context is None:
+        with _ssl_context_lock:
+            if _ssl_context is None:
+                context = create_urllib3_context()
+                context.load_verify_locations(DEFAULT_CA_BUNDLE_PATH)
+                _ssl_context = context
+    return _ssl_context
+
+
+def _close_proxy_manager(manager) -> None:
+    # urllib3 2.x 的 PoolManager.clear() 只清空映射、不关闭连接池，这里逐个关闭以立即释放套接字
+    for key in list(manager.pools.keys()):
+        pool = manager.pools.get(key)
+        if pool is not None:
+            pool.close()
+    manager.clear()
+
+
+class ValidationAdapter(HTTPAdapter):
+    def __init__(self, max_proxy_managers: int = MAX_PROXY_MANAGERS, **kwargs: Any):
+        self.max_proxy_managers = max(1, int(max_proxy_managers))
+        super().__init__(**kwargs)
+        self.proxy_manager = OrderedDict()
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault("ssl_context", shared_ssl_context())
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if proxy in self.proxy_manager:
+            self.proxy_manager.move_to_end(proxy)
+        else:
+            # 超出上限时淘汰最久未用的代理连接池
+            while len(self.proxy_manager) >= self.max_proxy_managers:
+                _evicted, manager = self.proxy_manager.popitem(last=False)
+                _close_proxy_manager(manager)
+            proxy_kwargs.setdefault("ssl_context", shared_ssl_context())
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        super().cert_verify(conn, url, verify, cert)
+        if verify is True:
+            # 默认证书包已预加载进共享 SSLContext，避免 urllib3 每次建连重新加载
+            conn.ca_certs = None
+            conn.ca_cert_dir = None
+
+
+def build_validation_session() -> requests.Session:
+    session = requests.Session()
+    adapter = ValidationAdapter(pool_maxsize=POOL_MAXSIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_validation_session() -> requests.Session:
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = build_validation_session()
+        _local.session = session
+    return session
+
+
+def validation_get(url: str, **kwargs: Any) -> requests.Response:
+    return get_validation_session().get(url, **kwargs)
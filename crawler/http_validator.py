@@ -4,6 +4,10 @@ from typing import Dict, List, Optional
 
 import requests
 
+from crawler.http_session import validation_get
+from crawler.judge import classify_anonymity
+from crawler.protocol_probe import probe_handshake, probe_target
+
 
 @dataclass
 class HTTPValidationResult:
@@ -12,6 +16,9 @@ class HTTPValidationResult:
     response_time_ms: int
     protocol_verified: bool
     errors: List[str] = field(default_factory=list)
+    anonymity: Optional[str] = None
+    # 协议不在 SUPPORTED_PROTOCOLS 内、无法用 HTTP 判定（区别于超时、连接失败）
+    unsupported_protocol: bool = False
 
 
 class HTTPValidator:
@@ -29,6 +36,7 @@ class HTTPValidator:
                 response_time_ms=0,
                 protocol_verified=False,
                 errors=[f"unsupported protocol: {normalized_protocol}"],
+                unsupported_protocol=True,
             )
 
         proxy_url = f"{normalized_protocol}://{ip}:{port}"
@@ -36,7 +44,7 @@ class HTTPValidator:
 
         start = time.time()
         try:
-            response = requests.get(HTTPValidator.TEST_URL, proxies=proxies, timeout=timeout)
+            response = validation_get(HTTPValidator.TEST_URL, proxies=proxies, timeout=timeout)
             elapsed_ms = int((time.time() - start) * 1000)
             status_code = response.status_code
             return HTTPValidationResult(
@@ -56,6 +64,79 @@ class HTTPValidator:
                 errors=[str(exc)],
             )
 
+    @staticmethod
+    def validate_with_judge(
+        ip: str,
+        port: int,
+        protocol: str,
+        timeout: int,
+        judge_url: str,
+        real_ip: Optional[str] = None,
+    ) -> HTTPValidationResult:
+        # 经代理访问自建 Judge：可用性与耗时同 validate_with_http，并按回显内容判定匿名度
+        normalized_protocol = (protocol or "http").strip().lower()
+        if normalized_protocol not in HTTPValidator.SUPPORTED_PROTOCOLS:
+            return HTTPValidationResult(
+                is_reachable=False,
+                status_code=None,
+                response_time_ms=0,
+                protocol_verified=False,
+                errors=[f"unsupported protocol: {normalized_protocol}"],
+                unsupported_protocol=True,
+            )
+
+        proxy_url = f"{normalized_protocol}://{ip}:{port}"
+        proxies: Dict[str, str] = {"http": proxy_url, "https": proxy_url}
+
+        start = time.time()
+        try:
+            response = validation_get(judge_url, proxies=proxies, timeout=timeout)
+            elapsed_ms = int((time.time() - start) * 1000)
+        except requests.RequestException as exc:
+            return HTTPValidationResult(
+                is_reachable=False,
+                status_code=None,
+                response_time_ms=int((time.time() - start) * 1000),
+                protocol_verified=False,
+                errors=[str(exc)],
+            )
+
+        status_code = response.status_code
+        try:
+            payload = response.json()
+            if not isinstance(payload, dict):
+                raise ValueError("judge payload must be an object")
+        except ValueError:
+            # 代理返回了非 Judge 内容（劫持页、登录页等），视为不可用
+            return HTTPValidationResult(
+                is_reachable=False,
+                status_code=status_code,
+                response_time_ms=elapsed_ms,
+                protocol_verified=True,
+                errors=["judge response is not json"],
+            )
+        return HTTPValidationResult(
+            is_reachable=200 <= status_code < 400,
+            status_code=status_code,
+            response_time_ms=elapsed_ms,
+            protocol_verified=True,
+            errors=[],
+            anonymity=classify_anonymity(payload, real_ip),
+        )
+
+    @staticmethod
+    def validate_with_handshake(ip: str, port: int, protocol: str = "http", timeout: int = 3) -> HTTPValidationResult:
+        # 轻量模式：仅完成 CONNECT/SOCKS 握手，不下载 TEST_URL 内容
+        normalized_protocol = (protocol or "http").strip().lower()
+        result = probe_handshake(ip, port, normalized_protocol, timeout, probe_target(HTTPValidator.TEST_URL))
+        return HTTPValidationResult(
+            is_reachable=result.supported,
+            status_code=None,
+            response_time_ms=result.latency_ms,
+            protocol_verified=result.supported,
+            errors=[result.error] if result.error else [],
+        )
+
     @staticmethod
     def batch_validate(proxies: List[Dict[str, object]], timeout: int = 3) -> List[HTTPValidationResult]:
         results: List[HTTPValidationResult] = []
@@ -0,0 +1,129 @@
+"""
+代理验证 Judge 服务：回显客户端 IP 与转发相关请求头。
+
+验证器通过代理访问 Judge，根据回显内容判断匿名度（transparent / anonymous / elite）
+并测量往返耗时。可独立运行（python cli.py judge），也挂载在 API 服务器的 /judge 路径。
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Mapping, Optional
+
+import requests
+
+
+# 代理常见的转发/暴露头，出现任意一个即说明请求经过了非高匿代理
+PROXY_HEADERS = (
+    "via",
+    "x-forwarded-for",
+    "forwarded",
+    "x-real-ip",
+    "client-ip",
+    "x-client-ip",
+    "x-proxy-id",
+    "proxy-connection",
+    "x-forwarded-host",
+    "x-forwarded-proto",
+    "forwarded-for",
+)
+
+ANONYMITY_TRANSPARENT = "transparent"
+ANONYMITY_ANONYMOUS = "anonymous"
+ANONYMITY_ELITE = "elite"
+
+
+def build_judge_payload(client_ip: str, headers: Mapping[str, str]) -> Dict[str, object]:
+    normalized = {str(key).lower(): str(value) for key, value in headers.items()}
+    forwarded = {name: normalized[name] for name in PROXY_HEADERS if name in normalized}
+    return {
+        "ip": client_ip,
+        "headers": normalized,
+        "forwarded": forwarded,
+    }
+
+
+def classify_anonymity(payload: Mapping[str, object], real_ip: Optional[str]) -> str:
+    # 暴露真实 IP 为透明；仅暴露代理痕迹为普通匿名；无任何痕迹为高匿
+    forwarded = payload.get("forwarded") or {}
+    if real_ip:
+        if payload.get("ip") == real_ip:
+            return ANONYMITY_TRANSPARENT
+        if any(real_ip in str(value) for value in dict(forwarded).values()):
+            return ANONYMITY_TRANSPARENT
+    if forwarded:
+        return ANONYMITY_ANONYMOUS
+    return ANONYMITY_ELITE
+
+
+_real_ip_cache: Dict[str, str] = {}
+_real_ip_lock = threading.Lock()
+
+
+def resolve_real_ip(judge_url: str, configured_ip: str = "", timeout: int = 5) -> Optional[str]:
+    """
+    获取验证器自身的出口 IP，用于识别透明代理。
+
+    优先使用配置值；否则直连 Judge 一次并缓存结果。本机 Judge 只能看到回环地址，
+    此时应通过 JUDGE_REAL_IP 显式配置公网出口 IP。
+    """
+    if configured_ip:
+        return configured_ip
+    with _real_ip_lock:
+        if judge_url in _real_ip_cache:
+            return _real_ip_cache[judge_url]
+    try:
+        response = requests.get(judge_url, timeout=timeout)
+        real_ip = str(response.json().get("ip") or "")
+    except (requests.RequestException, ValueError):
+        return None
+    if not real_ip:
+        return None
+    with _real_ip_lock:
+        _real_ip_cache[judge_url] = real_ip
+    return real_ip
+
+
+class JudgeRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ip-pool-judge/1.0"
+    # 保持长连接，验证器可复用到 Judge 的连接；关闭 Nagle，避免小响应被延迟确认拖慢 40ms
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:  # noqa: N802
+        payload = build_judge_payload(self.client_address[0], dict(self.headers.items()))
+        body = json.dumps(payload, ensure_ascii=True).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        # Judge 请求量大，关闭默认的逐请求 stderr 日志
+        return
+
+
+class JudgeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # 验证器读到状态行即断开属正常行为，不打印连接错误堆栈
+        return
+
+
+def create_judge_server(host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    return JudgeServer((host, port), JudgeRequestHandler)
+
+
+def serve_judge(host: str = "0.0.0.0", port: int = 8899) -> None:
+    server = create_judge_server(host, port)
+    print(f"judge listening on http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,52 @@
+from collections import deque
+from threading import Lock
+from typing import Deque
+
+
+class LatencyTracker:
+    """
+    记录最近成功探测的延迟，按分位数推导下一次探测的超时时间（秒）。
+
+    样本不足时返回上限；超时 = 分位延迟 * 放大系数，并限制在 [floor, ceiling] 内。
+    """
+
+    def __init__(
+        self,
+        ceiling: float,
+        floor: float = 0.5,
+        percentile: float = 0.95,
+        multiplier: float = 1.5,
+        window: int = 512,
+        min_samples: int = 20,
+    ):
+        self.ceiling = max(0.001, float(ceiling))
+        self.floor = min(self.ceiling, max(0.001, float(floor)))
+        self.percentile = min(1.0, max(0.0, float(percentile)))
+        self.multiplier = max(1.0, float(multiplier))
+        self.min_samples = max(1, int(min_samples))
+        self._samples: Deque[int] = deque(maxlen=max(1, int(window)))
+        self._lock = Lock()
+
+    def record(self, latency_ms: int) -> None:
+        with self._lock:
+            self._samples.append(max(0, int(latency_ms)))
+
+    def quantile_ms(self) -> int:
+        with self._lock:
+            if not self._samples:
+                return 0
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return ordered[index]
+
+    def timeout(self) -> float:
+        with self._lock:
+            enough = len(self._samples) >= self.min_samples
+        if not enough:
+            return self.ceiling
+        derived = self.quantile_ms() * self.multiplier / 1000
+        return min(self.ceiling, max(self.floor, derived))
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._samples)
@@ -44,9 +44,6 @@ class AuditLogger:
             return
         
         try:
-            from crawler.storage import get_mysql_connection
-            conn = get_mysql_connection(self.settings)
-            
             # 构建 INSERT 语句
             fields = []
             values = []
@@ -63,9 +60,14 @@ class AuditLogger:
             
             sql = f"INSERT INTO audit_logs ({', '.join(fields)}) VALUES ({', '.join(placeholders)})"
             
-            with conn.cursor() as cursor:
-                cursor.execute(sql, values)
-            conn.close()
+            from crawler.storage import get_mysql_connection
+            # 启用连接池时借用池中连接，close() 即归还
+            conn = get_mysql_connection(self.settings)
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, values)
+            finally:
+                conn.close()
         except Exception as e:
             print(f"[LOGGING] Failed to write DB log: {e}")
     
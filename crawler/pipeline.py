@@ -1,9 +1,14 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, Iterable, List, Tuple
+from functools import partial
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
+from crawler.async_validator import validate_records
 from crawler.config import Settings
 from crawler.fetcher import fetch_source
 from crawler.http_validator import HTTPValidator
+from crawler.judge import resolve_real_ip
+from crawler.latency_tracker import LatencyTracker
 from crawler.parsers import (
     parse_geonode,
     parse_proxy_list_download_http,
@@ -13,15 +18,19 @@ from crawler.parsers import (
 )
 from crawler.sources import Source, get_sources
 from crawler.storage import (
+    RedisPoolWriter,
+    build_proxy_meta,
+    build_redis_pool_writer,
     get_mysql_connection,
     get_redis_client,
     set_settings_for_retry,
     update_proxy_check,
-    upsert_proxy,
-    upsert_redis_pool,
+    upsert_proxies,
     upsert_source,
 )
-from crawler.validator import score_proxy, tcp_check
+from crawler.validation_cache import get_validation_cache
+from crawler.validator import score_proxy, tcp_check, tcp_check_many
+from crawler.write_behind import WriteBehindWriter
 
 
 # 来源解析器映射，确保 source.parser_key 可定位到具体解析函数
@@ -83,6 +92,234 @@ def _check_record(record: Dict[str, object], timeout: int) -> Tuple[bool, int]:
         return False, 0
 
 
+def _store_check_result(
+    mysql_conn,
+    redis_writer: RedisPoolWriter,
+    record: Dict[str, object],
+    success: bool,
+    latency_ms: int,
+    settings: Settings,
+    cache=None,
+) -> None:
+    # 写回验证结果：成功的代理进入 Redis 存活池，失败的移出
+    if cache is not None:
+        cache.set(record["ip"], record["port"], record["protocol"], success, latency_ms)
+    score = score_proxy(latency_ms=latency_ms, success=success)
+    update_proxy_check(
+        mysql_conn,
+        record["ip"],
+        record["port"],
+        record["protocol"],
+        success,
+        latency_ms,
+        settings.fail_window_hours,
+        # 仅写回 Judge 实测的匿名度；来源声明的值传 None，由 COALESCE 保留库中已有值
+        record.get("judged_anonymity"),
+    )
+    if success:
+        meta = build_proxy_meta(record, latency_ms)
+        redis_writer.add(record["ip"], record["port"], record["protocol"], score, meta=meta)
+    else:
+        redis_writer.remove(record["ip"], record["port"], record["protocol"], record.get("country"))
+
+
+def _skip_cached(records: List[Dict[str, object]], cache) -> List[Dict[str, object]]:
+    # 近期已验证的代理沿用已入库的结果，只返回需要探测的记录
+    if cache is None or not records:
+        return records
+    return [record for record, cached in zip(records, cache.get_many(records)) if cached is None]
+
+
+def _prescan_records(
+    store: Callable[[Dict[str, object], bool, int], None],
+    records: List[Dict[str, object]],
+    settings: Settings,
+) -> List[Dict[str, object]]:
+    if not records:
+        return records
+    scanned = tcp_check_many(
+        [(record["ip"], record["port"]) for record in records],
+        timeout=settings.http_timeout,
+        concurrency=settings.tcp_scan_concurrency,
+    )
+    survivors = []
+    for record, (connected, _latency_ms) in zip(records, scanned):
+        if connected:
+            survivors.append(record)
+        else:
+            store(record, False, 0)
+    return survivors
+
+
+def _deliver_result(store, record: Dict[str, object], future) -> None:
+    # 验证线程完成回调：直接把结果交给写入端（write-behind 模式下为入队）
+    try:
+        success, latency_ms = future.result()
+    except Exception:
+        success, latency_ms = False, 0
+    store(record, success, latency_ms)
+
+
+def _iter_fetched_records(mysql_conn, source_rows, settings: Settings, cache, conn_lock: threading.Lock):
+    # 按源完成顺序逐源入库并产出待验证记录，供验证窗口边抓取边消费
+    with ThreadPoolExecutor(max_workers=settings.source_workers) as fetch_pool:
+        future_map = {
+            fetch_pool.submit(_fetch_and_parse, source, settings): (source, source_id)
+            for source, source_id in source_rows
+        }
+        for future in as_completed(future_map):
+            _source, source_id = future_map[future]
+            try:
+                fetched = future.result()
+            except Exception:
+                fetched = []
+            source_records = list(_normalize_records(fetched))
+            with conn_lock:
+                upsert_proxies(mysql_conn, source_records, source_id, rehydrate=settings.archive_enabled)
+            yield from _skip_cached(source_records, cache)
+
+
+def _async_engine_conflicts(settings: Settings) -> List[str]:
+    # asyncio 引擎只做连通 / HTTP / 握手探测，以下配置改变验证内容，只有线程引擎（_select_check）支持
+    conflicts = []
+    if settings.validate_funnel_enabled:
+        conflicts.append("VALIDATE_FUNNEL_ENABLED")
+    if settings.judge_url:
+        conflicts.append("JUDGE_URL")
+    if settings.tcp_scan_enabled:
+        conflicts.append("TCP_SCAN_ENABLED")
+    return conflicts
+
+
+def _run_async_engine(mysql_conn, store, source_rows, settings: Settings, cache=None) -> None:
+    # asyncio 引擎：抓取与验证重叠，先完成的源一入库即进入有界窗口并发验证
+    # 入库（取值线程）与结果落库（当前线程）共用 mysql_conn，以锁串行化
+    conn_lock = threading.Lock()
+    records = _iter_fetched_records(mysql_conn, source_rows, settings, cache, conn_lock)
+    for record, success, latency_ms in validate_records(
+        records,
+        timeout=settings.http_timeout,
+        concurrency=settings.async_validate_concurrency,
+        probe_mode=settings.validate_probe_mode,
+        target_url=settings.judge_url or None,
+    ):
+        with conn_lock:
+            store(record, success, latency_ms)
+
+
+def _check_record_handshake(record: Dict[str, object], timeout: int) -> Tuple[bool, int]:
+    # 轻量握手探测：只验证声明协议的 CONNECT/SOCKS 握手，不做完整上游请求
+    try:
+        result = HTTPValidator.validate_with_handshake(
+            ip=record["ip"],
+            port=record["port"],
+            protocol=str(record.get("protocol", "http")),
+            timeout=timeout,
+        )
+        return result.is_reachable, result.response_time_ms if result.is_reachable else 0
+    except Exception:
+        return False, 0
+
+
+def _check_record_judge(
+    record: Dict[str, object],
+    timeout: int,
+    judge_url: str,
+    real_ip: Optional[str] = None,
+) -> Tuple[bool, int]:
+    # 经代理访问自建 Judge，顺带把实测匿名度写回 record（失败时回退 TCP）
+    try:
+        result = HTTPValidator.validate_with_judge(
+            ip=record["ip"],
+            port=record["port"],
+            protocol=str(record.get("protocol", "http")),
+            timeout=timeout,
+            judge_url=judge_url,
+            real_ip=real_ip,
+        )
+        if result.protocol_verified:
+            if result.anonymity:
+                record["anonymity"] = result.anonymity
+                record["judged_anonymity"] = result.anonymity
+            return result.is_reachable, result.response_time_ms
+        return tcp_check(record["ip"], record["port"], timeout=timeout)
+    except Exception:
+        return False, 0
+
+
+def _check_record_funnel(
+    record: Dict[str, object],
+    timeout: int,
+    prefilter: LatencyTracker,
+    fetch: LatencyTracker,
+    prefilter_mode: str = "tcp",
+    judge_url: Optional[str] = None,
+    real_ip: Optional[str] = None,
+) -> Tuple[bool, int]:
+    # 两段漏斗：短超时预筛直接淘汰死代理，存活者再做 HTTP 验证；两段超时均按近期延迟分位自适应
+    try:
+        ip = record["ip"]
+        port = record["port"]
+        protocol = str(record.get("protocol", "http"))
+        if prefilter_mode == "handshake":
+            probe = HTTPValidator.validate_with_handshake(ip, port, protocol, timeout=prefilter.timeout())
+            passed, prefilter_ms = probe.is_reachable, probe.response_time_ms
+        else:
+            passed, prefilter_ms = tcp_check(ip, port, timeout=prefilter.timeout())
+        if not passed:
+            return False, 0
+        prefilter.record(prefilter_ms)
+
+        fetch_timeout = min(float(timeout), fetch.timeout())
+        if judge_url:
+            result = HTTPValidator.validate_with_judge(ip, port, protocol, fetch_timeout, judge_url, real_ip)
+        else:
+            result = HTTPValidator.validate_with_http(ip=ip, port=port, protocol=protocol, timeout=fetch_timeout)
+        if result.unsupported_protocol:
+            # 协议无法用 HTTP 判定时以预筛结果为准
+            return True, prefilter_ms
+        if not result.protocol_verified:
+            # 超时、连接被拒等请求失败：预筛只证明端口可达，代理本身不可用
+            return False, 0
+        if result.anonymity:
+            record["anonymity"] = result.anonymity
+            record["judged_anonymity"] = result.anonymity
+        if result.is_reachable:
+            fetch.record(result.response_time_ms)
+        return result.is_reachable, result.response_time_ms
+    except Exception:
+        return False, 0
+
+
+def _select_check(settings: Settings):
+    # 每轮调用一次：漏斗模式的延迟样本需在整轮验证中共享
+    if settings.validate_probe_mode == "handshake":
+        return _check_record_handshake
+    real_ip = None
+    if settings.judge_url:
+        real_ip = resolve_real_ip(settings.judge_url, settings.judge_real_ip, timeout=settings.http_timeout)
+    if settings.validate_funnel_enabled:
+        return partial(
+            _check_record_funnel,
+            prefilter=LatencyTracker(
+                ceiling=settings.funnel_prefilter_timeout,
+                floor=settings.funnel_timeout_floor,
+                percentile=settings.funnel_timeout_percentile,
+            ),
+            fetch=LatencyTracker(
+                ceiling=settings.http_timeout,
+                floor=settings.funnel_timeout_floor,
+                percentile=settings.funnel_timeout_percentile,
+            ),
+            prefilter_mode=settings.funnel_prefilter,
+            judge_url=settings.judge_url or None,
+            real_ip=real_ip,
+        )
+    if settings.judge_url:
+        return partial(_check_record_judge, judge_url=settings.judge_url, real_ip=real_ip)
+    return _check_record
+
+
 def run_once(settings: Settings, quick_test: bool = False, quick_record_limit: int = 1) -> None:
     # 单次抓取流程：抓取 -> 解析 -> 入库 -> 验证 -> 更新 Redis
     set_settings_for_retry(settings)
@@ -90,8 +327,10 @@ def run_once(settings: Settings, quick_test: bool = False, quick_record_limit: i
     sources = get_sources()
     mysql_conn = get_mysql_connection(settings)
     redis_client = get_redis_client(settings)
+    redis_writer = build_redis_pool_writer(settings, redis_client)
 
     quick_limit = max(1, int(quick_record_limit))
+    write_behind: Optional[WriteBehindWriter] = None
 
     try:
         source_rows = []
@@ -99,7 +338,23 @@ def run_once(settings: Settings, quick_test: bool = False, quick_record_limit: i
             source_id = upsert_source(mysql_conn, source.name, source.url, source.parser_key)
             source_rows.append((source, source_id))
 
+        cache = get_validation_cache(settings, redis_client)
+        if settings.write_behind_enabled:
+            # 验证结果交给独立写线程批量落库，主线程与验证线程只负责入队
+            write_behind = WriteBehindWriter(
+                settings,
+                redis_writer,
+                cache,
+                queue_size=settings.write_behind_queue_size,
+                batch_size=settings.write_behind_batch_size,
+                flush_interval=settings.write_behind_flush_interval,
+            ).start()
+            store = write_behind.submit
+        else:
+            store = partial(_store_check_result, mysql_conn, redis_writer, settings=settings, cache=cache)
+
         if quick_test:
+            check = _select_check(settings)
             for source, source_id in source_rows:
                 try:
                     records = _fetch_and_parse(source, settings)
@@ -115,39 +370,24 @@ def run_once(settings: Settings, quick_test: bool = False, quick_record_limit: i
                 if not normalized_records:
                     continue
 
+                upsert_proxies(mysql_conn, normalized_records, source_id, rehydrate=settings.archive_enabled)
                 for record in normalized_records:
-                    upsert_proxy(
-                        mysql_conn,
-                        record["ip"],
-                        record["port"],
-                        record["protocol"],
-                        record.get("anonymity"),
-                        record.get("country"),
-                        source_id,
-                    )
-                    success, latency_ms = _check_record(record, settings.http_timeout)
-                    score = score_proxy(latency_ms=latency_ms, success=success)
-                    update_proxy_check(
-                        mysql_conn,
-                        record["ip"],
-                        record["port"],
-                        record["protocol"],
-                        success,
-                        latency_ms,
-                        settings.fail_window_hours,
-                    )
-                    if success:
-                        upsert_redis_pool(
-                            redis_client,
-                            record["ip"],
-                            record["port"],
-                            record["protocol"],
-                            score,
-                        )
+                    if _skip_cached([record], cache):
+                        success, latency_ms = check(record, settings.http_timeout)
+                        store(record, success, latency_ms)
                 break
             return
 
+        if settings.validate_engine == "asyncio":
+            conflicts = _async_engine_conflicts(settings)
+            if not conflicts:
+                _run_async_engine(mysql_conn, store, source_rows, settings, cache)
+                return
+            # 不静默改变验证内容：明确告警并改用线程引擎
+            print(f"VALIDATE_ENGINE=asyncio does not support {', '.join(conflicts)}; using the thread engine")
+
         validate_futures = {}
+        check = _select_check(settings)
         # 抓取与验证并发执行，提升吞吐
         with ThreadPoolExecutor(max_workers=settings.source_workers) as fetch_pool, ThreadPoolExecutor(
             max_workers=settings.validate_workers
@@ -163,20 +403,22 @@ def run_once(settings: Settings, quick_test: bool = False, quick_record_limit: i
                 except Exception:
                     records = []
 
-                # 入库后提交 TCP 校验任务
-                for record in _normalize_records(records):
-                    upsert_proxy(
-                        mysql_conn,
-                        record["ip"],
-                        record["port"],
-                        record["protocol"],
-                        record.get("anonymity"),
-                        record.get("country"),
-                        source_id,
-                    )
-                    validate_futures[
-                        validate_pool.submit(_check_record, record, settings.http_timeout)
-                    ] = record
+                # 整源批量入库后提交校验任务
+                source_records = list(_normalize_records(records))
+                upsert_proxies(mysql_conn, source_records, source_id, rehydrate=settings.archive_enabled)
+
+                source_records = _skip_cached(source_records, cache)
+                if settings.tcp_scan_enabled:
+                    # 批量 TCP 预筛：端口不通的直接记失败，不再占用验证线程
+                    source_records = _prescan_records(store, source_records, settings)
+
+                for record in source_records:
+                    future = validate_pool.submit(check, record, settings.http_timeout)
+                    if write_behind is not None:
+                        # 结果在验证线程内即入队，落库与后续抓取、验证并行；队列满时验证线程被背压
+                        future.add_done_callback(partial(_deliver_result, store, record))
+                    else:
+                        validate_futures[future] = record
 
             # 收集验证结果并更新存储与 Redis
             for future in as_completed(validate_futures):
@@ -185,19 +427,19 @@ def run_once(settings: Settings, quick_test: bool = False, quick_record_limit: i
                     success, latency_ms = future.result()
                 except Exception:
                     success, latency_ms = False, 0
-                score = score_proxy(latency_ms=latency_ms, success=success)
-                update_proxy_check(
-                    mysql_conn,
-                    record["ip"],
-                    record["port"],
-                    record["protocol"],
-                    success,
-                    latency_ms,
-                    settings.fail_window_hours,
-                )
-                if success:
-                    upsert_redis_pool(redis_client, record["ip"], record["port"], record["protocol"], score)
+                store(record, success, latency_ms)
     finally:
+        if write_behind is not None:
+            write_behind.close()
+            if write_behind.failed or write_behind.cache_failed or write_behind.redis_failed or write_behind.dropped:
+                print(
+                    f"write-behind failed={write_behind.failed} written={write_behind.written} "
+                    f"cache_failed={write_behind.cache_failed} redis_failed={write_behind.redis_failed} "
+                    f"dropped={write_behind.dropped} error={write_behind.last_error}"
+                )
+        redis_writer.flush()
+        if redis_writer.failed:
+            print(f"redis pool writes failed={redis_writer.failed} sent={redis_writer.sent} error={redis_writer.last_error}")
         mysql_conn.close()
 
 
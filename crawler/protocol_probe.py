@@ -0,0 +1,276 @@
+import asyncio
+from functools import lru_cache
+import ipaddress
+import socket
+import struct
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+
+DEFAULT_PROBE_PROTOCOLS = ("http", "socks4", "socks5")
+SUPPORTED_PROBE_PROTOCOLS = {"http", "https", "socks4", "socks4a", "socks5"}
+
+_SOCKS4_GRANTED = 0x5A
+_SOCKS5_NO_AUTH = 0x00
+_SOCKS5_SUCCEEDED = 0x00
+_MAX_CONNECT_REPLY = 8192
+
+
+class HandshakeError(Exception):
+    pass
+
+
+@dataclass
+class HandshakeResult:
+    protocol: str
+    supported: bool
+    latency_ms: int
+    error: Optional[str] = None
+
+
+@dataclass
+class ProtocolProbeReport:
+    ip: str
+    port: int
+    results: Dict[str, HandshakeResult] = field(default_factory=dict)
+
+    @property
+    def supported(self) -> List[str]:
+        return [protocol for protocol, result in self.results.items() if result.supported]
+
+
+def probe_target(url: str) -> Tuple[str, int]:
+    # 由验证 URL 推导握手目标（host, port），代理只需与之建立 TCP 连接
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    return parts.hostname or "", port
+
+
+# ---------- 报文构造与解析（同步/异步驱动共用） ----------
+
+def build_connect_request(host: str, port: int) -> bytes:
+    return f"CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n".encode("ascii")
+
+
+def parse_connect_reply(head: bytes) -> None:
+    parts = head.split(b"\r\n", 1)[0].split()
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+        raise HandshakeError("not an http proxy reply")
+    if parts[1] != b"200":
+        raise HandshakeError(f"connect rejected: {parts[1].decode('ascii', 'replace')}")
+
+
+@lru_cache(maxsize=64)
+def _resolve_ipv4(host: str) -> bytes:
+    # SOCKS4 只接受 IPv4，目标域名在本地解析一次后复用
+    try:
+        return socket.inet_aton(socket.gethostbyname(host))
+    except OSError as exc:
+        raise HandshakeError(f"cannot resolve probe target: {host}") from exc
+
+
+def build_socks4_request(host: str, port: int, allow_hostname: bool) -> bytes:
+    try:
+        packed_ip = ipaddress.IPv4Address(host).packed
+        suffix = b""
+    except ValueError:
+        if not allow_hostname:
+            packed_ip = _resolve_ipv4(host)
+            suffix = b""
+        else:
+            # SOCKS4a：IP 置为 0.0.0.1，目标域名附在 userid 之后
+            packed_ip = b"\x00\x00\x00\x01"
+            suffix = host.encode("idna") + b"\x00"
+    return b"\x04\x01" + struct.pack(">H", port) + packed_ip + b"\x00" + suffix
+
+
+def parse_socks4_reply(reply: bytes) -> None:
+    if len(reply) != 8 or reply[0] != 0x00:
+        raise HandshakeError("not a socks4 reply")
+    if reply[1] != _SOCKS4_GRANTED:
+        raise HandshakeError(f"socks4 rejected: 0x{reply[1]:02x}")
+
+
+def build_socks5_greeting() -> bytes:
+    return b"\x05\x01" + bytes([_SOCKS5_NO_AUTH])
+
+
+def parse_socks5_greeting_reply(reply: bytes) -> None:
+    if len(reply) != 2 or reply[0] != 0x05:
+        raise HandshakeError("not a socks5 reply")
+    if reply[1] != _SOCKS5_NO_AUTH:
+        raise HandshakeError("socks5 requires authentication")
+
+
+def build_socks5_connect(host: str, port: int) -> bytes:
+    try:
+        address = ipaddress.ip_address(host)
+        atyp = b"\x01" if address.version == 4 else b"\x04"
+        encoded = atyp + address.packed
+    except ValueError:
+        name = host.encode("idna")
+        encoded = b"\x03" + bytes([len(name)]) + name
+    return b"\x05\x01\x00" + encoded + struct.pack(">H", port)
+
+
+def socks5_reply_length(head: bytes) -> int:
+    # 读取前 5 字节后计算完整应答长度
+    if len(head) < 5 or head[0] != 0x05:
+        raise HandshakeError("not a socks5 reply")
+    if head[1] != _SOCKS5_SUCCEEDED:
+        raise HandshakeError(f"socks5 connect rejected: 0x{head[1]:02x}")
+    atyp = head[3]
+    if atyp == 0x01:
+        return 4 + 4 + 2
+    if atyp == 0x04:
+        return 4 + 16 + 2
+    if atyp == 0x03:
+        return 4 + 1 + head[4] + 2
+    raise HandshakeError(f"socks5 unknown address type: 0x{atyp:02x}")
+
+
+# ---------- 同步驱动 ----------
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise HandshakeError("connection closed during handshake")
+        data += chunk
+    return data
+
+
+def _recv_http_head(sock: socket.socket) -> bytes:
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = sock.recv(1024)
+        if not chunk:
+            if data:
+                break
+            raise HandshakeError("connection closed during handshake")
+        data += chunk
+        if len(data) > _MAX_CONNECT_REPLY:
+            raise HandshakeError("connect reply too large")
+    return data
+
+
+def _handshake(sock: socket.socket, protocol: str, host: str, port: int) -> None:
+    if protocol in {"http", "https"}:
+        sock.sendall(build_connect_request(host, port))
+        parse_connect_reply(_recv_http_head(sock))
+    elif protocol in {"socks4", "socks4a"}:
+        sock.sendall(build_socks4_request(host, port, allow_hostname=protocol == "socks4a"))
+        parse_socks4_reply(_recv_exact(sock, 8))
+    elif protocol == "socks5":
+        sock.sendall(build_socks5_greeting())
+        parse_socks5_greeting_reply(_recv_exact(sock, 2))
+        sock.sendall(build_socks5_connect(host, port))
+        head = _recv_exact(sock, 5)
+        _recv_exact(sock, socks5_reply_length(head) - len(head))
+    else:
+        raise HandshakeError(f"unsupported protocol: {protocol}")
+
+
+def probe_handshake(
+    ip: str,
+    port: int,
+    protocol: str,
+    timeout: float,
+    target: Tuple[str, int],
+) -> HandshakeResult:
+    """按协议与代理完成一次握手（不发起上游请求），返回是否支持及握手耗时。"""
+    normalized = (protocol or "http").strip().lower()
+    if normalized not in SUPPORTED_PROBE_PROTOCOLS:
+        return HandshakeResult(normalized, False, 0, f"unsupported protocol: {normalized}")
+
+    start = time.time()
+    try:
+        with socket.create_connection((ip, int(port)), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            _handshake(sock, normalized, target[0], target[1])
+    except (OSError, HandshakeError) as exc:
+        return HandshakeResult(normalized, False, int((time.time() - start) * 1000), str(exc) or type(exc).__name__)
+    return HandshakeResult(normalized, True, int((time.time() - start) * 1000))
+
+
+def detect_protocols(
+    ip: str,
+    port: int,
+    timeout: float,
+    target: Tuple[str, int],
+    protocols: Sequence[str] = DEFAULT_PROBE_PROTOCOLS,
+) -> ProtocolProbeReport:
+    # 依次尝试各协议握手，得出该 ip:port 实际支持的协议
+    report = ProtocolProbeReport(ip=ip, port=int(port))
+    for protocol in protocols:
+        report.results[protocol] = probe_handshake(ip, port, protocol, timeout, target)
+    return report
+
+
+# ---------- 异步驱动 ----------
+
+async def _async_handshake(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    protocol: str,
+    host: str,
+    port: int,
+) -> None:
+    if protocol in {"http", "https"}:
+        writer.write(build_connect_request(host, port))
+        await writer.drain()
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as exc:
+            if not exc.partial:
+                raise HandshakeError("connection closed during handshake") from exc
+            head = exc.partial
+        except asyncio.LimitOverrunError as exc:
+            raise HandshakeError("connect reply too large") from exc
+        parse_connect_reply(head)
+    elif protocol in {"socks4", "socks4a"}:
+        writer.write(build_socks4_request(host, port, allow_hostname=protocol == "socks4a"))
+        await writer.drain()
+        parse_socks4_reply(await reader.readexactly(8))
+    elif protocol == "socks5":
+        writer.write(build_socks5_greeting())
+        await writer.drain()
+        parse_socks5_greeting_reply(await reader.readexactly(2))
+        writer.write(build_socks5_connect(host, port))
+        await writer.drain()
+        head = await reader.readexactly(5)
+        await reader.readexactly(socks5_reply_length(head) - len(head))
+    else:
+        raise HandshakeError(f"unsupported protocol: {protocol}")
+
+
+async def async_probe_handshake(
+    ip: str,
+    port: int,
+    protocol: str,
+    timeout: float,
+    target: Tuple[str, int],
+) -> HandshakeResult:
+    normalized = (protocol or "http").strip().lower()
+    if normalized not in SUPPORTED_PROBE_PROTOCOLS:
+        return HandshakeResult(normalized, False, 0, f"unsupported protocol: {normalized}")
+
+    start = time.time()
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, int(port)), timeout=timeout)
+        remaining = max(0.001, timeout - (time.time() - start))
+        await asyncio.wait_for(_async_handshake(reader, writer, normalized, target[0], target[1]), timeout=remaining)
+    except (OSError, HandshakeError, asyncio.TimeoutError, asyncio.IncompleteReadError) as exc:
+        return HandshakeResult(normalized, False, int((time.time() - start) * 1000), str(exc) or type(exc).__name__)
+    finally:
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+    return HandshakeResult(normalized, True, int((time.time() - start) * 1000))
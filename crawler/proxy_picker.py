@@ -1,22 +1,49 @@
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
 import random
+import threading
+import time
 from typing import Iterable, Optional, Sequence
 
-import requests
-
 from crawler.config import Settings
+from crawler.http_session import validation_get
 from crawler.storage import (
+    ALIVE_POOL_KEY,
+    PROXY_META_KEY,
+    country_index_key,
+    decode_proxy_meta,
     fetch_mysql_candidates as _fetch_mysql_candidates_from_db,
     fetch_proxy_countries as _fetch_proxy_countries_from_db,
     get_mysql_connection,
     get_redis_client,
+    protocol_index_key,
+    ready_pool_key,
 )
+from crawler.validation_cache import get_validation_cache
 from crawler.validator import tcp_check
 
 
 DEFAULT_PROTOCOLS = ["http", "https"]
 
+# 并发验证共享线程池：各请求放弃等待的探测仍在其中跑完，线程总数不随请求量增长
+_validate_pool: Optional[ThreadPoolExecutor] = None
+_validate_pool_lock = threading.Lock()
+
+
+def _get_validate_pool(settings: Settings) -> ThreadPoolExecutor:
+    global _validate_pool
+    if _validate_pool is None:
+        with _validate_pool_lock:
+            if _validate_pool is None:
+                _validate_pool = ThreadPoolExecutor(
+                    max_workers=max(1, int(settings.pick_validate_pool_size)),
+                    thread_name_prefix="pick-validate",
+                )
+    return _validate_pool
+
 
 def parse_redis_key(key: str) -> Optional[dict]:
     parts = key.split(":")
@@ -51,7 +78,7 @@ def allocate_protocols(protocols: Optional[Sequence[str]], count: int) -> list[s
 def _fetch_redis_candidates(redis_client, limit: int) -> list[dict]:
     if not redis_client or limit <= 0:
         return []
-    keys = redis_client.zrevrange("proxy:alive", 0, max(0, limit - 1))
+    keys = redis_client.zrevrange(ALIVE_POOL_KEY, 0, max(0, limit - 1))
     candidates: list[dict] = []
     for key in keys:
         parsed = parse_redis_key(key)
@@ -60,6 +87,117 @@ def _fetch_redis_candidates(redis_client, limit: int) -> list[dict]:
     return candidates
 
 
+# 一次往返取出得分最高的成员及其元数据（缺失的元数据返回 nil）
+_FETCH_WITH_META_SCRIPT = """
+local members = redis.call('ZREVRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #members == 0 then
+  return {}
+end
+local metas = redis.call('HMGET', KEYS[2], unpack(members))
+local reply = {}
+for index, member in ipairs(members) do
+  reply[#reply + 1] = member
+  reply[#reply + 1] = metas[index]
+end
+return reply
+"""
+
+
+def _fetch_redis_candidates_with_meta(redis_client, limit: int) -> list[dict]:
+    if not redis_client or limit <= 0:
+        return []
+    reply = redis_client.eval(_FETCH_WITH_META_SCRIPT, 2, ALIVE_POOL_KEY, PROXY_META_KEY, limit)
+    candidates: list[dict] = []
+    for key, raw_meta in zip(reply[0::2], reply[1::2]):
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "replace")
+        parsed = parse_redis_key(key)
+        if not parsed:
+            continue
+        meta = decode_proxy_meta(raw_meta) or {}
+        candidates.append({**parsed, "country": meta.get("country"), "latency_ms": meta.get("latency_ms")})
+    return candidates
+
+
+def _index_keys_for(protocols: Sequence[str], countries: Sequence[str]) -> list[tuple[str, Optional[str]]]:
+    keys: list[tuple[str, Optional[str]]] = []
+    for protocol in dict.fromkeys(protocols):
+        if countries:
+            keys.extend((country_index_key(protocol, country), country) for country in countries)
+        else:
+            keys.append((protocol_index_key(protocol), None))
+    return keys
+
+
+def _fetch_redis_index_candidates(
+    redis_client,
+    index_keys: Sequence[tuple[str, Optional[str]]],
+    limit: int,
+) -> list[dict]:
+    # 每个二级索引一次 ZREVRANGE，同一 pipeline 一次往返；合并后按分数降序
+    if not redis_client or limit <= 0 or not index_keys:
+        return []
+    per_key = max(1, -(-limit // len(index_keys)))
+    pipe = redis_client.pipeline(transaction=False)
+    for key, _country in index_keys:
+        pipe.zrevrange(key, 0, per_key - 1, withscores=True)
+    scored: list[tuple[float, dict]] = []
+    seen: set[str] = set()
+    for (_key, country), members in zip(index_keys, pipe.execute()):
+        for member, score in members:
+            if isinstance(member, bytes):
+                member = member.decode("utf-8", "replace")
+            parsed = parse_redis_key(member)
+            if not parsed or member in seen:
+                continue
+            seen.add(member)
+            scored.append((float(score), {**parsed, "country": country, "latency_ms": None}))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [candidate for _score, candidate in scored]
+
+
+def _filter_candidates_by_meta(candidates: list[dict], countries: Sequence[str]) -> list[dict]:
+    # 元数据缺失（启用前写入、尚未复检）的成员视为国家未知，由 MySQL 回退补足
+    normalized = {country.lower() for country in countries}
+    return [candidate for candidate in candidates if (candidate.get("country") or "").lower() in normalized]
+
+
+def _fetch_ready_candidates(
+    redis_client,
+    protocol_allocation: Sequence[str],
+    countries: Sequence[str],
+    with_meta: bool = False,
+) -> Optional[list[dict]]:
+    # 从预验证热池按协议配额随机取出未过期成员；任一协议不足时返回 None，由调用方回退在线验证
+    # with_meta=True 时再用一次 HMGET 从 proxy:meta 补全延迟（warmer 补充时同步写入）
+    needed = Counter(protocol_allocation)
+    keys = [(protocol, country) for protocol in needed for country in (countries or [None])]
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    for protocol, country in keys:
+        pipe.zrangebyscore(ready_pool_key(protocol, country), now, "+inf")
+    pools: dict[str, list[dict]] = {protocol: [] for protocol in needed}
+    for (protocol, country), members in zip(keys, pipe.execute()):
+        for member in members:
+            if isinstance(member, bytes):
+                member = member.decode("utf-8", "replace")
+            parsed = parse_redis_key(member)
+            if parsed:
+                pools[protocol].append({**parsed, "country": country, "latency_ms": None})
+
+    selected: list[dict] = []
+    for protocol, amount in needed.items():
+        if len(pools[protocol]) < amount:
+            return None
+        selected.extend(random.sample(pools[protocol], amount))
+
+    if with_meta and selected:
+        members = [f"{candidate['ip']}:{candidate['port']}:{candidate['protocol']}" for candidate in selected]
+        for candidate, raw_meta in zip(selected, redis_client.hmget(PROXY_META_KEY, members)):
+            candidate["latency_ms"] = (decode_proxy_meta(raw_meta) or {}).get("latency_ms")
+    return selected
+
+
 def _fetch_mysql_candidates(
     mysql_conn,
     protocols: Sequence[str],
@@ -69,10 +207,15 @@ def _fetch_mysql_candidates(
     return _fetch_mysql_candidates_from_db(mysql_conn, protocols, countries, limit)
 
 
-def _filter_candidates_by_countries(mysql_conn, candidates: list[dict], countries: Sequence[str]) -> list[dict]:
+def _filter_candidates_by_countries(
+    mysql_conn,
+    candidates: list[dict],
+    countries: Sequence[str],
+    compact_keys: bool = False,
+) -> list[dict]:
     if not mysql_conn or not candidates or not countries:
         return []
-    mapping = _fetch_proxy_countries_from_db(mysql_conn, candidates)
+    mapping = _fetch_proxy_countries_from_db(mysql_conn, candidates, compact_keys=compact_keys)
     normalized = {country.lower() for country in countries}
     filtered: list[dict] = []
     for candidate in candidates:
@@ -97,23 +240,38 @@ def _http_check(url: str, candidate: dict, timeout: int, user_agent: str) -> boo
     }
     headers = {"User-Agent": user_agent}
     try:
-        response = requests.get(url, proxies=proxies, timeout=timeout, headers=headers)
+        response = validation_get(url, proxies=proxies, timeout=timeout, headers=headers)
         return response.status_code < 500
     except Exception:
         return False
 
 
-def _validate_candidate(candidate: dict, settings: Settings, check_url: Optional[str]) -> Optional[dict]:
-    success, latency_ms = tcp_check(candidate["ip"], candidate["port"], timeout=settings.http_timeout)
-    if not success:
-        return None
-
+def _validate_candidate(
+    candidate: dict,
+    settings: Settings,
+    check_url: Optional[str],
+    cache=None,
+) -> Optional[dict]:
     if check_url:
         url = check_url
     else:
         url = "https://example.com" if candidate["protocol"] == "https" else "http://example.com"
+    # 结果按实际检测的 URL 缓存，不写入流水线的条目；未指定 check_url 时也可复用流水线的近期结果
+    targets = [url] if check_url else [None, url]
+    if cache is not None:
+        for target in targets:
+            cached = cache.get(candidate["ip"], candidate["port"], candidate["protocol"], target=target)
+            if cached is not None:
+                success, latency_ms = cached
+                return {**candidate, "latency_ms": latency_ms} if success else None
 
-    if not _http_check(url, candidate, settings.http_timeout, settings.user_agent):
+    success, latency_ms = tcp_check(candidate["ip"], candidate["port"], timeout=settings.http_timeout)
+    if success:
+        success = _http_check(url, candidate, settings.http_timeout, settings.user_agent)
+
+    if cache is not None:
+        cache.set(candidate["ip"], candidate["port"], candidate["protocol"], success, latency_ms if success else 0, target=url)
+    if not success:
         return None
 
     return {
@@ -122,13 +280,102 @@ def _validate_candidate(candidate: dict, settings: Settings, check_url: Optional
     }
 
 
+def _next_candidate(queue: list[dict], open_slots: Counter, in_flight: Counter) -> dict:
+    # 优先发起仍有空缺（扣除在途探测后）的协议的候选，否则按原顺序取
+    for index, candidate in enumerate(queue):
+        protocol = candidate.get("protocol")
+        if open_slots.get(protocol, 0) > in_flight.get(protocol, 0):
+            return queue.pop(index)
+    return queue.pop(0)
+
+
+def _pick_candidates_parallel(
+    candidates: list[dict],
+    protocol_allocation: Sequence[str],
+    settings: Settings,
+    check_url: Optional[str],
+    cache=None,
+) -> list[dict]:
+    """
+    并发验证候选：在途探测不超过 pick_validate_concurrency，凑满所需数量即返回，
+    剩余探测不再等待（未开始的取消，已开始的在后台超时结束），整体耗时约为一次超时而非 N 次。
+
+    pick_hedge_delay > 0 时先按空缺数发起探测，每等待该秒数仍无结果再追加一路（对冲），
+    否则直接并发到上限。协议分配规则与串行版一致：先满足各协议配额，候选耗尽后用其他协议的通过者补足。
+
+    探测提交到进程内共享的有界线程池（pick_validate_pool_size），单个请求的在途探测不超过
+    pick_validate_concurrency；返回时取消尚未开始的探测。
+    """
+    total = len(protocol_allocation)
+    open_slots = Counter(protocol_allocation)
+    limit = max(1, int(settings.pick_validate_concurrency))
+    hedge_delay = float(settings.pick_hedge_delay)
+    target = min(limit, total) if hedge_delay > 0 else limit
+
+    queue = list(candidates)
+    selected: list[dict] = []
+    spares: list[dict] = []
+    in_flight: dict = {}
+    in_flight_protocols: Counter = Counter()
+    executor = _get_validate_pool(settings)
+    try:
+        while len(selected) < total:
+            while queue and len(in_flight) < target:
+                candidate = _next_candidate(queue, open_slots, in_flight_protocols)
+                future = executor.submit(_validate_candidate, candidate, settings, check_url, cache)
+                in_flight[future] = candidate
+                in_flight_protocols[candidate.get("protocol")] += 1
+            if not in_flight:
+                break
+
+            done, _pending = wait(
+                list(in_flight),
+                timeout=hedge_delay if hedge_delay > 0 else None,
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                # 在途探测均未返回：追加一路对冲
+                target = min(limit, target + 1)
+                continue
+
+            for future in done:
+                candidate = in_flight.pop(future)
+                in_flight_protocols[candidate.get("protocol")] -= 1
+                try:
+                    checked = future.result()
+                except Exception:
+                    checked = None
+                if not checked:
+                    continue
+                protocol = checked.get("protocol")
+                if open_slots.get(protocol, 0) > 0 and len(selected) < total:
+                    open_slots[protocol] -= 1
+                    selected.append(checked)
+                else:
+                    spares.append(checked)
+
+            # 剩余候选（含在途）已无法填补协议空缺时，用其他协议的通过者补足
+            if not any(open_slots.get(c.get("protocol"), 0) > 0 for c in chain(queue, in_flight.values())):
+                while spares and len(selected) < total:
+                    selected.append(spares.pop(0))
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+    return selected
+
+
 def _pick_candidates(
     candidates: list[dict],
     protocol_allocation: Sequence[str],
     require_check: bool,
     settings: Settings,
     check_url: Optional[str],
+    cache=None,
 ) -> list[dict]:
+    if require_check and settings.pick_validate_concurrency > 1:
+        return _pick_candidates_parallel(candidates, protocol_allocation, settings, check_url, cache)
+
     pools: dict[str, list[dict]] = {protocol: [] for protocol in set(protocol_allocation)}
     extras: list[dict] = []
     for candidate in candidates:
@@ -146,7 +393,7 @@ def _pick_candidates(
             if not require_check:
                 selected.append(candidate)
                 break
-            checked = _validate_candidate(candidate, settings, check_url)
+            checked = _validate_candidate(candidate, settings, check_url, cache)
             if checked:
                 selected.append(checked)
                 break
@@ -161,7 +408,7 @@ def _pick_candidates(
             if not require_check:
                 selected.append(candidate)
                 continue
-            checked = _validate_candidate(candidate, settings, check_url)
+            checked = _validate_candidate(candidate, settings, check_url, cache)
             if checked:
                 selected.append(checked)
 
@@ -177,6 +424,8 @@ def pick_proxies(
     require_check: bool = True,
     redis_client=None,
     mysql_conn=None,
+    use_ready_pool: bool = True,
+    use_cache: bool = True,
 ) -> dict:
     if count <= 0:
         return {"status": "empty", "data": []}
@@ -192,6 +441,20 @@ def pick_proxies(
     protocol_set = set(protocol_pool)
     country_filter = [country for country in (countries or []) if country]
 
+    # 预验证热池命中时直接返回，不连接 MySQL、不在线探测；
+    # 热池按默认目标验证，指定 check_url 时必须在线验证
+    if use_ready_pool and require_check and settings.warmer_enabled and not check_url:
+        if redis_client is None:
+            redis_client = get_redis_client(settings)
+        try:
+            ready = _fetch_ready_candidates(
+                redis_client, protocol_allocation, country_filter, with_meta=settings.redis_meta_enabled
+            )
+        except Exception:
+            ready = None
+        if ready:
+            return {"status": "ok", "data": ready[0] if count == 1 else ready}
+
     status = "ok"
     messages: list[str] = []
     candidates: list[dict] = []
@@ -205,15 +468,27 @@ def pick_proxies(
             redis_client = get_redis_client(settings)
 
         try:
-            candidates = _fetch_redis_candidates(redis_client, max(count * 5, 20))
+            if settings.redis_index_enabled:
+                index_keys = _index_keys_for(protocol_pool, country_filter)
+                candidates = _fetch_redis_index_candidates(redis_client, index_keys, max(count * 5, 20))
+            elif settings.redis_meta_enabled:
+                candidates = _fetch_redis_candidates_with_meta(redis_client, max(count * 5, 20))
+            else:
+                candidates = _fetch_redis_candidates(redis_client, max(count * 5, 20))
         except Exception:
             messages.append("redis_unavailable")
             candidates = []
 
         candidates = [candidate for candidate in candidates if candidate["protocol"] in protocol_set]
 
-        if country_filter:
-            filtered = _filter_candidates_by_countries(mysql_conn, candidates, country_filter)
+        # 二级索引取回的候选已按国家过滤
+        if country_filter and not settings.redis_index_enabled:
+            if settings.redis_meta_enabled:
+                filtered = _filter_candidates_by_meta(candidates, country_filter)
+            else:
+                filtered = _filter_candidates_by_countries(
+                    mysql_conn, candidates, country_filter, compact_keys=settings.mysql_compact_keys
+                )
             if filtered:
                 candidates = filtered
             else:
@@ -252,7 +527,9 @@ def pick_proxies(
         if status == "not_found_country_fallback":
             random.shuffle(candidates)
 
-        selected = _pick_candidates(candidates, protocol_allocation, require_check, settings, check_url)
+        # use_cache=False 时每个候选都实际探测（预热热池要求结果是刚验证的）
+        cache = get_validation_cache(settings, redis_client) if require_check and use_cache else None
+        selected = _pick_candidates(candidates, protocol_allocation, require_check, settings, check_url, cache)
 
         if not selected:
             if messages:
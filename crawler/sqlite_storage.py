@@ -0,0 +1,541 @@
+"""
+嵌入式 SQLite 存储后端（STORAGE_BACKEND=sqlite），面向单机小规模代理池。
+
+- 与 crawler.storage 中同名函数签名、返回值一致，由 storage 按连接类型分派
+- WAL 模式：读写互不阻塞，多个进程（run / check / API）可共享同一数据库文件
+- 连接包装成 pymysql 风格（%s 占位符、cursor 上下文），可移植的 SQL 无需改写
+- 时间统一存本地时间，与 MySQL 会话时钟及 apply_fail_window 的 datetime.now() 一致
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from functools import lru_cache
+import ipaddress
+from pathlib import Path
+import sqlite3
+from typing import Any, Callable, Optional, TypeVar
+
+from crawler.config import Settings
+from crawler.storage import (
+    ARCHIVE_CHUNK_SIZE,
+    CHECK_UPDATE_CHUNK_SIZE,
+    UPSERT_CHUNK_SIZE,
+    _ARCHIVE_COLUMNS,
+    _PICK_COLUMNS,
+)
+
+
+T = TypeVar("T")
+
+_NOW = "datetime('now', 'localtime')"
+_SCHEMA_PATH = Path(__file__).resolve().parents[1] / "sql" / "schema_sqlite.sql"
+
+
+def _adapt_datetime(value: datetime) -> str:
+    return value.isoformat(" ", "seconds")
+
+
+def _convert_datetime(raw: bytes) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(raw.decode("utf-8"))
+    except ValueError:
+        return None
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+
+@lru_cache(maxsize=256)
+def _translate(query: str) -> str:
+    # pymysql 风格 SQL 转 SQLite：%s -> ?，%% -> %，CURRENT_TIMESTAMP -> 本地时间
+    return query.replace("%s", "?").replace("%%", "%").replace("CURRENT_TIMESTAMP", _NOW)
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+
+    def execute(self, query: str, params=None):
+        return self._cursor.execute(_translate(query), tuple(params or ()))
+
+    def executemany(self, query: str, seq_of_params):
+        return self._cursor.executemany(_translate(query), [tuple(params) for params in seq_of_params])
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    def close(self) -> None:
+        self._cursor.close()
+
+    def __enter__(self) -> "SQLiteCursor":
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb) -> None:
+        self.close()
+
+
+class SQLiteConnection:
+    """pymysql 风格的 SQLite 连接：默认自动提交，begin/commit/rollback 显式控制事务"""
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = sqlite3.connect(
+            path,
+            timeout=timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL 下 NORMAL 只在检查点同步，掉电最多丢最近事务，不会损坏数据库
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    @property
+    def raw(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise sqlite3.ProgrammingError("sqlite connection is closed")
+        return self._conn
+
+    @property
+    def open(self) -> bool:
+        return self._conn is not None
+
+    def cursor(self) -> SQLiteCursor:
+        return SQLiteCursor(self.raw.cursor())
+
+    def begin(self) -> None:
+        # IMMEDIATE：开始即取写锁，避免事务中途升级锁失败
+        self.raw.execute("BEGIN IMMEDIATE")
+
+    def commit(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def ping(self, reconnect: bool = False) -> None:
+        return None
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "SQLiteConnection":
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb) -> None:
+        self.close()
+
+
+def open_sqlite_connection(settings: Settings) -> SQLiteConnection:
+    path = settings.sqlite_path
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = SQLiteConnection(path, timeout=settings.sqlite_busy_timeout)
+    conn.raw.executescript(_SCHEMA_PATH.read_text(encoding="utf-8"))
+    return conn
+
+
+def _in_transaction(conn: SQLiteConnection, runner: Callable[[SQLiteCursor], T]) -> T:
+    # 批量写入放进一个事务，只提交一次
+    conn.begin()
+    try:
+        with conn.cursor() as cursor:
+            result = runner(cursor)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _row_values(count: int, width: int) -> str:
+    row = "(" + ", ".join(["?"] * width) + ")"
+    return ", ".join([row] * count)
+
+
+def upsert_source(conn: SQLiteConnection, name: str, url: str, parser_key: str) -> int:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO proxy_sources (name, url, parser_key)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (name) DO UPDATE SET url=excluded.url, parser_key=excluded.parser_key
+            """,
+            (name, url, parser_key),
+        )
+        cursor.execute("SELECT id FROM proxy_sources WHERE name=%s", (name,))
+        return int(cursor.fetchone()[0])
+
+
+_UPSERT_PROXY_SQL = """
+    INSERT INTO proxy_ips (ip, port, protocol, anonymity, country, source_id)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON CONFLICT (ip, port, protocol) DO UPDATE SET
+      anonymity=excluded.anonymity,
+      country=excluded.country,
+      source_id=excluded.source_id,
+      last_seen_at=CURRENT_TIMESTAMP,
+      is_deleted=0,
+      fail_window_start=NULL,
+      fail_count=0
+"""
+
+
+def upsert_proxy(
+    conn: SQLiteConnection,
+    ip: str,
+    port: int,
+    protocol: str,
+    anonymity: Optional[str],
+    country: Optional[str],
+    source_id: Optional[int],
+) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(_UPSERT_PROXY_SQL, (ip, port, protocol, anonymity, country, source_id))
+
+
+def _rehydrate_archived(cursor: SQLiteCursor, keys: list[tuple]) -> int:
+    if not keys:
+        return 0
+    columns = ", ".join(_ARCHIVE_COLUMNS)
+    key_rows = _row_values(len(keys), 3)
+    params = [value for key in keys for value in key]
+    cursor.execute(
+        f"""
+        INSERT OR IGNORE INTO proxy_ips ({columns})
+        SELECT {columns} FROM proxy_ips_archive
+        WHERE (ip, port, protocol) IN (VALUES {key_rows})
+        """,
+        params,
+    )
+    restored = cursor.rowcount or 0
+    if restored > 0:
+        cursor.execute(f"DELETE FROM proxy_ips_archive WHERE (ip, port, protocol) IN (VALUES {key_rows})", params)
+    return restored
+
+
+def upsert_proxies(
+    conn: SQLiteConnection,
+    records: list[dict],
+    source_id: Optional[int],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+    rehydrate: bool = False,
+) -> int:
+    rows = [
+        (
+            record["ip"],
+            int(record["port"]),
+            record["protocol"],
+            record.get("anonymity"),
+            record.get("country"),
+            source_id,
+        )
+        for record in records
+    ]
+    if not rows:
+        return 0
+    size = max(1, int(chunk_size))
+
+    def runner(cursor):
+        for start in range(0, len(rows), size):
+            chunk = rows[start : start + size]
+            if rehydrate:
+                _rehydrate_archived(cursor, [row[:3] for row in chunk])
+            cursor.executemany(_UPSERT_PROXY_SQL, chunk)
+
+    _in_transaction(conn, runner)
+    return len(rows)
+
+
+# TIMESTAMPDIFF(HOUR, a, b) >= n 等价于实际小时差 >= n
+_WINDOW_EXPIRED = f"(julianday({_NOW}) - julianday(fail_window_start)) * 24 >= ?"
+
+# SQLite 的 SET 右侧一律读取更新前的行，fail_count 基于旧窗口判断
+_CHECK_SQL = f"""
+    UPDATE proxy_ips
+    SET is_alive=?,
+        latency_ms=?,
+        anonymity=COALESCE(?, anonymity),
+        last_checked_at={_NOW},
+        fail_window_start=CASE
+            WHEN ?=1 THEN NULL
+            WHEN fail_window_start IS NULL THEN {_NOW}
+            WHEN {_WINDOW_EXPIRED} THEN {_NOW}
+            ELSE fail_window_start
+        END,
+        fail_count=CASE
+            WHEN ?=1 THEN 0
+            WHEN fail_window_start IS NULL THEN 1
+            WHEN {_WINDOW_EXPIRED} THEN 1
+            ELSE fail_count + 1
+        END
+    WHERE ip=? AND port=? AND protocol=?
+"""
+
+
+def _check_params(ip, port, protocol, alive_int, latency_ms, anonymity, window_hours) -> tuple:
+    return (alive_int, latency_ms, anonymity, alive_int, window_hours, alive_int, window_hours, ip, port, protocol)
+
+
+def update_proxy_check(
+    conn: SQLiteConnection,
+    ip: str,
+    port: int,
+    protocol: str,
+    is_alive: bool,
+    latency_ms: int,
+    window_hours: int,
+    anonymity: Optional[str] = None,
+) -> None:
+    alive_int = 1 if is_alive else 0
+    conn.raw.execute(_CHECK_SQL, _check_params(ip, port, protocol, alive_int, latency_ms, anonymity, window_hours))
+
+
+def update_proxy_checks(
+    conn: SQLiteConnection,
+    results: list[tuple[str, int, str, bool, int, Optional[str]]],
+    window_hours: int,
+    chunk_size: int = CHECK_UPDATE_CHUNK_SIZE,
+) -> int:
+    latest: dict[tuple, tuple] = {}
+    for ip, port, protocol, is_alive, latency_ms, anonymity in results:
+        key = (ip, int(port), protocol)
+        latest[key] = _check_params(ip, int(port), protocol, 1 if is_alive else 0, latency_ms, anonymity, window_hours)
+    if not latest:
+        return 0
+    rows = list(latest.values())
+    # 进程内无网络往返，chunk_size 仅为接口兼容保留；一个事务内 executemany 即可
+    _in_transaction(conn, lambda cursor: cursor.executemany(_CHECK_SQL, rows))
+    return len(rows)
+
+
+def fetch_check_batch(
+    conn: SQLiteConnection,
+    batch_size: int,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> list:
+    # SQLite 升序同样 NULL 在前，从未检测过的代理优先
+    shard_clause = ""
+    params: list = []
+    if shard_count > 1:
+        shard_clause = "AND id % ? = ?"
+        params.extend((int(shard_count), int(shard_index)))
+    params.append(batch_size)
+    return conn.raw.execute(
+        f"""
+        SELECT id, ip, port, protocol, fail_window_start, fail_count, country, anonymity
+        FROM proxy_ips
+        WHERE is_deleted=0 {shard_clause}
+        ORDER BY last_checked_at ASC, id ASC
+        LIMIT ?
+        """,
+        params,
+    ).fetchall()
+
+
+_CHECK_WINDOW_SQL = f"""
+    UPDATE proxy_ips
+    SET is_alive=?,
+        latency_ms=?,
+        last_checked_at={_NOW},
+        fail_window_start=?,
+        fail_count=?,
+        is_deleted=?
+    WHERE id=?
+"""
+
+
+def update_proxy_check_with_window(
+    conn: SQLiteConnection,
+    proxy_id: int,
+    is_alive: bool,
+    latency_ms: int,
+    fail_window_start: Optional[datetime],
+    fail_count: int,
+    is_deleted: bool,
+) -> None:
+    conn.raw.execute(
+        _CHECK_WINDOW_SQL,
+        (1 if is_alive else 0, latency_ms, fail_window_start, fail_count, 1 if is_deleted else 0, proxy_id),
+    )
+
+
+def update_proxy_checks_with_window(
+    conn: SQLiteConnection,
+    results: list[tuple[int, bool, int, Optional[datetime], int, bool]],
+    chunk_size: int = CHECK_UPDATE_CHUNK_SIZE,
+) -> int:
+    latest: dict[int, tuple] = {}
+    for proxy_id, is_alive, latency_ms, fail_window_start, fail_count, is_deleted in results:
+        latest[int(proxy_id)] = (
+            1 if is_alive else 0,
+            latency_ms,
+            fail_window_start,
+            fail_count,
+            1 if is_deleted else 0,
+            int(proxy_id),
+        )
+    if not latest:
+        return 0
+    rows = list(latest.values())
+    _in_transaction(conn, lambda cursor: cursor.executemany(_CHECK_WINDOW_SQL, rows))
+    return len(rows)
+
+
+def archive_deleted_proxies(
+    conn: SQLiteConnection,
+    older_than_hours: int,
+    chunk_size: int = ARCHIVE_CHUNK_SIZE,
+    max_chunks: Optional[int] = None,
+) -> int:
+    size = max(1, int(chunk_size))
+    columns = ", ".join(_ARCHIVE_COLUMNS)
+    refresh = ", ".join(f"{column}=excluded.{column}" for column in _ARCHIVE_COLUMNS[3:])
+    cutoff = f"-{int(older_than_hours)} hours"
+
+    def move_chunk(cursor) -> tuple[int, int]:
+        ids = [
+            row[0]
+            for row in cursor.execute(
+                f"""
+                SELECT id FROM proxy_ips
+                WHERE is_deleted=1 AND last_checked_at < datetime('now', 'localtime', ?)
+                ORDER BY last_checked_at ASC, id ASC
+                LIMIT ?
+                """,
+                (cutoff, size),
+            ).fetchall()
+        ]
+        if not ids:
+            return 0, 0
+        id_list = ", ".join(["?"] * len(ids))
+        cursor.execute(
+            f"""
+            INSERT INTO proxy_ips_archive ({columns}, archived_at)
+            SELECT {columns}, {_NOW} FROM proxy_ips
+            WHERE id IN ({id_list}) AND is_deleted=1
+            ON CONFLICT (ip, port, protocol) DO UPDATE SET {refresh}, archived_at={_NOW}
+            """,
+            ids,
+        )
+        cursor.execute(f"DELETE FROM proxy_ips WHERE id IN ({id_list}) AND is_deleted=1", ids)
+        return len(ids), cursor.rowcount or 0
+
+    moved = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        selected, deleted = _in_transaction(conn, move_chunk)
+        moved += deleted
+        chunks += 1
+        if selected < size:
+            break
+    return moved
+
+
+def fetch_proxy_countries(
+    conn: SQLiteConnection,
+    candidates: list[dict],
+    compact_keys: bool = False,
+) -> dict:
+    # SQLite 表无紧凑键列，compact_keys 忽略，统一按 (ip, port, protocol) 匹配
+    if not candidates:
+        return {}
+    keys = [(candidate["ip"], candidate["port"], candidate["protocol"]) for candidate in candidates]
+    rows = conn.raw.execute(
+        f"SELECT ip, port, protocol, country FROM proxy_ips WHERE (ip, port, protocol) IN (VALUES {_row_values(len(keys), 3)})",
+        [value for key in keys for value in key],
+    ).fetchall()
+    return {(row[0], row[1], row[2]): row[3] for row in rows}
+
+
+def fetch_proxies_in_subnet(
+    conn: SQLiteConnection,
+    cidr: str,
+    alive_only: bool = True,
+    limit: int = 1000,
+) -> list[dict]:
+    # 单机小池直接在 Python 侧按网段过滤
+    network = ipaddress.ip_network(cidr, strict=False)
+    alive_clause = " AND is_alive=1" if alive_only else ""
+    rows = conn.raw.execute(
+        f"SELECT ip, port, protocol, country, latency_ms FROM proxy_ips WHERE is_deleted=0{alive_clause}"
+    ).fetchall()
+    matched = []
+    for row in rows:
+        try:
+            address = ipaddress.ip_address(row[0])
+        except ValueError:
+            continue
+        if address.version == network.version and address in network:
+            matched.append((address, row))
+    matched.sort(key=lambda item: (item[0], item[1][1]))
+    return [dict(zip(_PICK_COLUMNS, row)) for _address, row in matched[:limit]]
+
+
+def fetch_mysql_candidates(
+    conn: SQLiteConnection,
+    protocols: list[str],
+    countries: Optional[list[str]],
+    limit: int,
+) -> list[dict]:
+    """
+    与 MySQL 版排序一致：有延迟的按延迟升序，不足时补无延迟记录。
+
+    SQLite 复合查询的分支不支持各自 ORDER BY / LIMIT，这里逐分支查询后在内存归并。
+    """
+    if not protocols or limit <= 0:
+        return []
+
+    if countries:
+        groups = [("protocol=? AND country=?", (protocol, country)) for protocol in protocols for country in countries]
+    else:
+        groups = [("protocol=?", (protocol,)) for protocol in protocols]
+
+    def collect(latency_clause: str, order_by: str, rows_needed: int, sort_key: Callable[[tuple], Any]) -> list[dict]:
+        rows: list[tuple] = []
+        for group_clause, group_params in groups:
+            rows.extend(
+                conn.raw.execute(
+                    "SELECT ip, port, protocol, country, latency_ms, last_checked_at "
+                    "FROM proxy_ips "
+                    f"WHERE is_deleted=0 AND is_alive=1 AND {group_clause} AND {latency_clause} "
+                    f"ORDER BY {order_by} LIMIT ?",
+                    (*group_params, rows_needed),
+                ).fetchall()
+            )
+        rows.sort(key=sort_key)
+        return [dict(zip(_PICK_COLUMNS, row)) for row in rows[:rows_needed]]
+
+    def checked_desc(row: tuple) -> float:
+        return -(row[5].timestamp() if row[5] else float("-inf"))
+
+    rows = collect(
+        "latency_ms IS NOT NULL",
+        "latency_ms ASC, last_checked_at DESC",
+        limit,
+        lambda row: (row[4], checked_desc(row)),
+    )
+    if len(rows) < limit:
+        rows.extend(collect("latency_ms IS NULL", "last_checked_at DESC", limit - len(rows), checked_desc))
+    return rows
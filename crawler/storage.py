@@ -1,5 +1,10 @@
+from dataclasses import dataclass
 from datetime import datetime
+import functools
+import ipaddress
 from pathlib import Path
+import threading
+import time
 from typing import Any, Callable, Optional, TypeVar
 
 import pymysql
@@ -9,11 +14,101 @@ from crawler.config import Settings
 
 T = TypeVar("T")
 
+ALIVE_POOL_KEY = "proxy:alive"
+# 存活代理元数据：单个 hash，field 为 ip:port:protocol，value 为 country|anonymity|latency_ms|checked_at
+PROXY_META_KEY = "proxy:meta"
+# 存活代理最近一次验证成功的时间：成员同 proxy:alive，score 为 unix 秒，供 sweep_stale_proxies 按 TTL 清理
+PROXY_CHECKED_KEY = "proxy:checked"
+
 
 def make_redis_key(ip: str, port: int, protocol: str) -> str:
     return f"{ip}:{port}:{protocol}"
 
 
+# 存活池二级索引：proxy:alive:{protocol} 与 proxy:alive:{protocol}:{country}，成员与分数同 proxy:alive
+def protocol_index_key(protocol: str) -> str:
+    return f"{ALIVE_POOL_KEY}:{protocol.lower()}"
+
+
+def country_index_key(protocol: str, country: str) -> str:
+    return f"{ALIVE_POOL_KEY}:{protocol.lower()}:{country.strip().lower()}"
+
+
+# 预验证热池：proxy:ready:{protocol}[:{country}]，score 为过期时间（unix 秒），由 crawler.warmer 维护
+READY_POOL_PREFIX = "proxy:ready"
+
+
+def ready_pool_key(protocol: str, country: Optional[str] = None) -> str:
+    key = f"{READY_POOL_PREFIX}:{protocol.lower()}"
+    if country and country.strip():
+        key = f"{key}:{country.strip().lower()}"
+    return key
+
+
+def _alive_index_keys(protocol: str, country: Optional[str]) -> list[str]:
+    keys = [protocol_index_key(protocol)]
+    if country and country.strip():
+        keys.append(country_index_key(protocol, country))
+    return keys
+
+
+# 紧凑表示：与紧凑键迁移中 protocol_id / ip_bin / proxy_key 生成列的表达式保持一致
+PROTOCOL_IDS = {"http": 1, "https": 2, "socks4": 3, "socks5": 4, "socks4a": 5}
+PROTOCOL_NAMES = {value: key for key, value in PROTOCOL_IDS.items()}
+
+
+def protocol_to_id(protocol: str) -> int:
+    """协议名转 TINYINT 编号，未知协议为 0"""
+    return PROTOCOL_IDS.get(str(protocol or "").lower(), 0)
+
+
+def id_to_protocol(protocol_id: int) -> Optional[str]:
+    return PROTOCOL_NAMES.get(int(protocol_id))
+
+
+def ip_to_bytes(ip: str) -> bytes:
+    """与 MySQL INET6_ATON 一致：IPv4 为 4 字节，IPv6 为 16 字节"""
+    return ipaddress.ip_address(ip).packed
+
+
+def bytes_to_ip(raw: bytes) -> str:
+    return str(ipaddress.ip_address(bytes(raw)))
+
+
+def make_proxy_key(ip: str, port: int, protocol: str) -> Optional[int]:
+    """
+    IPv4 代理的数值复合键：(ip << 24) | (port << 8) | protocol_id。
+
+    IPv6、未知协议或端口超出 0-65535 时无法编码，返回 None（对应数据库中 proxy_key 为 NULL）。
+    """
+    protocol_id = protocol_to_id(protocol)
+    port = int(port)
+    if not protocol_id or not 0 <= port <= 0xFFFF:
+        return None
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.version != 4:
+        return None
+    return (int(address) << 24) | (port << 8) | protocol_id
+
+
+def parse_proxy_key(proxy_key: int) -> tuple[str, int, Optional[str]]:
+    proxy_key = int(proxy_key)
+    return (
+        str(ipaddress.IPv4Address(proxy_key >> 24)),
+        (proxy_key >> 8) & 0xFFFF,
+        id_to_protocol(proxy_key & 0xFF),
+    )
+
+
+def subnet_bounds(cidr: str) -> tuple[bytes, bytes]:
+    """网段对应的 ip_bin 闭区间，用于 ip_bin BETWEEN 范围查询"""
+    network = ipaddress.ip_network(cidr, strict=False)
+    return network.network_address.packed, network.broadcast_address.packed
+
+
 def _load_schema() -> str:
     """加载 schema.sql 文件内容"""
     schema_path = Path(__file__).resolve().parent.parent / "sql" / "schema.sql"
@@ -94,8 +189,8 @@ def _run_with_schema_retry(
         raise
 
 
-def get_mysql_connection(settings: Settings) -> pymysql.connections.Connection:
-    """获取 MySQL 连接，如果数据库/表不存在则自动初始化"""
+def _open_mysql_connection(settings: Settings) -> pymysql.connections.Connection:
+    """新建 MySQL 连接，如果数据库/表不存在则自动初始化"""
     try:
         return pymysql.connect(
             host=settings.mysql_host,
@@ -122,6 +217,175 @@ def get_mysql_connection(settings: Settings) -> pymysql.connections.Connection:
         raise
 
 
+class PooledConnection:
+    """
+    从连接池借出的连接：其余属性透传给底层 pymysql 连接，close() 归还连接池而非断开。
+    """
+
+    def __init__(self, pool: "MySQLConnectionPool", conn: pymysql.connections.Connection):
+        self._pool = pool
+        self._conn: Optional[pymysql.connections.Connection] = conn
+
+    @property
+    def raw(self) -> pymysql.connections.Connection:
+        if self._conn is None:
+            raise pymysql.err.InterfaceError(0, "connection already returned to pool")
+        return self._conn
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.raw, name)
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, _exc_type, _exc, _tb) -> None:
+        self.close()
+
+
+class MySQLConnectionPool:
+    """
+    线程安全的 MySQL 连接池。
+
+    - 空闲连接后进先出复用，超过 ping_interval 秒未用的连接借出前先 ping（必要时重连）
+    - 总连接数不超过 max_size，借满时最多等待 timeout 秒
+    - 归还时已断开的连接直接丢弃，由后续借用按需补建
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], pymysql.connections.Connection],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        ping_interval: float = 30.0,
+    ):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.min_size = min(max(0, int(min_size)), self.max_size)
+        self.timeout = max(0.0, float(timeout))
+        self.ping_interval = max(0.0, float(ping_interval))
+        self._idle: list[tuple[pymysql.connections.Connection, float]] = []
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        for _ in range(self.min_size):
+            conn = self._connect()
+            self._idle.append((conn, time.monotonic()))
+            self._total += 1
+
+    def acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise pymysql.err.InterfaceError(0, "mysql connection pool is closed")
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._total < self.max_size:
+                    # 先占位再在锁外建连，避免建连期间阻塞其他线程
+                    self._total += 1
+                    conn, last_used = None, 0.0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise pymysql.err.OperationalError(2003, "mysql connection pool exhausted")
+                self._cond.wait(remaining)
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif time.monotonic() - last_used >= self.ping_interval:
+                conn.ping(reconnect=True)
+        except Exception:
+            self._discard(conn)
+            raise
+        return PooledConnection(self, conn)
+
+    def release(self, conn: pymysql.connections.Connection) -> None:
+        with self._cond:
+            if not self._closed and getattr(conn, "open", True):
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    def _discard(self, conn: Optional[pymysql.connections.Connection]) -> None:
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for conn, _last_used in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {"total": self._total, "idle": len(self._idle), "in_use": self._total - len(self._idle)}
+
+
+_mysql_pools: dict[tuple, MySQLConnectionPool] = {}
+_mysql_pools_lock = threading.Lock()
+
+
+def get_mysql_pool(settings: Settings) -> MySQLConnectionPool:
+    """按连接参数共享连接池，同一进程内的 API、日志与存储函数复用同一组连接"""
+    key = (settings.mysql_host, settings.mysql_port, settings.mysql_user, settings.mysql_database)
+    with _mysql_pools_lock:
+        pool = _mysql_pools.get(key)
+        if pool is None:
+            pool = MySQLConnectionPool(
+                lambda: _open_mysql_connection(settings),
+                min_size=settings.mysql_pool_min_size,
+                max_size=settings.mysql_pool_max_size,
+                timeout=settings.mysql_pool_timeout,
+                ping_interval=settings.mysql_pool_ping_interval,
+            )
+            _mysql_pools[key] = pool
+        return pool
+
+
+def close_mysql_pools() -> None:
+    with _mysql_pools_lock:
+        pools = list(_mysql_pools.values())
+        _mysql_pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+def get_mysql_connection(settings: Settings):
+    """
+    获取存储连接；启用连接池时返回借出的连接，调用方 close() 即归还。
+
+    STORAGE_BACKEND=sqlite 时返回嵌入式 SQLite 连接，本模块的存储函数按连接类型自动分派。
+    """
+    if settings.storage_backend == "sqlite":
+        from crawler.sqlite_storage import open_sqlite_connection
+
+        return open_sqlite_connection(settings)
+    if settings.mysql_pool_enabled:
+        return get_mysql_pool(settings).acquire()
+    return _open_mysql_connection(settings)
+
+
 def get_redis_client(settings: Settings) -> redis.Redis:
     return redis.Redis(
         host=settings.redis_host,
@@ -135,12 +399,30 @@ def get_redis_client(settings: Settings) -> redis.Redis:
 _settings_for_retry: Optional[Settings] = None
 
 
+def is_sqlite_connection(conn: Any) -> bool:
+    return getattr(conn, "backend", None) == "sqlite"
+
+
+def _dispatch_backend(func: Callable[..., T]) -> Callable[..., T]:
+    # SQL 方言相关的函数：SQLite 连接改由 crawler.sqlite_storage 中的同名实现处理
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        if is_sqlite_connection(conn):
+            from crawler import sqlite_storage
+
+            return getattr(sqlite_storage, func.__name__)(conn, *args, **kwargs)
+        return func(conn, *args, **kwargs)
+
+    return wrapper
+
+
 def set_settings_for_retry(settings: Settings) -> None:
     """设置用于重试时的 Settings"""
     global _settings_for_retry
     _settings_for_retry = settings
 
 
+@_dispatch_backend
 def upsert_source(conn: pymysql.connections.Connection, name: str, url: str, parser_key: str) -> int:
     def runner(cursor):
         cursor.execute(
@@ -158,6 +440,7 @@ def upsert_source(conn: pymysql.connections.Connection, name: str, url: str, par
     return _run_with_schema_retry(conn, _settings_for_retry, runner)
 
 
+@_dispatch_backend
 def upsert_proxy(
     conn: pymysql.connections.Connection,
     ip: str,
@@ -187,6 +470,62 @@ def upsert_proxy(
     _run_with_schema_retry(conn, _settings_for_retry, runner)
 
 
+UPSERT_CHUNK_SIZE = 1000
+CHECK_UPDATE_CHUNK_SIZE = 500
+
+
+@_dispatch_backend
+def upsert_proxies(
+    conn: pymysql.connections.Connection,
+    records: list[dict],
+    source_id: Optional[int],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+    rehydrate: bool = False,
+) -> int:
+    # 批量入库：按块拼接多行 VALUES，每块一次往返，语义与 upsert_proxy 一致
+    # rehydrate=True 时先把归档表中被重新列出的代理搬回热表，保留其历史字段
+    rows = [
+        (
+            record["ip"],
+            int(record["port"]),
+            record["protocol"],
+            record.get("anonymity"),
+            record.get("country"),
+            source_id,
+        )
+        for record in records
+    ]
+    if not rows:
+        return 0
+    size = max(1, int(chunk_size))
+
+    def runner(cursor):
+        for start in range(0, len(rows), size):
+            chunk = rows[start : start + size]
+            if rehydrate:
+                _rehydrate_archived(cursor, [row[:3] for row in chunk])
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))
+            cursor.execute(
+                f"""
+                INSERT INTO proxy_ips (ip, port, protocol, anonymity, country, source_id)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                  anonymity=VALUES(anonymity),
+                  country=VALUES(country),
+                  source_id=VALUES(source_id),
+                  last_seen_at=CURRENT_TIMESTAMP,
+                  is_deleted=0,
+                  fail_window_start=NULL,
+                  fail_count=0
+                """,
+                [value for row in chunk for value in row],
+            )
+
+    _run_with_schema_retry(conn, _settings_for_retry, runner)
+    return len(rows)
+
+
+@_dispatch_backend
 def update_proxy_check(
     conn: pymysql.connections.Connection,
     ip: str,
@@ -195,15 +534,18 @@ def update_proxy_check(
     is_alive: bool,
     latency_ms: int,
     window_hours: int,
+    anonymity: Optional[str] = None,
 ) -> None:
     alive_int = 1 if is_alive else 0
 
     def runner(cursor):
+        # anonymity 为空时保留来源提供的值，仅在 Judge 实测后覆盖
         cursor.execute(
             """
             UPDATE proxy_ips
             SET is_alive=%s,
                 latency_ms=%s,
+                anonymity=COALESCE(%s, anonymity),
                 last_checked_at=CURRENT_TIMESTAMP,
                 fail_window_start=CASE
                     WHEN %s=1 THEN NULL
@@ -219,29 +561,120 @@ def update_proxy_check(
                 END
             WHERE ip=%s AND port=%s AND protocol=%s
             """,
-            (alive_int, latency_ms, alive_int, window_hours, alive_int, window_hours, ip, port, protocol),
+            (alive_int, latency_ms, anonymity, alive_int, window_hours, alive_int, window_hours, ip, port, protocol),
         )
 
     _run_with_schema_retry(conn, _settings_for_retry, runner)
 
 
-def fetch_check_batch(conn: pymysql.connections.Connection, batch_size: int) -> list[dict]:
+@_dispatch_backend
+def update_proxy_checks(
+    conn: pymysql.connections.Connection,
+    results: list[tuple[str, int, str, bool, int, Optional[str]]],
+    window_hours: int,
+    chunk_size: int = CHECK_UPDATE_CHUNK_SIZE,
+) -> int:
+    """
+    批量写回验证结果，语义与逐条 update_proxy_check 一致。
+
+    results 中每项为 (ip, port, protocol, is_alive, latency_ms, anonymity)；同一代理以最后一条为准。
+    每块先按唯一键 uq_proxy_ips 查出 id，再执行一条 UPDATE ... CASE id（与 update_proxy_checks_with_window 一致）；
+    不存在的代理（已归档或删除）直接跳过，不会插入新行、消耗自增 id 或加插入意向锁。返回实际更新的代理数。
+    """
+    latest: dict[tuple, tuple] = {}
+    for ip, port, protocol, is_alive, latency_ms, anonymity in results:
+        latest[(ip, int(port), str(protocol).lower())] = (1 if is_alive else 0, latency_ms, anonymity)
+    if not latest:
+        return 0
+    items = list(latest.items())
+    size = max(1, int(chunk_size))
+
     def runner(cursor):
+        updated = 0
+        for start in range(0, len(items), size):
+            chunk = items[start : start + size]
+            cursor.execute(
+                f"""
+                SELECT id, ip, port, protocol FROM proxy_ips
+                WHERE (ip, port, protocol) IN ({", ".join(["(%s, %s, %s)"] * len(chunk))})
+                """,
+                [value for key, _values in chunk for value in key],
+            )
+            ids = {(row[1], int(row[2]), str(row[3]).lower()): row[0] for row in cursor.fetchall()}
+            found = [(ids[key], values) for key, values in chunk if key in ids]
+            if not found:
+                continue
+
+            when_clause = " ".join(["WHEN %s THEN %s"] * len(found))
+            params: list = []
+            for position in range(3):
+                for proxy_id, values in found:
+                    params.extend((proxy_id, values[position]))
+            params.extend((window_hours, window_hours))
+            params.extend(proxy_id for proxy_id, _values in found)
+            # 单表 UPDATE 的赋值从左到右求值：失败窗口按已更新的 is_alive 判断，顺序与 update_proxy_check 保持一致
+            cursor.execute(
+                f"""
+                UPDATE proxy_ips
+                SET is_alive=CASE id {when_clause} END,
+                    latency_ms=CASE id {when_clause} END,
+                    anonymity=COALESCE(CASE id {when_clause} END, anonymity),
+                    last_checked_at=CURRENT_TIMESTAMP,
+                    fail_window_start=CASE
+                        WHEN is_alive=1 THEN NULL
+                        WHEN fail_window_start IS NULL THEN CURRENT_TIMESTAMP
+                        WHEN TIMESTAMPDIFF(HOUR, fail_window_start, CURRENT_TIMESTAMP) >= %s THEN CURRENT_TIMESTAMP
+                        ELSE fail_window_start
+                    END,
+                    fail_count=CASE
+                        WHEN is_alive=1 THEN 0
+                        WHEN fail_window_start IS NULL THEN 1
+                        WHEN TIMESTAMPDIFF(HOUR, fail_window_start, CURRENT_TIMESTAMP) >= %s THEN 1
+                        ELSE fail_count + 1
+                    END
+                WHERE id IN ({", ".join(["%s"] * len(found))})
+                """,
+                params,
+            )
+            updated += len(found)
+        return updated
+
+    return _run_with_schema_retry(conn, _settings_for_retry, runner)
+
+
+@_dispatch_backend
+def fetch_check_batch(
+    conn: pymysql.connections.Connection,
+    batch_size: int,
+    shard_index: int = 0,
+    shard_count: int = 1,
+) -> list[dict]:
+    # MySQL 升序排序时 NULL 在前，从未检测过的代理自然优先；沿 idx_proxy_ips_check_queue 有序读取
+    # shard_count > 1 时只取 id % shard_count == shard_index 的行，多个检测进程各取互不相交的一份
+    def runner(cursor):
+        shard_clause = ""
+        params: list = []
+        if shard_count > 1:
+            # id 位于索引内，取模过滤在索引上完成，无需回表
+            shard_clause = "AND id %% %s = %s"
+            params.extend((int(shard_count), int(shard_index)))
+        params.append(batch_size)
         cursor.execute(
-            """
-            SELECT id, ip, port, protocol, fail_window_start, fail_count
+            f"""
+            SELECT id, ip, port, protocol, fail_window_start, fail_count, country, anonymity
             FROM proxy_ips
-            WHERE is_deleted=0
-            ORDER BY (last_checked_at IS NULL) DESC, last_checked_at ASC, id ASC
+            WHERE is_deleted=0 {shard_clause}
+            ORDER BY last_checked_at ASC, id ASC
             LIMIT %s
             """,
-            (batch_size,),
+            params,
         )
         return list(cursor.fetchall())
 
     return _run_with_schema_retry(conn, _settings_for_retry, runner)
 
 
+@_dispatch_backend
 def update_proxy_check_with_window(
     conn: pymysql.connections.Connection,
     proxy_id: int,
@@ -276,20 +709,566 @@ def update_proxy_check_with_window(
     _run_with_schema_retry(conn, _settings_for_retry, runner)
 
 
+_CHECK_UPDATE_COLUMNS = ("is_alive", "latency_ms", "fail_window_start", "fail_count", "is_deleted")
+
+
+@_dispatch_backend
+def update_proxy_checks_with_window(
+    conn: pymysql.connections.Connection,
+    results: list[tuple[int, bool, int, Optional[datetime], int, bool]],
+    chunk_size: int = CHECK_UPDATE_CHUNK_SIZE,
+) -> int:
+    """
+    批量回写检测结果，每块一条 UPDATE ... CASE id 语句。
+
+    results 中每项为 (proxy_id, is_alive, latency_ms, fail_window_start, fail_count, is_deleted)，
+    字段含义与 update_proxy_check_with_window 一致；同一 id 重复出现时以最后一条为准。
+    """
+    latest: dict[int, tuple] = {}
+    for proxy_id, is_alive, latency_ms, fail_window_start, fail_count, is_deleted in results:
+        latest[int(proxy_id)] = (
+            1 if is_alive else 0,
+            latency_ms,
+            fail_window_start,
+            fail_count,
+            1 if is_deleted else 0,
+        )
+    if not latest:
+        return 0
+    items = list(latest.items())
+    size = max(1, int(chunk_size))
+
+    def runner(cursor):
+        for start in range(0, len(items), size):
+            chunk = items[start : start + size]
+            when_clause = " ".join(["WHEN %s THEN %s"] * len(chunk))
+            assignments = ", ".join(f"{column}=CASE id {when_clause} END" for column in _CHECK_UPDATE_COLUMNS)
+            params: list = []
+            for position in range(len(_CHECK_UPDATE_COLUMNS)):
+                for proxy_id, values in chunk:
+                    params.extend((proxy_id, values[position]))
+            params.extend(proxy_id for proxy_id, _values in chunk)
+            cursor.execute(
+                f"""
+                UPDATE proxy_ips
+                SET {assignments},
+                    last_checked_at=CURRENT_TIMESTAMP
+                WHERE id IN ({", ".join(["%s"] * len(chunk))})
+                """,
+                params,
+            )
+
+    _run_with_schema_retry(conn, _settings_for_retry, runner)
+    return len(items)
+
+
+ARCHIVE_CHUNK_SIZE = 1000
+
+# 归档表与热表共有的列（不含自增 id 与紧凑键生成列）
+_ARCHIVE_COLUMNS = (
+    "ip",
+    "port",
+    "protocol",
+    "anonymity",
+    "country",
+    "region",
+    "isp",
+    "source_id",
+    "first_seen_at",
+    "last_seen_at",
+    "last_checked_at",
+    "latency_ms",
+    "is_alive",
+    "is_deleted",
+    "fail_window_start",
+    "fail_count",
+)
+
+
+def _rehydrate_archived(cursor, keys: list[tuple]) -> int:
+    """把归档表中命中 (ip, port, protocol) 的行搬回 proxy_ips，返回搬回行数"""
+    if not keys:
+        return 0
+    columns = ", ".join(_ARCHIVE_COLUMNS)
+    placeholders = ",".join(["(%s,%s,%s)"] * len(keys))
+    params = [value for key in keys for value in key]
+    # 归档表通常为空命中，INSERT ... SELECT 只是一次唯一索引探测
+    cursor.execute(
+        f"""
+        INSERT IGNORE INTO proxy_ips ({columns})
+        SELECT {columns} FROM proxy_ips_archive
+        WHERE (ip, port, protocol) IN ({placeholders})
+        """,
+        params,
+    )
+    restored = cursor.rowcount or 0
+    if restored > 0:
+        cursor.execute(
+            f"DELETE FROM proxy_ips_archive WHERE (ip, port, protocol) IN ({placeholders})",
+            params,
+        )
+    return restored
+
+
+@_dispatch_backend
+def archive_deleted_proxies(
+    conn: pymysql.connections.Connection,
+    older_than_hours: int,
+    chunk_size: int = ARCHIVE_CHUNK_SIZE,
+    max_chunks: Optional[int] = None,
+) -> int:
+    """
+    把软删除超过 older_than_hours 小时的代理分块移入 proxy_ips_archive，返回移动行数。
+
+    每块在一个事务内完成"复制到归档表 + 从热表删除"，块之间提交，避免长事务与大范围锁。
+    被删除代理不再参与检测，last_checked_at 即删除时间，沿 idx_proxy_ips_check_queue 范围扫描。
+    """
+    size = max(1, int(chunk_size))
+    columns = ", ".join(_ARCHIVE_COLUMNS)
+    refresh = ", ".join(f"{column}=VALUES({column})" for column in _ARCHIVE_COLUMNS[3:])
+
+    def runner(cursor):
+        moved = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            conn.begin()
+            try:
+                cursor.execute(
+                    """
+                    SELECT id FROM proxy_ips
+                    WHERE is_deleted=1 AND last_checked_at < NOW() - INTERVAL %s HOUR
+                    ORDER BY last_checked_at ASC, id ASC
+                    LIMIT %s
+                    FOR UPDATE
+                    """,
+                    (int(older_than_hours), size),
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    conn.commit()
+                    break
+                id_list = ", ".join(["%s"] * len(ids))
+                cursor.execute(
+                    f"""
+                    INSERT INTO proxy_ips_archive ({columns}, archived_at)
+                    SELECT {columns}, CURRENT_TIMESTAMP FROM proxy_ips
+                    WHERE id IN ({id_list}) AND is_deleted=1
+                    ON DUPLICATE KEY UPDATE {refresh}, archived_at=CURRENT_TIMESTAMP
+                    """,
+                    ids,
+                )
+                cursor.execute(f"DELETE FROM proxy_ips WHERE id IN ({id_list}) AND is_deleted=1", ids)
+                moved += cursor.rowcount or 0
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            chunks += 1
+            if len(ids) < size:
+                break
+        return moved
+
+    return _run_with_schema_retry(conn, _settings_for_retry, runner)
+
+
+def build_proxy_meta(record: dict, latency_ms: Optional[int], checked_at: Optional[float] = None) -> dict:
+    return {
+        "country": record.get("country"),
+        "anonymity": record.get("anonymity"),
+        "latency_ms": latency_ms,
+        "checked_at": int(checked_at if checked_at is not None else time.time()),
+    }
+
+
+def encode_proxy_meta(meta: dict) -> str:
+    checked_at = meta.get("checked_at")
+    latency_ms = meta.get("latency_ms")
+    return "|".join(
+        (
+            str(meta.get("country") or ""),
+            str(meta.get("anonymity") or ""),
+            "" if latency_ms is None else str(int(latency_ms)),
+            str(int(checked_at if checked_at is not None else time.time())),
+        )
+    )
+
+
+def decode_proxy_meta(raw: Any) -> Optional[dict]:
+    if raw is None:
+        return None
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8", "replace")
+    parts = str(raw).split("|")
+    if len(parts) != 4:
+        return None
+    country, anonymity, latency_raw, checked_raw = parts
+    try:
+        return {
+            "country": country or None,
+            "anonymity": anonymity or None,
+            "latency_ms": int(latency_raw) if latency_raw else None,
+            "checked_at": int(checked_raw) if checked_raw else None,
+        }
+    except ValueError:
+        return None
+
+
 def upsert_redis_pool(rds: redis.Redis, ip: str, port: int, protocol: str, score: int) -> None:
     key = make_redis_key(ip, port, protocol)
     try:
-        rds.zadd("proxy:alive", {key: score})
+        rds.zadd(ALIVE_POOL_KEY, {key: score})
     except Exception:
         return
 
 
-def fetch_proxy_countries(conn: pymysql.connections.Connection, candidates: list[dict]) -> dict:
+@dataclass
+class RedisFlushResult:
+    sent: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+
+
+class RedisPoolWriter:
+    """
+    存活池批量写入器：缓冲 ZADD / ZREM，按条数或时间经非事务 pipeline 一次性提交。
+
+    同一成员在一批内的多次操作只保留最后一次；flush() 返回本批成功与失败的成员数，
+    累计值见 sent / failed，不再静默丢弃写入错误。
+
+    设置 meta_key 时，add() 携带的元数据在同一 pipeline 中写入该 hash，remove() 同步删除。
+    indexed=True 时同步维护按协议、协议+国家划分的二级 ZSET（国家取自元数据 / remove 的 country 参数）。
+    设置 checked_key 时 add() 同时记录验证时间（元数据中的 checked_at，缺省为当前时间），remove() 同步删除。
+    """
+
+    def __init__(
+        self,
+        rds: redis.Redis,
+        key: str = ALIVE_POOL_KEY,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        meta_key: Optional[str] = None,
+        indexed: bool = False,
+        checked_key: Optional[str] = None,
+    ):
+        self.rds = rds
+        self.key = key
+        self.meta_key = meta_key
+        self.indexed = indexed
+        self.checked_key = checked_key
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.sent = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+        self._adds: dict[str, float] = {}
+        self._metas: dict[str, str] = {}
+        self._checked: dict[str, int] = {}
+        self._removes: set[str] = set()
+        self._index_adds: dict[str, dict[str, float]] = {}
+        self._index_removes: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(
+        self,
+        ip: str,
+        port: int,
+        protocol: str,
+        score: float,
+        meta: Optional[dict] = None,
+    ) -> Optional[RedisFlushResult]:
+        member = make_redis_key(ip, port, protocol)
+        encoded = encode_proxy_meta(meta) if self.meta_key and meta is not None else None
+        index_keys = _alive_index_keys(protocol, (meta or {}).get("country")) if self.indexed else []
+        checked_at = (meta or {}).get("checked_at")
+        with self._lock:
+            self._removes.discard(member)
+            self._adds[member] = score
+            if encoded is not None:
+                self._metas[member] = encoded
+            if self.checked_key:
+                self._checked[member] = int(checked_at if checked_at is not None else time.time())
+            for index_key in index_keys:
+                self._index_removes.get(index_key, set()).discard(member)
+                self._index_adds.setdefault(index_key, {})[member] = score
+        return self._maybe_flush()
+
+    def remove(
+        self,
+        ip: str,
+        port: int,
+        protocol: str,
+        country: Optional[str] = None,
+    ) -> Optional[RedisFlushResult]:
+        member = make_redis_key(ip, port, protocol)
+        index_keys = _alive_index_keys(protocol, country) if self.indexed else []
+        with self._lock:
+            self._adds.pop(member, None)
+            self._metas.pop(member, None)
+            self._checked.pop(member, None)
+            self._removes.add(member)
+            for index_key in index_keys:
+                self._index_adds.get(index_key, {}).pop(member, None)
+                self._index_removes.setdefault(index_key, set()).add(member)
+        return self._maybe_flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._adds) + len(self._removes)
+
+    def _maybe_flush(self) -> Optional[RedisFlushResult]:
+        if self.pending() >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return None
+
+    def flush(self) -> RedisFlushResult:
+        with self._lock:
+            adds, self._adds = self._adds, {}
+            metas, self._metas = self._metas, {}
+            checked, self._checked = self._checked, {}
+            removes, self._removes = self._removes, set()
+            index_adds, self._index_adds = self._index_adds, {}
+            index_removes, self._index_removes = self._index_removes, {}
+            self._last_flush = time.monotonic()
+        result = RedisFlushResult()
+        if not adds and not removes:
+            return result
+
+        commands: list[int] = []
+        try:
+            pipe = self.rds.pipeline(transaction=False)
+            if adds:
+                pipe.zadd(self.key, adds)
+                commands.append(len(adds))
+            if removes:
+                pipe.zrem(self.key, *removes)
+                commands.append(len(removes))
+            # 元数据命令不单独计数，失败时只记录错误
+            if metas:
+                pipe.hset(self.meta_key, mapping=metas)
+                commands.append(0)
+            if removes and self.meta_key:
+                pipe.hdel(self.meta_key, *removes)
+                commands.append(0)
+            if checked:
+                pipe.zadd(self.checked_key, checked)
+                commands.append(0)
+            if removes and self.checked_key:
+                pipe.zrem(self.checked_key, *removes)
+                commands.append(0)
+            # 二级索引与元数据一样不单独计数
+            for index_key, members in index_adds.items():
+                if members:
+                    pipe.zadd(index_key, members)
+                    commands.append(0)
+            for index_key, members in index_removes.items():
+                if members:
+                    pipe.zrem(index_key, *members)
+                    commands.append(0)
+            replies = pipe.execute(raise_on_error=False)
+        except Exception as exc:
+            result.failed = len(adds) + len(removes)
+            result.error = str(exc)
+        else:
+            for members, reply in zip(commands, replies):
+                if isinstance(reply, Exception):
+                    result.failed += members
+                    result.error = str(reply)
+                else:
+                    result.sent += members
+
+        with self._lock:
+            self.sent += result.sent
+            self.failed += result.failed
+            if result.error:
+                self.last_error = result.error
+        return result
+
+
+def build_redis_pool_writer(settings: Settings, rds: redis.Redis) -> RedisPoolWriter:
+    # 按配置决定是否旁写元数据、二级索引与验证时间；抓取流水线与检测共用
+    return RedisPoolWriter(
+        rds,
+        batch_size=settings.redis_write_batch_size,
+        flush_interval=settings.redis_write_flush_interval,
+        meta_key=PROXY_META_KEY if settings.redis_meta_enabled else None,
+        indexed=settings.redis_index_enabled,
+        checked_key=PROXY_CHECKED_KEY if settings.redis_pool_ttl > 0 else None,
+    )
+
+
+def iter_pool_rows(conn: pymysql.connections.Connection, chunk_size: int = 1000):
+    """
+    按 id 分块流式读取全部代理（键集分页，每块一条独立查询），供存活池对账使用。
+
+    每次产出一个块：[(ip, port, protocol, country, anonymity, latency_ms, last_checked_at, is_alive, is_deleted), ...]
+    """
+    size = max(1, int(chunk_size))
+    last_id = 0
+
+    def runner(cursor):
+        cursor.execute(
+            """
+            SELECT id, ip, port, protocol, country, anonymity, latency_ms, last_checked_at, is_alive, is_deleted
+            FROM proxy_ips
+            WHERE id > %s
+            ORDER BY id ASC
+            LIMIT %s
+            """,
+            (last_id, size),
+        )
+        return list(cursor.fetchall())
+
+    while True:
+        rows = _run_with_schema_retry(conn, _settings_for_retry, runner)
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [tuple(row[1:]) for row in rows]
+        if len(rows) < size:
+            return
+
+
+# 原子地取出一批超时成员并从 proxy:checked / proxy:alive / proxy:meta 中删除，返回 [成员, 元数据, ...]
+_SWEEP_STALE_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #members == 0 then
+  return {}
+end
+local metas = redis.call('HMGET', KEYS[3], unpack(members))
+redis.call('ZREM', KEYS[1], unpack(members))
+redis.call('ZREM', KEYS[2], unpack(members))
+redis.call('HDEL', KEYS[3], unpack(members))
+local reply = {}
+for index, member in ipairs(members) do
+  reply[#reply + 1] = member
+  reply[#reply + 1] = metas[index]
+end
+return reply
+"""
+
+
+def _seed_checked_times(rds: redis.Redis, now: int, batch_size: int) -> int:
+    """
+    为存活池中尚未出现在 proxy:checked 的成员补记验证时间（ZADD NX，记为 now），返回补记数量。
+
+    两个 ZSET 成员数一致时直接返回，仅在历史数据或关闭过 TTL 后首次 sweep 时才 ZSCAN 全池。
+    """
+    if rds.zcard(ALIVE_POOL_KEY) <= rds.zcard(PROXY_CHECKED_KEY):
+        return 0
+    seeded = 0
+    cursor = 0
+    while True:
+        cursor, items = rds.zscan(ALIVE_POOL_KEY, cursor, count=batch_size)
+        if items:
+            seeded += int(rds.zadd(PROXY_CHECKED_KEY, {member: now for member, _score in items}, nx=True) or 0)
+        if not cursor:
+            return seeded
+
+
+def list_country_index_keys(rds: redis.Redis) -> dict[str, list[str]]:
+    # 按协议列出现有的 proxy:alive:{protocol}:{country} 索引，供缺少元数据的成员逐一清理
+    keys: dict[str, list[str]] = {}
+    for key in rds.scan_iter(match=f"{ALIVE_POOL_KEY}:*:*"):
+        if isinstance(key, bytes):
+            key = key.decode("utf-8", "replace")
+        protocol = key[len(ALIVE_POOL_KEY) + 1 :].split(":", 1)[0]
+        keys.setdefault(protocol, []).append(key)
+    return keys
+
+
+def sweep_stale_proxies(
+    rds: redis.Redis,
+    ttl_seconds: int,
+    batch_size: int = 500,
+    max_batches: Optional[int] = None,
+    indexed: bool = False,
+    now: Optional[float] = None,
+) -> int:
+    """
+    移出超过 ttl_seconds 未重新验证成功的存活池成员，返回移出数量。
+
+    每步最多处理 batch_size 个成员（Lua 中 ZRANGEBYSCORE LIMIT + ZREM，单步耗时有界）。
+    未写入 proxy:checked 的成员先按当前时间补记，超过 ttl_seconds 仍未复检即在后续 sweep 中移出。
+    indexed=True 时再按协议 / 元数据中的国家清理二级索引；没有元数据的成员从该协议的全部国家索引中移除。
+    """
+    current = int(now if now is not None else time.time())
+    cutoff = current - ttl_seconds
+    size = max(1, int(batch_size))
+    _seed_checked_times(rds, current, size)
+    removed = 0
+    batches = 0
+    country_keys: Optional[dict[str, list[str]]] = None
+    while max_batches is None or batches < max_batches:
+        reply = rds.eval(_SWEEP_STALE_SCRIPT, 3, PROXY_CHECKED_KEY, ALIVE_POOL_KEY, PROXY_META_KEY, cutoff, size)
+        members = reply[0::2]
+        if not members:
+            break
+        batches += 1
+        removed += len(members)
+        if indexed:
+            by_index: dict[str, list[str]] = {}
+            for member, raw_meta in zip(members, reply[1::2]):
+                if isinstance(member, bytes):
+                    member = member.decode("utf-8", "replace")
+                protocol = member.rsplit(":", 1)[-1]
+                meta = decode_proxy_meta(raw_meta)
+                index_keys = _alive_index_keys(protocol, (meta or {}).get("country"))
+                if meta is None:
+                    # 元数据未开启或已丢失时无从得知国家，按协议清理全部国家索引（SCAN 每次 sweep 只做一次）
+                    if country_keys is None:
+                        country_keys = list_country_index_keys(rds)
+                    index_keys.extend(country_keys.get(protocol.lower(), []))
+                for index_key in index_keys:
+                    by_index.setdefault(index_key, []).append(member)
+            pipe = rds.pipeline(transaction=False)
+            for index_key, index_members in by_index.items():
+                pipe.zrem(index_key, *index_members)
+            pipe.execute()
+        if len(members) < size:
+            break
+    return removed
+
+
+@_dispatch_backend
+def fetch_proxy_countries(
+    conn: pymysql.connections.Connection,
+    candidates: list[dict],
+    compact_keys: bool = False,
+) -> dict:
+    """
+    查询候选代理的国家。compact_keys=True 时可编码的 IPv4 代理改走 proxy_key IN (...)
+    （需已执行紧凑键迁移），其余仍按 (ip, port, protocol) 匹配。
+    """
+
     def runner(cursor):
         if not candidates:
             return {}
 
         keys = [(candidate["ip"], candidate["port"], candidate["protocol"]) for candidate in candidates]
+        mapping = {}
+
+        if compact_keys:
+            by_proxy_key = {}
+            remaining = []
+            for key in keys:
+                proxy_key = make_proxy_key(*key)
+                if proxy_key is None:
+                    remaining.append(key)
+                else:
+                    by_proxy_key[proxy_key] = key
+            if by_proxy_key:
+                placeholders = ",".join(["%s"] * len(by_proxy_key))
+                cursor.execute(
+                    f"SELECT proxy_key, country FROM proxy_ips WHERE proxy_key IN ({placeholders})",
+                    list(by_proxy_key),
+                )
+                for row in cursor.fetchall():
+                    mapping[by_proxy_key[int(row[0])]] = row[1]
+            keys = remaining
+            if not keys:
+                return mapping
+
         placeholders = ",".join(["(%s,%s,%s)"] * len(keys))
         params = [value for key in keys for value in key]
 
@@ -299,7 +1278,6 @@ def fetch_proxy_countries(conn: pymysql.connections.Connection, candidates: list
             f"WHERE (ip, port, protocol) IN ({placeholders})"
         )
 
-        mapping = {}
         cursor.execute(query, params)
         for row in cursor.fetchall():
             key = (row[0], row[1], row[2])
@@ -309,40 +1287,80 @@ def fetch_proxy_countries(conn: pymysql.connections.Connection, candidates: list
     return _run_with_schema_retry(conn, _settings_for_retry, runner)
 
 
+@_dispatch_backend
+def fetch_proxies_in_subnet(
+    conn: pymysql.connections.Connection,
+    cidr: str,
+    alive_only: bool = True,
+    limit: int = 1000,
+) -> list[dict]:
+    """按网段查询代理，沿 idx_proxy_ips_ip_bin 做范围扫描（需已执行紧凑键迁移）"""
+    low, high = subnet_bounds(cidr)
+
+    def runner(cursor):
+        clauses = ["ip_bin BETWEEN %s AND %s", "LENGTH(ip_bin)=%s", "is_deleted=0"]
+        if alive_only:
+            clauses.append("is_alive=1")
+        # IPv4 与 IPv6 的 ip_bin 长度不同，按长度过滤避免字节序比较串到另一族地址
+        cursor.execute(
+            "SELECT ip, port, protocol, country, latency_ms "
+            "FROM proxy_ips "
+            f"WHERE {' AND '.join(clauses)} "
+            "ORDER BY ip_bin, port "
+            "LIMIT %s",
+            (low, high, len(low), limit),
+        )
+        return [dict(zip(_PICK_COLUMNS, row)) for row in cursor.fetchall()]
+
+    return _run_with_schema_retry(conn, _settings_for_retry, runner)
+
+
+_PICK_COLUMNS = ("ip", "port", "protocol", "country", "latency_ms")
+
+
+@_dispatch_backend
 def fetch_mysql_candidates(
     conn: pymysql.connections.Connection,
     protocols: list[str],
     countries: Optional[list[str]],
     limit: int,
 ) -> list[dict]:
+    """
+    按延迟升序取存活候选（无延迟记录的排在最后）。
+
+    每个 protocol（及 country）组合单独一个分支，分别沿 idx_proxy_ips_pick /
+    idx_proxy_ips_pick_country 有序读取至多 limit 行，再 UNION ALL 归并，避免整表 filesort。
+    """
+
     def runner(cursor):
         if not protocols or limit <= 0:
             return []
 
-        clauses = ["is_deleted=0", "is_alive=1"]
-        params: list[object] = []
-
-        protocol_placeholders = ",".join(["%s"] * len(protocols))
-        clauses.append(f"protocol IN ({protocol_placeholders})")
-        params.extend(protocols)
-
         if countries:
-            country_placeholders = ",".join(["%s"] * len(countries))
-            clauses.append(f"country IN ({country_placeholders})")
-            params.extend(countries)
-
-        where_clause = " AND ".join(clauses)
-        query = (
-            "SELECT ip, port, protocol, country, latency_ms "
-            "FROM proxy_ips "
-            f"WHERE {where_clause} "
-            "ORDER BY (latency_ms IS NULL) ASC, latency_ms ASC, last_checked_at DESC "
-            "LIMIT %s"
-        )
-        params.append(limit)
-
-        cursor.execute(query, params)
-        return list(cursor.fetchall())
+            groups = [("protocol=%s AND country=%s", (protocol, country)) for protocol in protocols for country in countries]
+        else:
+            groups = [("protocol=%s", (protocol,)) for protocol in protocols]
+
+        def run_union(latency_clause: str, order_by: str, rows_needed: int) -> list[dict]:
+            branches = []
+            params: list[object] = []
+            for group_clause, group_params in groups:
+                branches.append(
+                    "(SELECT ip, port, protocol, country, latency_ms, last_checked_at "
+                    "FROM proxy_ips "
+                    f"WHERE is_deleted=0 AND is_alive=1 AND {group_clause} AND {latency_clause} "
+                    f"ORDER BY {order_by} LIMIT %s)"
+                )
+                params.extend(group_params)
+                params.append(rows_needed)
+            params.append(rows_needed)
+            cursor.execute(f"{' UNION ALL '.join(branches)} ORDER BY {order_by} LIMIT %s", params)
+            return [dict(zip(_PICK_COLUMNS, row)) for row in cursor.fetchall()]
+
+        rows = run_union("latency_ms IS NOT NULL", "latency_ms ASC, last_checked_at DESC", limit)
+        if len(rows) < limit:
+            rows.extend(run_union("latency_ms IS NULL", "last_checked_at DESC", limit - len(rows)))
+        return rows
 
     return _run_with_schema_retry(conn, _settings_for_retry, runner)
 
@@ -0,0 +1,166 @@
+"""
+代理验证结果缓存：近期验证过的 ip:port:protocol 直接复用上次结果，跳过重复探测。
+
+存活与失效结果分别设置 TTL（存活代理变化更快，TTL 通常更短）。
+target 区分验证目标：抓取流水线的结果不带 target，取代理时按实际检测的 URL 另存，互不覆盖。
+提供进程内（memory）与 Redis 两种实现，接口一致。
+"""
+
+from dataclasses import dataclass
+import time
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from crawler.config import Settings
+
+
+CachedResult = Tuple[bool, int]
+
+REDIS_KEY_PREFIX = "proxy:vcache:"
+
+
+def build_cache_key(ip: str, port: int, protocol: str, target: Optional[str] = None) -> str:
+    key = f"{ip}:{int(port)}:{str(protocol or 'http').lower()}"
+    return f"{key}@{target}" if target else key
+
+
+@dataclass
+class _Entry:
+    success: bool
+    latency_ms: int
+    expires_at: float
+
+
+class ValidationCache:
+    def __init__(self, alive_ttl_seconds: int = 300, dead_ttl_seconds: int = 1800, max_entries: int = 200000):
+        self.alive_ttl_seconds = max(1, int(alive_ttl_seconds))
+        self.dead_ttl_seconds = max(1, int(dead_ttl_seconds))
+        self.max_entries = max(1, int(max_entries))
+        self._store: Dict[str, _Entry] = {}
+        self._lock = Lock()
+
+    def get(self, ip: str, port: int, protocol: str, target: Optional[str] = None) -> Optional[CachedResult]:
+        key = build_cache_key(ip, port, protocol, target)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= now:
+                del self._store[key]
+                return None
+            return entry.success, entry.latency_ms
+
+    def get_many(self, records: Iterable[Dict[str, object]]) -> List[Optional[CachedResult]]:
+        return [self.get(record["ip"], record["port"], record["protocol"]) for record in records]
+
+    def set(
+        self,
+        ip: str,
+        port: int,
+        protocol: str,
+        success: bool,
+        latency_ms: int,
+        target: Optional[str] = None,
+    ) -> None:
+        ttl = self.alive_ttl_seconds if success else self.dead_ttl_seconds
+        entry = _Entry(success=bool(success), latency_ms=int(latency_ms), expires_at=time.monotonic() + ttl)
+        with self._lock:
+            if len(self._store) >= self.max_entries:
+                self._evict_expired_locked()
+            if len(self._store) >= self.max_entries:
+                # 仍然满时淘汰最早写入的条目
+                self._store.pop(next(iter(self._store)))
+            self._store[build_cache_key(ip, port, protocol, target)] = entry
+
+    def clear_expired(self) -> int:
+        with self._lock:
+            return self._evict_expired_locked()
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._store)
+
+    def _evict_expired_locked(self) -> int:
+        now = time.monotonic()
+        expired_keys = [key for key, entry in self._store.items() if entry.expires_at <= now]
+        for key in expired_keys:
+            del self._store[key]
+        return len(expired_keys)
+
+
+class RedisValidationCache:
+    # 多个进程（run / check / API）共享的缓存，值为 "1:延迟" 或 "0:0"，依靠 Redis 过期自动清理
+    def __init__(self, redis_client, alive_ttl_seconds: int = 300, dead_ttl_seconds: int = 1800):
+        self.redis_client = redis_client
+        self.alive_ttl_seconds = max(1, int(alive_ttl_seconds))
+        self.dead_ttl_seconds = max(1, int(dead_ttl_seconds))
+
+    @staticmethod
+    def _decode(raw) -> Optional[CachedResult]:
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", "replace")
+        flag, _sep, latency = str(raw).partition(":")
+        try:
+            return flag == "1", int(latency or 0)
+        except ValueError:
+            return None
+
+    # Redis 不可用时视为未命中，不影响正常验证
+    def get(self, ip: str, port: int, protocol: str, target: Optional[str] = None) -> Optional[CachedResult]:
+        try:
+            return self._decode(self.redis_client.get(REDIS_KEY_PREFIX + build_cache_key(ip, port, protocol, target)))
+        except Exception:
+            return None
+
+    def get_many(self, records: Iterable[Dict[str, object]]) -> List[Optional[CachedResult]]:
+        keys = [REDIS_KEY_PREFIX + build_cache_key(record["ip"], record["port"], record["protocol"]) for record in records]
+        if not keys:
+            return []
+        try:
+            return [self._decode(raw) for raw in self.redis_client.mget(keys)]
+        except Exception:
+            return [None] * len(keys)
+
+    def set(
+        self,
+        ip: str,
+        port: int,
+        protocol: str,
+        success: bool,
+        latency_ms: int,
+        target: Optional[str] = None,
+    ) -> None:
+        ttl = self.alive_ttl_seconds if success else self.dead_ttl_seconds
+        value = f"1:{int(latency_ms)}" if success else "0:0"
+        try:
+            self.redis_client.set(REDIS_KEY_PREFIX + build_cache_key(ip, port, protocol, target), value, ex=ttl)
+        except Exception:
+            return
+
+
+_memory_cache: Optional[ValidationCache] = None
+_memory_cache_lock = Lock()
+
+
+def get_validation_cache(settings: Settings, redis_client=None):
+    """按配置返回缓存实例；未启用时返回 None。进程内缓存在同一进程的多轮运行间共享。"""
+    global _memory_cache
+    backend = settings.validation_cache_backend
+    if backend == "redis" and redis_client is not None:
+        return RedisValidationCache(
+            redis_client,
+            settings.validation_cache_alive_ttl,
+            settings.validation_cache_dead_ttl,
+        )
+    if backend == "memory":
+        with _memory_cache_lock:
+            if _memory_cache is None:
+                _memory_cache = ValidationCache(
+                    settings.validation_cache_alive_ttl,
+                    settings.validation_cache_dead_ttl,
+                )
+            return _memory_cache
+    return None
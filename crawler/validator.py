@@ -1,6 +1,9 @@
+import errno
+import selectors
 import socket
 import time
-from typing import Dict, List, Tuple
+from collections import deque
+from typing import Dict, List, Sequence, Tuple
 
 
 class Validator:
@@ -81,6 +84,92 @@ def tcp_check(host: str, port: int, timeout: int = 2) -> Tuple[bool, int]:
         return False, 0
 
 
+_CONNECT_PENDING = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY}
+_FD_EXHAUSTED = {errno.EMFILE, errno.ENFILE}
+
+
+def _open_nonblocking(host: str, port: int) -> Tuple[socket.socket, int]:
+    family, socktype, proto, _canonname, address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0]
+    sock = socket.socket(family, socktype, proto)
+    sock.setblocking(False)
+    return sock, sock.connect_ex(address)
+
+
+def tcp_check_many(
+    targets: Sequence[Tuple[str, int]],
+    timeout: float = 2,
+    concurrency: int = 1000,
+) -> List[Tuple[bool, int]]:
+    """
+    单线程批量 TCP 探测：非阻塞 connect + selectors（Linux 下为 epoll）。
+
+    返回与 targets 顺序一致的 (是否连通, 延迟毫秒) 列表，语义与 tcp_check 相同。
+    同时在途的连接数不超过 concurrency；文件描述符耗尽时暂缓发起，等已有连接结束后再继续。
+    """
+    results: List[Tuple[bool, int]] = [(False, 0)] * len(targets)
+    if not targets:
+        return results
+
+    window = max(1, int(concurrency))
+    queued = deque(enumerate(targets))
+    selector = selectors.DefaultSelector()
+    in_flight: Dict[socket.socket, Tuple[int, float]] = {}
+    # 所有连接超时相同，按发起顺序排列即按截止时间有序
+    launch_order: deque = deque()
+
+    def finish(sock: socket.socket, success: bool) -> None:
+        index, started = in_flight.pop(sock)
+        if success:
+            results[index] = (True, int((time.time() - started) * 1000))
+        try:
+            selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    try:
+        while queued or in_flight:
+            while queued and len(in_flight) < window:
+                index, (host, port) = queued.popleft()
+                started = time.time()
+                try:
+                    sock, code = _open_nonblocking(host, int(port))
+                except OSError as exc:
+                    if exc.errno in _FD_EXHAUSTED and in_flight:
+                        queued.appendleft((index, (host, port)))
+                        break
+                    continue
+                if code not in _CONNECT_PENDING:
+                    sock.close()
+                    continue
+                in_flight[sock] = (index, started)
+                launch_order.append((sock, started))
+                selector.register(sock, selectors.EVENT_WRITE)
+
+            if not in_flight:
+                continue
+
+            while launch_order[0][0] not in in_flight:
+                launch_order.popleft()
+            wait = max(0.0, launch_order[0][1] + timeout - time.time())
+            for key, _mask in selector.select(timeout=wait):
+                sock = key.fileobj
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                finish(sock, error == 0)
+
+            deadline = time.time() - timeout
+            while launch_order and launch_order[0][1] <= deadline:
+                sock, _started = launch_order.popleft()
+                if sock in in_flight:
+                    finish(sock, False)
+    finally:
+        for sock in list(in_flight):
+            finish(sock, False)
+        selector.close()
+
+    return results
+
+
 def score_proxy(latency_ms: int, success: bool) -> int:
     # 简单评分：成功则按延迟扣分
     if not success:
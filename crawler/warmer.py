@@ -0,0 +1,109 @@
+"""
+预验证热池（warmer）：后台线程按协议（可选再按国家）维持一小组刚验证通过的代理，
+写入 Redis proxy:ready:{protocol}[:{country}]，取代理时直接从中返回，请求路径上不再探测。
+
+- 成员 score 为过期时间（unix 秒），超过 WARMER_TTL 未重新验证的成员不再被返回
+- 每轮先清理过期成员，撑不到下一轮的成员不计入现存数量，不足 WARMER_POOL_SIZE 时补充验证
+- key 本身同样设置 TTL，warmer 停止后热池随之失效，取代理自动回退在线验证
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from crawler.config import Settings
+from crawler.proxy_picker import pick_proxies
+from crawler.storage import get_redis_client, make_redis_key, ready_pool_key
+
+
+def parse_warmer_targets(settings: Settings) -> List[Tuple[str, Optional[str]]]:
+    # WARMER_PROTOCOLS × (不区分国家 + WARMER_COUNTRIES)
+    protocols = [item.strip().lower() for item in settings.warmer_protocols.split(",") if item.strip()]
+    countries = [item.strip() for item in settings.warmer_countries.split(",") if item.strip()]
+    return [(protocol, country) for protocol in protocols for country in [None, *countries]]
+
+
+class ProxyWarmer:
+    def __init__(self, settings: Settings, redis_client=None):
+        self.settings = settings
+        self.redis_client = redis_client if redis_client is not None else get_redis_client(settings)
+        self.targets = parse_warmer_targets(settings)
+        self.pool_size = max(1, int(settings.warmer_pool_size))
+        self.ttl = max(1, int(settings.warmer_ttl))
+        self.interval = max(0.1, float(settings.warmer_interval))
+        self.rounds = 0
+        self.warmed = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ProxyWarmer":
+        self._thread = threading.Thread(target=self._run, name="proxy-warmer", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> "ProxyWarmer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refill_once()
+            except Exception as exc:
+                # 单轮失败（Redis/MySQL 暂不可用）只记录，下一轮重试
+                self.last_error = str(exc)
+            self._stop.wait(self.interval)
+
+    def refill_once(self) -> int:
+        """执行一轮补充，返回本轮写入热池的代理数。"""
+        self.rounds += 1
+        now = time.time()
+        keys = [ready_pool_key(protocol, country) for protocol, country in self.targets]
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zremrangebyscore(key, "-inf", now)
+            pipe.zcount(key, now + self.interval, "+inf")
+        counts = pipe.execute()[1::2]
+
+        written = 0
+        for (protocol, country), key, fresh in zip(self.targets, keys, counts):
+            if int(fresh) >= self.pool_size:
+                continue
+            result = pick_proxies(
+                self.settings,
+                protocols=[protocol],
+                countries=[country] if country else None,
+                count=self.pool_size,
+                require_check=True,
+                redis_client=self.redis_client,
+                use_ready_pool=False,
+                # 绕过验证缓存：写入热池的代理必须是本轮刚验证通过的
+                use_cache=False,
+            )
+            # 国家回退的结果不属于该国家，不能写入国家热池
+            if result.get("status") not in ("ok", "insufficient_valid") or not result.get("data"):
+                continue
+            data = result["data"]
+            proxies = data if isinstance(data, list) else [data]
+            expires_at = time.time() + self.ttl
+            members = {make_redis_key(proxy["ip"], proxy["port"], proxy["protocol"]): expires_at for proxy in proxies}
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.zadd(key, members)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+            written += len(members)
+
+        self.warmed += written
+        return written
@@ -0,0 +1,162 @@
+"""
+验证结果的异步落库（write-behind）：验证线程只负责把结果放入有界队列，
+由独立写线程按批写入 MySQL 与 Redis 存活池，持久化延迟不再拖慢验证。
+
+- 队列满时 submit() 阻塞，形成背压，避免结果无限堆积；写线程已退出时丢弃并计数，不再阻塞
+- 写线程按条数或时间凑批，使用独立连接（与主线程的入库连接互不干扰）
+- close() 写出队列中剩余结果并等待写线程退出
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from crawler.config import Settings
+from crawler.storage import RedisPoolWriter, build_proxy_meta, get_mysql_connection, update_proxy_checks
+from crawler.validator import score_proxy
+
+
+_STOP = object()
+_SUBMIT_POLL_SECONDS = 0.5
+
+CheckResult = Tuple[Dict[str, object], bool, int]
+
+
+class WriteBehindWriter:
+    def __init__(
+        self,
+        settings: Settings,
+        redis_writer: RedisPoolWriter,
+        cache=None,
+        queue_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.settings = settings
+        self.redis_writer = redis_writer
+        self.cache = cache
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.written = 0
+        self.failed = 0
+        self.cache_failed = 0
+        self.redis_failed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_error: Optional[str] = None
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "WriteBehindWriter":
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, record: Dict[str, object], success: bool, latency_ms: int) -> bool:
+        # 队列满时阻塞调用方，直到写线程腾出空间；写线程已退出则丢弃计数，避免永久阻塞
+        item = (record, success, latency_ms)
+        while self._alive():
+            try:
+                self._queue.put(item, timeout=_SUBMIT_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        self.dropped += 1
+        return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        while self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=_SUBMIT_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+        self._thread = None
+
+    def _alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self) -> "WriteBehindWriter":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        conn = None
+        batch: List[CheckResult] = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    if batch:
+                        conn = self._write(conn, batch)
+                    return
+                if item is not None:
+                    batch.append(item)
+                if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                    if batch:
+                        conn = self._write(conn, batch)
+                        batch = []
+                    deadline = time.monotonic() + self.flush_interval
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn, batch: List[CheckResult]):
+        self.batches += 1
+        if self.cache is not None:
+            for record, success, latency_ms in batch:
+                try:
+                    self.cache.set(record["ip"], record["port"], record["protocol"], success, latency_ms)
+                except Exception as exc:
+                    self.cache_failed += 1
+                    self.last_error = str(exc)
+
+        rows = [
+            (record["ip"], record["port"], record["protocol"], success, latency_ms, record.get("judged_anonymity"))
+            for record, success, latency_ms in batch
+        ]
+        try:
+            if conn is None:
+                # 首批或上次建连失败时（重新）建立写线程专用连接
+                conn = get_mysql_connection(self.settings)
+            update_proxy_checks(conn, rows, self.settings.fail_window_hours)
+            self.written += len(batch)
+        except Exception as exc:
+            # 单批失败只计数，写线程继续处理后续结果；连接可能已断开，丢弃后下一批重新建连
+            self.failed += len(batch)
+            self.last_error = str(exc)
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+
+        for record, success, latency_ms in batch:
+            try:
+                if success:
+                    score = score_proxy(latency_ms=latency_ms, success=success)
+                    meta = build_proxy_meta(record, latency_ms)
+                    self.redis_writer.add(record["ip"], record["port"], record["protocol"], score, meta=meta)
+                else:
+                    self.redis_writer.remove(record["ip"], record["port"], record["protocol"], record.get("country"))
+            except Exception as exc:
+                # Redis 异常同样只计数，不能让写线程退出
+                self.redis_failed += 1
+                self.last_error = str(exc)
+        return conn
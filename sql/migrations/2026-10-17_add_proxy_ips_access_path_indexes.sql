@@ -0,0 +1,57 @@
+-- Migration: covering indexes for checker and picker access paths
+-- Date: 2026-10-17
+-- Note: idempotent migration, safe to run multiple times
+--
+-- idx_proxy_ips_check_queue:  fetch_check_batch   WHERE is_deleted=0 ORDER BY last_checked_at, id
+-- idx_proxy_ips_pick:         fetch_mysql_candidates per protocol, ORDER BY latency_ms, last_checked_at DESC
+-- idx_proxy_ips_pick_country: fetch_mysql_candidates per protocol + country
+-- Descending key parts need MySQL 8.0+; 5.7 ignores DESC and falls back to filesort for the mixed-direction ORDER BY
+--
+-- Write cost: latency_ms and last_checked_at change on every check, so each update_proxy_checks
+-- row also moves one entry in each pick index (delete + insert in the secondary B-tree), and
+-- idx_proxy_ips_check_queue moves on every check through last_checked_at as well. That is about
+-- three extra index entry moves per checked row, paid by the checker so pick queries can read
+-- candidates in ORDER BY order with no filesort. If checker write throughput matters more than
+-- pick latency, skip idx_proxy_ips_pick_country: country-filtered picks then fall back to
+-- idx_proxy_ips_pick plus a filesort over that protocol's alive rows.
+
+-- country / anonymity 供检测后同步 Redis 池使用；早期版本的索引缺这两列时重建
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND index_name = 'idx_proxy_ips_check_queue'
+);
+SET @covering := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND index_name = 'idx_proxy_ips_check_queue'
+    AND column_name = 'anonymity'
+);
+SET @stmt := IF(@covering > 0,
+  'SELECT 1',
+  IF(@exists = 0,
+    'ALTER TABLE proxy_ips ADD KEY idx_proxy_ips_check_queue (is_deleted, last_checked_at, id, ip, port, protocol, fail_window_start, fail_count, country, anonymity)',
+    'ALTER TABLE proxy_ips DROP KEY idx_proxy_ips_check_queue, ADD KEY idx_proxy_ips_check_queue (is_deleted, last_checked_at, id, ip, port, protocol, fail_window_start, fail_count, country, anonymity)'));
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND index_name = 'idx_proxy_ips_pick'
+);
+SET @stmt := IF(@exists = 0,
+  'ALTER TABLE proxy_ips ADD KEY idx_proxy_ips_pick (is_deleted, is_alive, protocol, latency_ms, last_checked_at DESC, ip, port, country)',
+  'SELECT 1');
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND index_name = 'idx_proxy_ips_pick_country'
+);
+SET @stmt := IF(@exists = 0,
+  'ALTER TABLE proxy_ips ADD KEY idx_proxy_ips_pick_country (is_deleted, is_alive, protocol, country, latency_ms, last_checked_at DESC, ip, port)',
+  'SELECT 1');
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
@@ -0,0 +1,31 @@
+-- Migration: cold archive table for soft-deleted proxies
+-- Date: 2026-10-17
+-- Note: idempotent migration, safe to run multiple times
+--
+-- archive_deleted_proxies moves rows with is_deleted=1 older than ARCHIVE_AFTER_HOURS
+-- here in chunks; upsert_proxies(rehydrate=True) moves re-listed rows back to proxy_ips.
+-- No foreign key on source_id: archived rows must survive source cleanup.
+
+CREATE TABLE IF NOT EXISTS proxy_ips_archive (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  ip VARCHAR(45) NOT NULL,
+  port INT NOT NULL,
+  protocol VARCHAR(16) NOT NULL,
+  anonymity VARCHAR(32) NULL,
+  country VARCHAR(64) NULL,
+  region VARCHAR(64) NULL,
+  isp VARCHAR(64) NULL,
+  source_id BIGINT UNSIGNED NULL,
+  first_seen_at DATETIME NOT NULL,
+  last_seen_at DATETIME NOT NULL,
+  last_checked_at DATETIME NULL,
+  latency_ms INT NULL,
+  is_alive TINYINT(1) NOT NULL DEFAULT 0,
+  is_deleted TINYINT(1) NOT NULL DEFAULT 1,
+  fail_window_start DATETIME NULL,
+  fail_count INT NOT NULL DEFAULT 0,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id),
+  UNIQUE KEY uq_proxy_ips_archive (ip, port, protocol),
+  KEY idx_proxy_ips_archive_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
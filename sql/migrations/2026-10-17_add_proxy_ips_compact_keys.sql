@@ -0,0 +1,93 @@
+-- Migration: compact binary keys for proxy_ips (opt-in)
+-- Date: 2026-10-17
+-- Note: idempotent migration, safe to run multiple times
+--
+-- Not part of sql/schema.sql: run it only on databases that set MYSQL_COMPACT_KEYS=true
+-- or use fetch_proxies_in_subnet.
+--
+-- ip_bin:      VARBINARY(16) from INET6_ATON(ip); 4 bytes for IPv4, 16 bytes for IPv6,
+--              NULL for malformed ip so one bad row cannot fail a whole upsert chunk
+-- protocol_id: TINYINT enum (http=1, https=2, socks4=3, socks5=4, socks4a=5, other=0)
+-- proxy_key:   BIGINT composite key (INET_ATON(ip) << 24 | port << 8 | protocol_id),
+--              NULL for IPv6, unknown protocols and ports outside 0-65535 (the port
+--              field is 16 bits wide, a larger port would overlap the ip bits)
+--
+-- Columns are STORED generated columns, so existing writers (upsert_proxy / upsert_proxies)
+-- keep working unchanged. Keep crawler.storage.PROTOCOL_IDS / make_proxy_key in sync with
+-- the expressions below.
+--
+-- Write cost: until the optional swap at the end is applied, every write maintains both the
+-- wide uq_proxy_ips and the compact keys added here, i.e. more index work than before, not
+-- less. Adding STORED columns rebuilds the table; run it in a maintenance window on large tables.
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.columns
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND column_name = 'ip_bin'
+);
+SET @stmt := IF(@exists = 0,
+  'ALTER TABLE proxy_ips
+     ADD COLUMN ip_bin VARBINARY(16) AS (IF(IS_IPV4(ip) OR IS_IPV6(ip), INET6_ATON(ip), NULL)) STORED,
+     ADD COLUMN protocol_id TINYINT UNSIGNED AS (
+       CASE protocol WHEN ''http'' THEN 1 WHEN ''https'' THEN 2 WHEN ''socks4'' THEN 3 WHEN ''socks5'' THEN 4
+         WHEN ''socks4a'' THEN 5 ELSE 0 END
+     ) STORED,
+     ADD COLUMN proxy_key BIGINT UNSIGNED AS (
+       CASE WHEN IS_IPV4(ip) AND protocol_id > 0 AND port BETWEEN 0 AND 65535
+         THEN (INET_ATON(ip) << 24) | (port << 8) | protocol_id END
+     ) STORED',
+  'SELECT 1');
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+-- Earlier revisions of this migration lacked socks4a and the port range guard: regenerate both columns
+SET @outdated := (
+  SELECT COUNT(*) FROM information_schema.columns
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND column_name = 'proxy_key'
+    AND generation_expression NOT LIKE '%65535%'
+);
+SET @stmt := IF(@outdated > 0,
+  'ALTER TABLE proxy_ips
+     MODIFY COLUMN protocol_id TINYINT UNSIGNED AS (
+       CASE protocol WHEN ''http'' THEN 1 WHEN ''https'' THEN 2 WHEN ''socks4'' THEN 3 WHEN ''socks5'' THEN 4
+         WHEN ''socks4a'' THEN 5 ELSE 0 END
+     ) STORED,
+     MODIFY COLUMN proxy_key BIGINT UNSIGNED AS (
+       CASE WHEN IS_IPV4(ip) AND protocol_id > 0 AND port BETWEEN 0 AND 65535
+         THEN (INET_ATON(ip) << 24) | (port << 8) | protocol_id END
+     ) STORED',
+  'SELECT 1');
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND index_name = 'uq_proxy_ips_key'
+);
+SET @stmt := IF(@exists = 0,
+  'ALTER TABLE proxy_ips ADD UNIQUE KEY uq_proxy_ips_key (proxy_key)',
+  'SELECT 1');
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+SET @exists := (
+  SELECT COUNT(*) FROM information_schema.statistics
+  WHERE table_schema = DATABASE() AND table_name = 'proxy_ips' AND index_name = 'idx_proxy_ips_ip_bin'
+);
+SET @stmt := IF(@exists = 0,
+  'ALTER TABLE proxy_ips ADD KEY idx_proxy_ips_ip_bin (ip_bin, port)',
+  'SELECT 1');
+PREPARE migration_stmt FROM @stmt;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+-- Optional, once every protocol in use is mapped in protocol_id and no row has a malformed ip
+-- (ip_bin IS NULL) or protocol_id = 0: replace the wide VARCHAR unique key with the compact
+-- one. Upserts (INSERT ... ON DUPLICATE KEY UPDATE) then deduplicate on the same
+-- (ip, port, protocol) triple through this much smaller index, with no code change.
+--
+-- ALTER TABLE proxy_ips
+--   ADD UNIQUE KEY uq_proxy_ips_compact (ip_bin, port, protocol_id),
+--   DROP KEY uq_proxy_ips;
@@ -36,12 +36,40 @@ CREATE TABLE IF NOT EXISTS proxy_ips (
   PRIMARY KEY (id),
   UNIQUE KEY uq_proxy_ips (ip, port, protocol),
   KEY idx_proxy_ips_alive_checked (is_alive, last_checked_at),
+  KEY idx_proxy_ips_check_queue (is_deleted, last_checked_at, id, ip, port, protocol, fail_window_start, fail_count, country, anonymity),
+  -- 挑选索引含每次检测都会更新的 latency_ms / last_checked_at，检测写入需同步移动索引项（写放大说明见 access_path_indexes 迁移）
+  KEY idx_proxy_ips_pick (is_deleted, is_alive, protocol, latency_ms, last_checked_at DESC, ip, port, country),
+  KEY idx_proxy_ips_pick_country (is_deleted, is_alive, protocol, country, latency_ms, last_checked_at DESC, ip, port),
   CONSTRAINT fk_proxy_ips_source
     FOREIGN KEY (source_id)
     REFERENCES proxy_sources (id)
     ON DELETE SET NULL
     ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+-- 冷归档表：长期软删除的代理从 proxy_ips 移入，源重新列出时搬回
+CREATE TABLE IF NOT EXISTS proxy_ips_archive (
+  id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+  ip VARCHAR(45) NOT NULL,
+  port INT NOT NULL,
+  protocol VARCHAR(16) NOT NULL,
+  anonymity VARCHAR(32) NULL,
+  country VARCHAR(64) NULL,
+  region VARCHAR(64) NULL,
+  isp VARCHAR(64) NULL,
+  source_id BIGINT UNSIGNED NULL,
+  first_seen_at DATETIME NOT NULL,
+  last_seen_at DATETIME NOT NULL,
+  last_checked_at DATETIME NULL,
+  latency_ms INT NULL,
+  is_alive TINYINT(1) NOT NULL DEFAULT 0,
+  is_deleted TINYINT(1) NOT NULL DEFAULT 1,
+  fail_window_start DATETIME NULL,
+  fail_count INT NOT NULL DEFAULT 0,
+  archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id),
+  UNIQUE KEY uq_proxy_ips_archive (ip, port, protocol),
+  KEY idx_proxy_ips_archive_archived_at (archived_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 -- 审计日志表
 CREATE TABLE IF NOT EXISTS audit_logs (
   id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
@@ -0,0 +1,189 @@
+-- IP pool schema for the embedded SQLite backend (STORAGE_BACKEND=sqlite)
+-- Applied automatically when a connection is opened; keep columns in sync with schema.sql.
+-- Timestamps are stored as local time ('YYYY-MM-DD HH:MM:SS'), matching the MySQL session clock.
+
+CREATE TABLE IF NOT EXISTS proxy_sources (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name VARCHAR(64) NOT NULL UNIQUE,
+  url VARCHAR(255) NOT NULL,
+  parser_key VARCHAR(64) NOT NULL,
+  enabled TINYINT NOT NULL DEFAULT 1,
+  last_fetch_at DATETIME NULL,
+  fail_count INT NOT NULL DEFAULT 0,
+  created_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+  updated_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS proxy_ips (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  ip VARCHAR(45) NOT NULL,
+  port INT NOT NULL,
+  protocol VARCHAR(16) NOT NULL,
+  anonymity VARCHAR(32) NULL,
+  country VARCHAR(64) NULL,
+  region VARCHAR(64) NULL,
+  isp VARCHAR(64) NULL,
+  source_id INTEGER NULL REFERENCES proxy_sources (id) ON DELETE SET NULL ON UPDATE CASCADE,
+  first_seen_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+  last_seen_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+  last_checked_at DATETIME NULL,
+  latency_ms INT NULL,
+  is_alive TINYINT NOT NULL DEFAULT 0,
+  is_deleted TINYINT NOT NULL DEFAULT 0,
+  fail_window_start DATETIME NULL,
+  fail_count INT NOT NULL DEFAULT 0,
+  UNIQUE (ip, port, protocol)
+);
+CREATE INDEX IF NOT EXISTS idx_proxy_ips_check_queue ON proxy_ips (is_deleted, last_checked_at, id);
+CREATE INDEX IF NOT EXISTS idx_proxy_ips_pick ON proxy_ips (is_deleted, is_alive, protocol, latency_ms);
+CREATE INDEX IF NOT EXISTS idx_proxy_ips_pick_country ON proxy_ips (is_deleted, is_alive, protocol, country, latency_ms);
+
+CREATE TABLE IF NOT EXISTS proxy_ips_archive (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  ip VARCHAR(45) NOT NULL,
+  port INT NOT NULL,
+  protocol VARCHAR(16) NOT NULL,
+  anonymity VARCHAR(32) NULL,
+  country VARCHAR(64) NULL,
+  region VARCHAR(64) NULL,
+  isp VARCHAR(64) NULL,
+  source_id INTEGER NULL,
+  first_seen_at DATETIME NOT NULL,
+  last_seen_at DATETIME NOT NULL,
+  last_checked_at DATETIME NULL,
+  latency_ms INT NULL,
+  is_alive TINYINT NOT NULL DEFAULT 0,
+  is_deleted TINYINT NOT NULL DEFAULT 1,
+  fail_window_start DATETIME NULL,
+  fail_count INT NOT NULL DEFAULT 0,
+  archived_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+  UNIQUE (ip, port, protocol)
+);
+
+CREATE TABLE IF NOT EXISTS audit_logs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  log_level VARCHAR(16) NOT NULL DEFAULT 'INFO',
+  operation_type VARCHAR(32) NOT NULL,
+  module_name VARCHAR(64) NOT NULL,
+  action VARCHAR(255) NOT NULL,
+  sql_operation VARCHAR(32) NULL,
+  table_name VARCHAR(64) NULL,
+  affected_rows INT NULL,
+  sql_statement TEXT NULL,
+  sql_params TEXT NULL,
+  duration_ms INT NULL,
+  request_type VARCHAR(16) NULL,
+  request_url VARCHAR(512) NULL,
+  request_status_code INT NULL,
+  request_bytes_sent INT NULL,
+  request_bytes_received INT NULL,
+  request_latency_ms INT NULL,
+  before_data TEXT NULL,
+  after_data TEXT NULL,
+  error_code VARCHAR(32) NULL,
+  error_message TEXT NULL,
+  error_stack TEXT NULL,
+  process_id INT NULL,
+  thread_id INT NULL,
+  source_module VARCHAR(64) NULL,
+  created_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_logs_created ON audit_logs (created_at);
+
+CREATE TABLE IF NOT EXISTS crawl_session (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_url VARCHAR(512) NOT NULL,
+  page_count INT NOT NULL DEFAULT 1,
+  ip_count INT NOT NULL DEFAULT 0,
+  proxy_count INT NOT NULL DEFAULT 0,
+  max_pages INT NOT NULL DEFAULT 5,
+  max_pages_no_new_ip INT NOT NULL DEFAULT 2,
+  page_fetch_timeout_seconds INT NOT NULL DEFAULT 30,
+  cross_page_dedup TINYINT NOT NULL DEFAULT 1,
+  use_ai_fallback TINYINT NOT NULL DEFAULT 0,
+  ai_trigger_on_low_confidence TINYINT NOT NULL DEFAULT 1,
+  ai_trigger_on_no_table TINYINT NOT NULL DEFAULT 1,
+  ai_trigger_on_failed_parse TINYINT NOT NULL DEFAULT 1,
+  status VARCHAR(32) NOT NULL DEFAULT 'running',
+  error_message TEXT NULL,
+  started_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+  completed_at DATETIME NULL,
+  duration_seconds INT NULL
+);
+
+CREATE TABLE IF NOT EXISTS crawl_page_log (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id INTEGER NOT NULL REFERENCES crawl_session (id) ON DELETE CASCADE ON UPDATE CASCADE,
+  page_url VARCHAR(512) NOT NULL,
+  page_number INT NOT NULL,
+  html_size_bytes INT NOT NULL DEFAULT 0,
+  table_count INT NOT NULL DEFAULT 0,
+  list_count INT NOT NULL DEFAULT 0,
+  json_block_count INT NOT NULL DEFAULT 0,
+  text_block_count INT NOT NULL DEFAULT 0,
+  detected_ips INT NOT NULL DEFAULT 0,
+  detected_ip_port_pairs INT NOT NULL DEFAULT 0,
+  extracted_proxies INT NOT NULL DEFAULT 0,
+  http_status_code INT NULL,
+  fetch_time_seconds REAL NULL,
+  parser_type VARCHAR(32) NULL,
+  structure_confidence REAL NOT NULL DEFAULT 0.0,
+  extraction_confidence REAL NOT NULL DEFAULT 0.0,
+  parse_success TINYINT NOT NULL DEFAULT 1,
+  error_message TEXT NULL,
+  has_next_page TINYINT NOT NULL DEFAULT 0,
+  next_page_url VARCHAR(512) NULL,
+  pagination_confidence REAL NOT NULL DEFAULT 0.0,
+  crawled_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_page_log_session ON crawl_page_log (session_id);
+
+CREATE TABLE IF NOT EXISTS proxy_review_queue (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id INTEGER NOT NULL REFERENCES crawl_session (id) ON DELETE CASCADE ON UPDATE CASCADE,
+  page_log_id INTEGER NOT NULL REFERENCES crawl_page_log (id) ON DELETE CASCADE ON UPDATE CASCADE,
+  ip VARCHAR(45) NOT NULL,
+  port INT NOT NULL,
+  protocol VARCHAR(16) NULL,
+  detected_via VARCHAR(32) NOT NULL,
+  heuristic_confidence REAL NOT NULL DEFAULT 0.0,
+  validation_status VARCHAR(32) NOT NULL DEFAULT 'pending',
+  anomaly_detected TINYINT NOT NULL DEFAULT 0,
+  anomaly_reason VARCHAR(255) NULL,
+  ai_improvement_needed TINYINT NOT NULL DEFAULT 0,
+  ai_improvement_reason VARCHAR(255) NULL,
+  ai_improved_data TEXT NULL,
+  review_status VARCHAR(32) NOT NULL DEFAULT 'pending',
+  reviewer_notes TEXT NULL,
+  final_status VARCHAR(32) NULL,
+  added_to_pool TINYINT NOT NULL DEFAULT 0,
+  created_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime')),
+  reviewed_at DATETIME NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_session ON proxy_review_queue (session_id);
+
+CREATE TABLE IF NOT EXISTS llm_call_log (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  session_id INTEGER NOT NULL REFERENCES crawl_session (id) ON DELETE CASCADE ON UPDATE CASCADE,
+  page_log_id INTEGER NULL REFERENCES crawl_page_log (id) ON DELETE SET NULL ON UPDATE CASCADE,
+  llm_provider VARCHAR(32) NOT NULL,
+  llm_model VARCHAR(64) NOT NULL,
+  llm_base_url VARCHAR(256) NOT NULL,
+  trigger_reason VARCHAR(64) NOT NULL,
+  input_context TEXT NOT NULL,
+  input_tokens INT NOT NULL DEFAULT 0,
+  response_text TEXT NULL,
+  output_tokens INT NOT NULL DEFAULT 0,
+  total_tokens INT NOT NULL DEFAULT 0,
+  extraction_results TEXT NULL,
+  extracted_proxy_count INT NOT NULL DEFAULT 0,
+  cost_usd REAL NOT NULL DEFAULT 0.0,
+  call_status VARCHAR(32) NOT NULL DEFAULT 'pending',
+  error_message TEXT NULL,
+  retry_count INT NOT NULL DEFAULT 0,
+  cache_hit TINYINT NOT NULL DEFAULT 0,
+  cache_key VARCHAR(512) NULL,
+  call_time_seconds REAL NULL,
+  created_at DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+CREATE INDEX IF NOT EXISTS idx_llm_session ON llm_call_log (session_id);
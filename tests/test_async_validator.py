@@ -0,0 +1,241 @@
+import asyncio
+import socket
+import threading
+
+import crawler.async_validator as async_validator
+import crawler.pipeline as pipeline
+from crawler.config import Settings
+from crawler.sources import Source
+
+
+class _RecordingRedis:
+    def __init__(self):
+        self.alive = {}
+        self.executions = 0
+
+    def pipeline(self, transaction=True):
+        return _RecordingPipeline(self)
+
+
+class _RecordingPipeline:
+    def __init__(self, rds):
+        self.rds = rds
+        self.ops = []
+
+    def zadd(self, _key, mapping):
+        self.ops.append(("zadd", dict(mapping)))
+
+    def zrem(self, _key, *members):
+        self.ops.append(("zrem", members))
+
+    def execute(self, raise_on_error=True):
+        self.rds.executions += 1
+        for op, payload in self.ops:
+            if op == "zadd":
+                self.rds.alive.update(payload)
+            else:
+                for member in payload:
+                    self.rds.alive.pop(member, None)
+        return [len(payload) for _op, payload in self.ops]
+
+
+class _LocalProxy:
+    # 本地 HTTP 代理桩：对任意请求返回固定状态行
+    def __init__(self, status_line: bytes = b"HTTP/1.1 200 Connection established\r\n\r\n"):
+        self.status_line = status_line
+        self.requests = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(64)
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _addr = self._sock.accept()
+            except OSError:
+                return
+            with conn:
+                data = conn.recv(4096)
+                self.requests.append(data)
+                conn.sendall(self.status_line)
+
+    def close(self):
+        self._sock.close()
+
+
+def _closed_port() -> int:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_async_check_record_http_connect_success():
+    proxy = _LocalProxy()
+    try:
+        success, latency = asyncio.run(
+            async_validator.async_check_record({"ip": "127.0.0.1", "port": proxy.port, "protocol": "http"}, 2)
+        )
+    finally:
+        proxy.close()
+
+    assert success is True
+    assert latency >= 0
+    assert proxy.requests[0].startswith(b"CONNECT httpbin.org:443 ")
+
+
+def test_async_check_record_http_error_status():
+    proxy = _LocalProxy(b"HTTP/1.1 503 Service Unavailable\r\n\r\n")
+    try:
+        success, _latency = asyncio.run(
+            async_validator.async_check_record({"ip": "127.0.0.1", "port": proxy.port, "protocol": "https"}, 2)
+        )
+    finally:
+        proxy.close()
+
+    assert success is False
+
+
+def test_async_check_record_socks_falls_back_to_tcp():
+    proxy = _LocalProxy(b"")
+    try:
+        success, _latency = asyncio.run(
+            async_validator.async_check_record({"ip": "127.0.0.1", "port": proxy.port, "protocol": "socks5"}, 2)
+        )
+    finally:
+        proxy.close()
+
+    assert success is True
+
+
+def test_async_check_record_refused_port():
+    success, latency = asyncio.run(
+        async_validator.async_check_record({"ip": "127.0.0.1", "port": _closed_port(), "protocol": "http"}, 1)
+    )
+
+    assert success is False
+    assert latency == 0
+
+
+def test_validate_records_bounds_in_flight_window(monkeypatch):
+    state = {"in_flight": 0, "peak": 0}
+
+    async def fake_check(record, timeout, probe_mode="http", target_url=None):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.001)
+        state["in_flight"] -= 1
+        return record["port"] % 2 == 0, 5
+
+    monkeypatch.setattr(async_validator, "async_check_record", fake_check)
+
+    records = ({"ip": "10.0.0.1", "port": port, "protocol": "http"} for port in range(1, 101))
+    results = list(async_validator.validate_records(records, timeout=1, concurrency=8))
+
+    assert len(results) == 100
+    assert state["peak"] <= 8
+    assert sum(1 for _record, success, _latency in results if success) == 50
+
+
+def test_validate_records_checks_while_source_is_still_producing(monkeypatch):
+    first_checked = threading.Event()
+    overlapped = []
+
+    async def fake_check(record, timeout, probe_mode="http", target_url=None):
+        if record["port"] == 1:
+            first_checked.set()
+        return True, 5
+
+    monkeypatch.setattr(async_validator, "async_check_record", fake_check)
+
+    def records():
+        yield {"ip": "10.0.0.1", "port": 1, "protocol": "http"}
+        # 模拟下一个源仍在抓取：第一条记录应已在验证中
+        overlapped.append(first_checked.wait(2))
+        yield {"ip": "10.0.0.1", "port": 2, "protocol": "http"}
+
+    results = list(async_validator.validate_records(records(), timeout=1, concurrency=8))
+
+    assert overlapped == [True]
+    assert [record["port"] for record, _success, _latency in results] == [1, 2]
+
+
+def test_run_once_asyncio_engine_stores_results(monkeypatch):
+    class DummyConn:
+        def close(self):
+            return None
+
+    settings = Settings.from_env()
+    settings.validate_engine = "asyncio"
+    settings.source_workers = 1
+
+    monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
+    monkeypatch.setattr(pipeline, "get_sources", lambda: [Source(name="a", url="http://a", parser_key="a")])
+    monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
+    redis_client = _RecordingRedis()
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: redis_client)
+    monkeypatch.setattr(pipeline, "upsert_source", lambda *_args, **_kwargs: 1)
+    monkeypatch.setattr(
+        pipeline,
+        "_fetch_and_parse",
+        lambda *_args, **_kwargs: [
+            {"ip": "1.2.3.4", "port": 8080, "protocol": "http"},
+            {"ip": "5.6.7.8", "port": 1080, "protocol": "socks5"},
+        ],
+    )
+    monkeypatch.setattr(
+        pipeline,
+        "validate_records",
+        lambda records, timeout, concurrency, **_kwargs: ((record, record["port"] == 8080, 42) for record in records),
+    )
+
+    called = {"upsert_proxy": 0, "update": []}
+    monkeypatch.setattr(
+        pipeline,
+        "upsert_proxies",
+        lambda _conn, records, _source_id, **_kwargs: called.__setitem__("upsert_proxy", called["upsert_proxy"] + len(records)),
+    )
+    monkeypatch.setattr(pipeline, "update_proxy_check", lambda _conn, ip, *args, **kwargs: called["update"].append(ip))
+
+    pipeline.run_once(settings, quick_test=False)
+
+    assert called["upsert_proxy"] == 2
+    assert sorted(called["update"]) == ["1.2.3.4", "5.6.7.8"]
+    assert list(redis_client.alive) == ["1.2.3.4:8080:http"]
+    assert redis_client.executions == 1
+
+
+def test_run_once_asyncio_engine_falls_back_for_unsupported_settings(monkeypatch, capsys):
+    class DummyConn:
+        def close(self):
+            return None
+
+    settings = Settings()
+    settings.validate_engine = "asyncio"
+    settings.validate_funnel_enabled = True
+    settings.source_workers = 1
+
+    monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
+    monkeypatch.setattr(pipeline, "get_sources", lambda: [Source(name="a", url="http://a", parser_key="a")])
+    monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: _RecordingRedis())
+    monkeypatch.setattr(pipeline, "upsert_source", lambda *_args, **_kwargs: 1)
+    monkeypatch.setattr(pipeline, "upsert_proxies", lambda *_args, **_kwargs: 1)
+    monkeypatch.setattr(
+        pipeline, "_fetch_and_parse", lambda *_args, **_kwargs: [{"ip": "1.2.3.4", "port": 8080, "protocol": "http"}]
+    )
+    monkeypatch.setattr(
+        pipeline, "validate_records", lambda *_args, **_kwargs: (_ for _ in ()).throw(AssertionError("asyncio engine used"))
+    )
+    checked = []
+    monkeypatch.setattr(pipeline, "_select_check", lambda _settings: lambda record, timeout: checked.append(record["ip"]) or (True, 10))
+    monkeypatch.setattr(pipeline, "update_proxy_check", lambda *_args, **_kwargs: None)
+
+    pipeline.run_once(settings, quick_test=False)
+
+    assert checked == ["1.2.3.4"]
+    assert "VALIDATE_FUNNEL_ENABLED" in capsys.readouterr().out
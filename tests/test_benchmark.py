@@ -0,0 +1,71 @@
+import socket
+
+from crawler.config import Settings
+from crawler.protocol_probe import probe_handshake
+from tools import benchmark
+from tools.fake_servers import FakeProxyBehavior, FakeProxyServer
+
+
+def test_fake_proxies_speak_their_protocols():
+    target = ("127.0.0.1", 9)
+    with FakeProxyServer("connect") as connect_proxy, FakeProxyServer("http") as http_proxy:
+        # 上游端口无人监听时 CONNECT 返回 502，http 类型直接拒绝 CONNECT
+        connect_result = probe_handshake("127.0.0.1", connect_proxy.address[1], "http", 2, target)
+        http_result = probe_handshake("127.0.0.1", http_proxy.address[1], "http", 2, target)
+
+    assert "502" in connect_result.error
+    assert "405" in http_result.error
+
+
+def test_fake_proxy_drop_and_blackhole():
+    with FakeProxyServer("socks5", FakeProxyBehavior(drop_rate=1.0)) as dropping:
+        dropped = probe_handshake("127.0.0.1", dropping.address[1], "socks5", 1, ("127.0.0.1", 80))
+    with FakeProxyServer("socks5", FakeProxyBehavior(blackhole_rate=1.0)) as blackhole:
+        with socket.create_connection(blackhole.address, timeout=1) as sock:
+            sock.settimeout(0.2)
+            sock.sendall(b"\x05\x01\x00")
+            try:
+                data = sock.recv(2)
+            except socket.timeout:
+                data = None
+
+    assert dropped.supported is False
+    assert data is None
+
+
+def test_run_benchmark_reports_all_scenarios():
+    settings = Settings()
+    settings.http_timeout = 1
+    settings.validate_workers = 4
+
+    report = benchmark.run_benchmark(
+        settings,
+        proxies_per_kind=2,
+        dead=3,
+        pick_rounds=3,
+        seed=7,
+        isolated=False,
+    )
+
+    assert report["candidates"] == 9
+    by_name = {item["scenario"]: item for item in report["results"]}
+    assert by_name["pipeline"]["probes"] == 9
+    assert by_name["pipeline"]["alive"] == 6
+    assert by_name["check"]["alive"] == 6
+    assert by_name["pick"]["hits"] == 3
+    assert by_name["pipeline"]["p50_ms"] is not None
+
+
+def test_check_scenario_makes_no_real_redis_calls(monkeypatch):
+    import redis
+
+    calls = []
+    monkeypatch.setattr(redis.Redis, "execute_command", lambda self, *args, **kwargs: calls.append(args))
+    monkeypatch.setattr(redis.client.Pipeline, "execute", lambda self, *args, **kwargs: calls.append("pipeline"))
+
+    settings = Settings(check_redis_sync=True, redis_meta_enabled=True)
+    settings.http_timeout = 1
+    report = benchmark.run_benchmark(settings, scenarios=["check"], proxies_per_kind=1, dead=1, seed=3, isolated=False)
+
+    assert report["results"][0]["probes"] > 0
+    assert calls == []
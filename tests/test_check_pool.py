@@ -1,3 +1,7 @@
+import argparse
+
+import pytest
+
 from tools import check_pool
 
 
@@ -45,12 +49,19 @@ def test_check_proxy_retries_all_fail(monkeypatch):
 def test_run_check_batch_supports_tuple_records(monkeypatch):
     class _Settings:
         check_batch_size = 10
+        check_shard_index = 0
+        check_shard_count = 1
         check_workers = 1
         http_timeout = 1
         check_retries = 1
         check_retry_delay = 0
         fail_window_hours = 24
         fail_threshold = 5
+        tcp_scan_enabled = False
+        tcp_scan_concurrency = 10
+        check_flush_size = 500
+        check_flush_interval = 2.0
+        check_redis_sync = False
 
     calls = {"update": 0}
 
@@ -63,7 +74,7 @@ def test_run_check_batch_supports_tuple_records(monkeypatch):
     monkeypatch.setattr(
         check_pool,
         "fetch_check_batch",
-        lambda conn, batch_size: [(1, "1.2.3.4", 8080, "http", None, 0)],
+        lambda conn, batch_size, **_kwargs: [(1, "1.2.3.4", 8080, "http", None, 0)],
     )
     monkeypatch.setattr(check_pool, "check_proxy", lambda ip, port, timeout, retries, retry_delay: (True, 120))
     monkeypatch.setattr(
@@ -73,9 +84,299 @@ def test_run_check_batch_supports_tuple_records(monkeypatch):
     )
     monkeypatch.setattr(
         check_pool,
-        "update_proxy_check_with_window",
-        lambda conn, proxy_id, *args, **kwargs: calls.__setitem__("update", calls["update"] + (1 if proxy_id == 1 else 0)),
+        "update_proxy_checks_with_window",
+        lambda conn, rows: calls.__setitem__("update", calls["update"] + sum(1 for row in rows if row[0] == 1)),
     )
 
     check_pool.run_check_batch(_Settings())
     assert calls["update"] == 1
+
+
+def test_scan_proxies_rescans_only_failures(monkeypatch):
+    rounds = []
+
+    def fake_tcp_check_many(targets, timeout, concurrency):
+        rounds.append(list(targets))
+        return [(host == "1.1.1.1" or len(rounds) > 1, 50) for host, _port in targets]
+
+    sleep_calls = []
+    monkeypatch.setattr(check_pool, "tcp_check_many", fake_tcp_check_many)
+    monkeypatch.setattr(check_pool.time, "sleep", lambda seconds: sleep_calls.append(seconds))
+
+    results = check_pool.scan_proxies(
+        [("1.1.1.1", 80), ("2.2.2.2", 80)],
+        timeout=1,
+        retries=3,
+        retry_delay=3,
+        concurrency=10,
+    )
+
+    assert results == [(True, 50), (True, 50)]
+    assert rounds == [[("1.1.1.1", 80), ("2.2.2.2", 80)], [("2.2.2.2", 80)]]
+    assert sleep_calls == [3]
+
+
+def test_run_check_batch_uses_scanner_when_enabled(monkeypatch):
+    class _Settings:
+        check_batch_size = 10
+        check_shard_index = 0
+        check_shard_count = 1
+        check_workers = 1
+        http_timeout = 1
+        check_retries = 1
+        check_retry_delay = 0
+        fail_window_hours = 24
+        fail_threshold = 5
+        tcp_scan_enabled = True
+        tcp_scan_concurrency = 10
+        check_flush_size = 500
+        check_flush_interval = 2.0
+        check_redis_sync = False
+
+    updates = []
+
+    monkeypatch.setattr(check_pool, "set_settings_for_retry", lambda settings: None)
+    monkeypatch.setattr(
+        check_pool,
+        "get_mysql_connection",
+        lambda settings: type("_Conn", (), {"close": lambda self: None})(),
+    )
+    monkeypatch.setattr(
+        check_pool,
+        "fetch_check_batch",
+        lambda conn, batch_size, **_kwargs: [(1, "1.2.3.4", 8080, "http", None, 0), (2, "5.6.7.8", 3128, "http", None, 0)],
+    )
+    monkeypatch.setattr(check_pool, "tcp_check_many", lambda targets, timeout, concurrency: [(True, 30), (False, 0)])
+    monkeypatch.setattr(
+        check_pool,
+        "check_proxy",
+        lambda *_args: (_ for _ in ()).throw(AssertionError("thread pool path should not run")),
+    )
+    monkeypatch.setattr(
+        check_pool,
+        "update_proxy_checks_with_window",
+        lambda conn, rows: updates.extend((row[0], row[1]) for row in rows),
+    )
+
+    check_pool.run_check_batch(_Settings())
+
+    assert updates == [(1, True), (2, False)]
+
+
+def test_schedule_checks_retries_without_holding_workers(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    attempts = {}
+
+    def fake_check_proxy(ip, port, timeout, retries, retry_delay):
+        assert (retries, retry_delay) == (1, 0)
+        attempts[ip] = attempts.get(ip, 0) + 1
+        if ip == "1.1.1.1":
+            return True, 10
+        if ip == "2.2.2.2" and attempts[ip] == 2:
+            return True, 20
+        return False, 0
+
+    monkeypatch.setattr(check_pool, "check_proxy", fake_check_proxy)
+
+    targets = [("1.1.1.1", 80), ("2.2.2.2", 80), ("3.3.3.3", 80)]
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        results = sorted(check_pool.schedule_checks(executor, targets, timeout=1, retries=3, retry_delay=0.01))
+
+    assert results == [(0, True, 10), (1, True, 20), (2, False, 0)]
+    assert attempts == {"1.1.1.1": 1, "2.2.2.2": 2, "3.3.3.3": 3}
+
+
+def test_check_result_buffer_flushes_by_size_and_interval(monkeypatch):
+    flushed = []
+    monkeypatch.setattr(check_pool, "update_proxy_checks_with_window", lambda conn, rows: flushed.append(list(rows)) or len(rows))
+
+    buffer = check_pool.CheckResultBuffer(object(), flush_size=2, flush_interval=3600)
+    buffer.add((1, True, 10, None, 0, False))
+    assert flushed == []
+    buffer.add((2, False, 0, None, 1, False))
+    assert [[row[0] for row in rows] for rows in flushed] == [[1, 2]]
+
+    buffer.add((3, True, 20, None, 0, False))
+    assert buffer.flush() == 1
+    assert buffer.flush() == 0
+    assert buffer.flushed == 3
+    assert len(flushed) == 2
+
+    eager = check_pool.CheckResultBuffer(object(), flush_size=100, flush_interval=0)
+    eager.add((4, True, 5, None, 0, False))
+    assert flushed[-1][0][0] == 4
+
+
+def test_parse_shard_accepts_index_over_count():
+    assert check_pool.parse_shard("0/1") == (0, 1)
+    assert check_pool.parse_shard("3/4") == (3, 4)
+    for bad in ("4/4", "-1/4", "1", "a/b", "0/0"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            check_pool.parse_shard(bad)
+
+
+def test_run_check_batch_passes_shard(monkeypatch):
+    from crawler.config import Settings
+
+    called = {}
+
+    def fake_fetch(_conn, batch_size, shard_index, shard_count):
+        called.update(batch_size=batch_size, shard=(shard_index, shard_count))
+        return []
+
+    monkeypatch.setattr(check_pool, "set_settings_for_retry", lambda settings: None)
+    monkeypatch.setattr(
+        check_pool,
+        "get_mysql_connection",
+        lambda settings: type("_Conn", (), {"close": lambda self: None})(),
+    )
+    monkeypatch.setattr(check_pool, "fetch_check_batch", fake_fetch)
+
+    settings = check_pool.apply_shard(Settings(check_batch_size=10), (2, 3))
+    check_pool.run_check_batch(settings)
+
+    assert called == {"batch_size": 10, "shard": (2, 3)}
+
+
+class _RecordingPoolWriter:
+    def __init__(self, meta_key=None, indexed=False):
+        self.meta_key = meta_key
+        self.indexed = indexed
+        self.added = []
+        self.removed = []
+        self.flushes = 0
+        self.failed = 0
+
+    def add(self, ip, port, protocol, score, meta=None):
+        self.added.append((f"{ip}:{port}:{protocol}", score, meta["country"]))
+
+    def remove(self, ip, port, protocol, country=None):
+        self.removed.append((f"{ip}:{port}:{protocol}", country))
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_run_check_batch_syncs_results_to_redis(monkeypatch):
+    from crawler.config import Settings
+
+    writer = _RecordingPoolWriter()
+    monkeypatch.setattr(check_pool, "set_settings_for_retry", lambda settings: None)
+    monkeypatch.setattr(
+        check_pool,
+        "get_mysql_connection",
+        lambda settings: type("_Conn", (), {"close": lambda self: None})(),
+    )
+    monkeypatch.setattr(
+        check_pool,
+        "fetch_check_batch",
+        lambda conn, batch_size, **_kwargs: [
+            (1, "1.1.1.1", 80, "http", None, 0, "US", "elite"),
+            (2, "2.2.2.2", 1080, "socks5", None, 4, "DE", None),
+        ],
+    )
+    monkeypatch.setattr(check_pool, "tcp_check_many", lambda targets, timeout, concurrency: [(True, 100), (False, 0)])
+    monkeypatch.setattr(check_pool, "update_proxy_checks_with_window", lambda conn, rows: None)
+    monkeypatch.setattr(check_pool, "get_redis_client", lambda settings: object())
+    monkeypatch.setattr(check_pool, "build_redis_pool_writer", lambda settings, rds: writer)
+
+    check_pool.run_check_batch(Settings(tcp_scan_enabled=True, check_retries=1, fail_threshold=5))
+
+    assert writer.added == [("1.1.1.1:80:http", 9900, "US")]
+    assert writer.removed == [("2.2.2.2:1080:socks5", "DE")]
+    assert writer.flushes == 1
+
+
+def test_reconcile_redis_pool_streams_chunks(monkeypatch):
+    from datetime import datetime
+
+    from crawler.config import Settings
+
+    writer = _RecordingPoolWriter()
+    closed = []
+    checked = datetime(2026, 1, 1, 8, 0, 0)
+    chunks = [
+        [("1.1.1.1", 80, "http", "US", None, 120, checked, 1, 0), ("2.2.2.2", 80, "http", "DE", None, None, None, 0, 0)],
+        [("3.3.3.3", 1080, "socks5", None, None, 50, checked, 1, 1)],
+    ]
+    monkeypatch.setattr(check_pool, "set_settings_for_retry", lambda settings: None)
+    monkeypatch.setattr(
+        check_pool,
+        "get_mysql_connection",
+        lambda settings: type("_Conn", (), {"close": lambda self: closed.append(True)})(),
+    )
+    monkeypatch.setattr(check_pool, "get_redis_client", lambda settings: _ZScanRedis(["1.1.1.1:80:http"]))
+    monkeypatch.setattr(check_pool, "build_redis_pool_writer", lambda settings, rds: writer)
+    monkeypatch.setattr(check_pool, "iter_pool_rows", lambda conn, chunk_size: iter(chunks))
+
+    result = check_pool.reconcile_redis_pool(Settings(), chunk_size=2)
+
+    assert result == {"status": "ok", "added": 1, "removed": 2, "orphaned": 0, "failed": 0}
+    assert writer.added == [("1.1.1.1:80:http", 9880, "US")]
+    assert writer.removed == [("2.2.2.2:80:http", "DE"), ("3.3.3.3:1080:socks5", None)]
+    assert writer.flushes == 2
+    assert closed == [True]
+
+
+class _ZScanRedis:
+    def __init__(self, members, metas=None, index_keys=()):
+        self.members = list(members)
+        self.metas = dict(metas or {})
+        self.index_keys = list(index_keys)
+        self.index_removes = []
+
+    def zscan(self, key, cursor, count):
+        assert key == "proxy:alive"
+        chunk = self.members[cursor : cursor + count]
+        next_cursor = cursor + count if cursor + count < len(self.members) else 0
+        return next_cursor, [(member, 1.0) for member in chunk]
+
+    def hmget(self, key, fields):
+        assert key == "proxy:meta"
+        return [self.metas.get(field) for field in fields]
+
+    def scan_iter(self, match):
+        return iter(self.index_keys)
+
+    def pipeline(self, transaction=True):
+        rds = self
+
+        class _Pipe:
+            def zrem(self, key, *members):
+                rds.index_removes.append((key, set(members)))
+
+            def execute(self):
+                return []
+
+        return _Pipe()
+
+
+def test_reconcile_redis_pool_removes_members_missing_from_mysql(monkeypatch):
+    from crawler.config import Settings
+
+    writer = _RecordingPoolWriter(meta_key="proxy:meta", indexed=True)
+    rds = _ZScanRedis(
+        ["1.1.1.1:80:http", "8.8.8.8:80:http", "2001:db8::1:1080:socks5"],
+        metas={"8.8.8.8:80:http": "DE||80|100"},
+        index_keys=["proxy:alive:socks5:us", "proxy:alive:http:de"],
+    )
+    monkeypatch.setattr(check_pool, "set_settings_for_retry", lambda settings: None)
+    monkeypatch.setattr(
+        check_pool,
+        "get_mysql_connection",
+        lambda settings: type("_Conn", (), {"close": lambda self: None})(),
+    )
+    monkeypatch.setattr(check_pool, "get_redis_client", lambda settings: rds)
+    monkeypatch.setattr(check_pool, "build_redis_pool_writer", lambda settings, _rds: writer)
+    monkeypatch.setattr(
+        check_pool,
+        "iter_pool_rows",
+        lambda conn, chunk_size: iter([[("1.1.1.1", 80, "http", "US", None, 120, None, 1, 0)]]),
+    )
+
+    result = check_pool.reconcile_redis_pool(Settings(), chunk_size=2)
+
+    assert result["orphaned"] == 2
+    assert writer.removed == [("8.8.8.8:80:http", "DE"), ("2001:db8::1:1080:socks5", None)]
+    assert rds.index_removes == [("proxy:alive:socks5:us", {"2001:db8::1:1080:socks5"})]
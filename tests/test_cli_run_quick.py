@@ -9,3 +9,11 @@ def test_run_quick_args_parse():
     assert args.command == "run"
     assert args.quick_test is True
     assert args.quick_record_limit == 2
+
+
+def test_run_engine_arg_parse():
+    parser = build_parser()
+
+    args = parser.parse_args(["run", "--engine", "asyncio"])
+
+    assert args.engine == "asyncio"
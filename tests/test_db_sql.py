@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import pytest
+
 
 def test_schema_contains_tables():
     schema = Path("ip-pool-crawler/sql/schema.sql").read_text(encoding="utf-8")
@@ -7,3 +9,204 @@ def test_schema_contains_tables():
     assert "CREATE TABLE IF NOT EXISTS proxy_ips" in schema
     assert "is_deleted" in schema
     assert "fail_window_start" in schema
+
+
+def _recorded_queries(func, *args):
+    # 用记录型游标取出函数实际发出的 SQL，再在真实库上 EXPLAIN
+    executed = []
+
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params=None):
+            executed.append((query, params))
+
+        def fetchall(self):
+            return []
+
+    class _Conn:
+        def cursor(self):
+            return _Cursor()
+
+    func(_Conn(), *args)
+    return executed
+
+
+def test_schema_declares_access_path_indexes():
+    schema = (Path(__file__).resolve().parent.parent / "sql" / "schema.sql").read_text(encoding="utf-8")
+    for index_name in ("idx_proxy_ips_check_queue", "idx_proxy_ips_pick", "idx_proxy_ips_pick_country"):
+        assert index_name in schema
+
+
+def test_check_queue_index_covers_check_batch_columns():
+    schema = (Path(__file__).resolve().parent.parent / "sql" / "schema.sql").read_text(encoding="utf-8")
+    line = next(line for line in schema.splitlines() if "KEY idx_proxy_ips_check_queue" in line)
+    columns = {part.strip() for part in line.split("(", 1)[1].rsplit(")", 1)[0].split(",")}
+    assert {"id", "ip", "port", "protocol", "fail_window_start", "fail_count", "country", "anonymity"} <= columns
+
+
+def test_candidate_query_splits_into_index_ordered_branches():
+    from crawler.storage import fetch_mysql_candidates
+
+    queries = _recorded_queries(fetch_mysql_candidates, ["http", "socks5"], ["US"], 10)
+    query, params = queries[0]
+    assert query.count("UNION ALL") == 1
+    assert query.count("protocol=%s AND country=%s") == 2
+    assert "IN (" not in query
+    assert params == ["http", "US", 10, "socks5", "US", 10, 10]
+    # 第一轮没有取满时再按 last_checked_at 补充无延迟记录
+    assert "latency_ms IS NULL" in queries[1][0]
+
+
+def test_check_batch_shard_filters_by_id_modulo():
+    from crawler.storage import fetch_check_batch
+
+    (query, params), = _recorded_queries(fetch_check_batch, 500)
+    assert "id %%" not in query
+    assert params == [500]
+
+    (query, params), = _recorded_queries(fetch_check_batch, 500, 1, 4)
+    assert "AND id %% %s = %s" in query
+    assert params == [4, 1, 500]
+
+
+@pytest.fixture(scope="module")
+def explain_cursor():
+    pymysql = pytest.importorskip("pymysql")
+    from crawler.config import Settings
+    from crawler.storage import _load_schema
+
+    settings = Settings.from_env()
+    database = f"{settings.mysql_database}_explain_test"
+    try:
+        conn = pymysql.connect(
+            host=settings.mysql_host,
+            port=settings.mysql_port,
+            user=settings.mysql_user,
+            password=settings.mysql_password,
+            charset="utf8mb4",
+            autocommit=True,
+            connect_timeout=2,
+        )
+    except Exception as exc:
+        pytest.skip(f"MySQL unavailable: {exc}")
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT VERSION()")
+        if not str(cursor.fetchone()[0]).startswith("8"):
+            conn.close()
+            pytest.skip("descending index keys need MySQL 8.0+")
+        cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+        cursor.execute(f"CREATE DATABASE {database} CHARACTER SET utf8mb4")
+        cursor.execute(f"USE {database}")
+        for statement in _load_schema().split(";"):
+            if statement.strip():
+                cursor.execute(statement)
+        rows = []
+        for index in range(2000):
+            rows.append(
+                (
+                    f"10.{index // 65536}.{index // 256 % 256}.{index % 256}",
+                    1000 + index % 50,
+                    ("http", "https", "socks4", "socks5")[index % 4],
+                    ("US", "DE", "CN", None)[index % 4],
+                    index % 7 == 0,
+                    index % 3 == 0,
+                    None if index % 11 == 0 else index % 900,
+                )
+            )
+        cursor.executemany(
+            "INSERT INTO proxy_ips (ip, port, protocol, country, is_deleted, is_alive, latency_ms, last_checked_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, IF(%s IS NULL, NULL, NOW()))",
+            [row + (row[-1],) for row in rows],
+        )
+        cursor.execute("ANALYZE TABLE proxy_ips")
+        cursor.fetchall()
+    try:
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            yield cursor
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+        conn.close()
+
+
+def _explain(cursor, query, params):
+    cursor.execute("EXPLAIN " + query, params)
+    return cursor.fetchall()
+
+
+def test_check_batch_plan_uses_check_queue_index(explain_cursor):
+    from crawler.storage import fetch_check_batch
+
+    (query, params), = _recorded_queries(fetch_check_batch, 500)
+    plan = _explain(explain_cursor, query, params)
+
+    assert plan[0]["key"] == "idx_proxy_ips_check_queue"
+    assert "filesort" not in (plan[0]["Extra"] or "")
+    assert "Using index" in (plan[0]["Extra"] or "")
+
+
+_COMPACT_KEYS_MIGRATION = Path(__file__).resolve().parent.parent / "sql" / "migrations" / "2026-10-17_add_proxy_ips_compact_keys.sql"
+
+
+def test_compact_keys_are_opt_in_and_guarded():
+    schema = (Path(__file__).resolve().parent.parent / "sql" / "schema.sql").read_text(encoding="utf-8")
+    migration = _COMPACT_KEYS_MIGRATION.read_text(encoding="utf-8")
+
+    assert "ip_bin" not in schema and "proxy_key" not in schema
+    assert "IF(IS_IPV4(ip) OR IS_IPV6(ip), INET6_ATON(ip), NULL)" in migration
+    assert "port BETWEEN 0 AND 65535" in migration
+    assert "''socks4a'' THEN 5" in migration
+
+
+def _run_script(cursor, text):
+    lines = [line for line in text.splitlines() if not line.lstrip().startswith("--")]
+    for statement in "\n".join(lines).split(";"):
+        if statement.strip():
+            cursor.execute(statement)
+
+
+def test_compact_keys_do_not_abort_or_collide_in_upsert_chunk(explain_cursor):
+    from crawler.storage import upsert_proxies
+
+    _run_script(explain_cursor, _COMPACT_KEYS_MIGRATION.read_text(encoding="utf-8"))
+    records = [
+        {"ip": "172.16.0.1", "port": 8080, "protocol": "http"},
+        {"ip": "not-an-ip", "port": 8080, "protocol": "http"},
+        # 端口超出 16 位时若仍编码，会与下一个 IP 的 0 端口得到同一个 proxy_key
+        {"ip": "172.16.0.2", "port": 65536, "protocol": "http"},
+        {"ip": "172.16.0.3", "port": 0, "protocol": "http"},
+    ]
+    ips = "('172.16.0.1', 'not-an-ip', '172.16.0.2', '172.16.0.3')"
+    try:
+        assert upsert_proxies(explain_cursor.connection, records, None) == 4
+        explain_cursor.execute(f"SELECT ip, ip_bin, proxy_key FROM proxy_ips WHERE ip IN {ips}")
+        rows = {row["ip"]: row for row in explain_cursor.fetchall()}
+        assert set(rows) == {"172.16.0.1", "not-an-ip", "172.16.0.2", "172.16.0.3"}
+        assert rows["not-an-ip"]["ip_bin"] is None and rows["not-an-ip"]["proxy_key"] is None
+        assert rows["172.16.0.1"]["ip_bin"] is not None
+        assert rows["172.16.0.2"]["proxy_key"] is None and rows["172.16.0.3"]["proxy_key"] is not None
+    finally:
+        explain_cursor.execute(f"DELETE FROM proxy_ips WHERE ip IN {ips}")
+
+
+@pytest.mark.parametrize(
+    "countries, index_name",
+    [(None, "idx_proxy_ips_pick"), (["US", "DE"], "idx_proxy_ips_pick_country")],
+)
+def test_candidate_branches_are_index_ordered(explain_cursor, countries, index_name):
+    from crawler.storage import fetch_mysql_candidates
+
+    for query, params in _recorded_queries(fetch_mysql_candidates, ["http", "socks5"], countries, 50):
+        plan = _explain(explain_cursor, query, params)
+        branches = [row for row in plan if row["table"] == "proxy_ips"]
+        assert branches
+        for row in branches:
+            assert row["key"] == index_name
+            assert "filesort" not in (row["Extra"] or "")
+            assert "Using index" in (row["Extra"] or "")
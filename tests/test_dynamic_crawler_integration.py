@@ -172,8 +172,9 @@ def test_crawl_custom_data_flow_with_storage(monkeypatch):
         lambda conn, log: calls.__setitem__("insert_page_log", calls["insert_page_log"] + 1) or 200,
     )
     monkeypatch.setattr(
-        "crawler.dynamic_crawler.upsert_proxy",
-        lambda *args, **kwargs: calls.__setitem__("upsert_proxy", calls["upsert_proxy"] + 1),
+        "crawler.dynamic_crawler.upsert_proxies",
+        lambda conn, records, source_id, **_kwargs: calls.__setitem__("upsert_proxy", calls["upsert_proxy"] + len(records))
+        or len(records),
     )
 
     html = "<html><body>1.2.3.4:8080:http</body></html>"
@@ -226,7 +227,7 @@ def test_crawl_custom_ai_review_and_llm_log(monkeypatch):
     monkeypatch.setattr("crawler.dynamic_crawler.insert_crawl_session", lambda conn, session: 11)
     monkeypatch.setattr("crawler.dynamic_crawler.insert_page_log", lambda conn, log: 22)
     monkeypatch.setattr("crawler.dynamic_crawler.check_duplicate", lambda *args, **kwargs: False)
-    monkeypatch.setattr("crawler.dynamic_crawler.upsert_proxy", lambda *args, **kwargs: None)
+    monkeypatch.setattr("crawler.dynamic_crawler.upsert_proxies", lambda conn, records, source_id, **_kwargs: len(records))
     monkeypatch.setattr(
         "crawler.dynamic_crawler.insert_review_queue_item",
         lambda conn, data: calls.__setitem__("review", calls["review"] + 1) or 1,
@@ -0,0 +1,66 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import crawler.http_session as http_session
+from crawler.judge import JudgeRequestHandler
+
+
+def test_validation_session_is_per_thread():
+    sessions = []
+    main_session = http_session.get_validation_session()
+    assert http_session.get_validation_session() is main_session
+
+    worker = threading.Thread(target=lambda: sessions.append(http_session.get_validation_session()))
+    worker.start()
+    worker.join()
+
+    assert sessions[0] is not main_session
+
+
+def test_adapter_shares_ssl_context_and_bounds_proxy_managers():
+    adapter = http_session.ValidationAdapter(max_proxy_managers=2)
+    first = adapter.proxy_manager_for("http://10.0.0.1:8080")
+    adapter.proxy_manager_for("http://10.0.0.2:8080")
+    adapter.proxy_manager_for("http://10.0.0.1:8080")
+    adapter.proxy_manager_for("http://10.0.0.3:8080")
+
+    assert list(adapter.proxy_manager) == ["http://10.0.0.1:8080", "http://10.0.0.3:8080"]
+    assert first.connection_pool_kw["ssl_context"] is http_session.shared_ssl_context()
+    assert adapter.poolmanager.connection_pool_kw["ssl_context"] is http_session.shared_ssl_context()
+
+
+def test_adapter_closes_evicted_proxy_pools():
+    adapter = http_session.ValidationAdapter(max_proxy_managers=1)
+    first = adapter.proxy_manager_for("http://10.0.0.1:8080")
+    pool = first.connection_from_url("http://example.com/")
+    assert len(first.pools) == 1
+
+    adapter.proxy_manager_for("http://10.0.0.2:8080")
+
+    assert list(adapter.proxy_manager) == ["http://10.0.0.2:8080"]
+    assert len(first.pools) == 0
+    assert pool.pool is None
+
+
+def test_validation_get_reuses_proxy_connection():
+    client_ports = []
+
+    class _CountingHandler(JudgeRequestHandler):
+        def do_GET(self):
+            client_ports.append(self.client_address[1])
+            super().do_GET()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CountingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        proxy = f"http://127.0.0.1:{server.server_address[1]}"
+        session = http_session.build_validation_session()
+        for _ in range(3):
+            assert session.get(proxy + "/", proxies={"http": proxy}, timeout=2).status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(client_ports) == 3
+    assert len(set(client_ports)) == 1
@@ -11,7 +11,7 @@ class _DummyResponse:
 
 
 def test_validate_with_http_success():
-    with patch("crawler.http_validator.requests.get", return_value=_DummyResponse(200)):
+    with patch("crawler.http_validator.validation_get", return_value=_DummyResponse(200)):
         result = HTTPValidator.validate_with_http("1.2.3.4", 8080, "http", timeout=2)
 
     assert isinstance(result, HTTPValidationResult)
@@ -21,7 +21,7 @@ def test_validate_with_http_success():
 
 
 def test_validate_with_http_non_2xx():
-    with patch("crawler.http_validator.requests.get", return_value=_DummyResponse(503)):
+    with patch("crawler.http_validator.validation_get", return_value=_DummyResponse(503)):
         result = HTTPValidator.validate_with_http("1.2.3.4", 8080, "https", timeout=2)
 
     assert result.is_reachable is False
@@ -30,7 +30,7 @@ def test_validate_with_http_non_2xx():
 
 
 def test_validate_with_http_request_error():
-    with patch("crawler.http_validator.requests.get", side_effect=requests.Timeout("timeout")):
+    with patch("crawler.http_validator.validation_get", side_effect=requests.Timeout("timeout")):
         result = HTTPValidator.validate_with_http("1.2.3.4", 8080, "http", timeout=1)
 
     assert result.is_reachable is False
@@ -40,7 +40,7 @@ def test_validate_with_http_request_error():
 
 
 def test_validate_with_http_socks5_protocol():
-    with patch("crawler.http_validator.requests.get", return_value=_DummyResponse(200)):
+    with patch("crawler.http_validator.validation_get", return_value=_DummyResponse(200)):
         result = HTTPValidator.validate_with_http("1.2.3.4", 1080, "socks5", timeout=2)
 
     assert result.is_reachable is True
@@ -60,9 +60,40 @@ def test_batch_validate_returns_results():
         {"ip": "1.2.3.4", "port": 8080, "protocol": "http"},
         {"ip": "5.6.7.8", "port": 1080, "protocol": "socks4"},
     ]
-    with patch("crawler.http_validator.requests.get", return_value=_DummyResponse(200)):
+    with patch("crawler.http_validator.validation_get", return_value=_DummyResponse(200)):
         results = HTTPValidator.batch_validate(proxies, timeout=2)
 
     assert len(results) == 2
     assert all(isinstance(item, HTTPValidationResult) for item in results)
     assert all(item.is_reachable for item in results)
+
+
+def test_validate_with_handshake_maps_probe_result():
+    from crawler.protocol_probe import HandshakeResult
+
+    with patch(
+        "crawler.http_validator.probe_handshake",
+        return_value=HandshakeResult(protocol="socks5", supported=True, latency_ms=35),
+    ) as probe:
+        result = HTTPValidator.validate_with_handshake("1.2.3.4", 1080, "SOCKS5", timeout=2)
+
+    assert result.is_reachable is True
+    assert result.protocol_verified is True
+    assert result.response_time_ms == 35
+    assert result.status_code is None
+    assert probe.call_args[0][2] == "socks5"
+    assert probe.call_args[0][4] == ("httpbin.org", 443)
+
+
+def test_validate_with_handshake_failure_carries_error():
+    from crawler.protocol_probe import HandshakeResult
+
+    with patch(
+        "crawler.http_validator.probe_handshake",
+        return_value=HandshakeResult(protocol="http", supported=False, latency_ms=12, error="connect rejected: 403"),
+    ):
+        result = HTTPValidator.validate_with_handshake("1.2.3.4", 8080, "http", timeout=2)
+
+    assert result.is_reachable is False
+    assert result.protocol_verified is False
+    assert result.errors == ["connect rejected: 403"]
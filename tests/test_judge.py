@@ -0,0 +1,113 @@
+import threading
+from unittest.mock import patch
+
+import requests
+
+import crawler.judge as judge
+from crawler.http_validator import HTTPValidator
+from crawler.judge import (
+    ANONYMITY_ANONYMOUS,
+    ANONYMITY_ELITE,
+    ANONYMITY_TRANSPARENT,
+    build_judge_payload,
+    classify_anonymity,
+    create_judge_server,
+)
+
+
+class _JsonResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self._payload = payload
+
+    def json(self):
+        if isinstance(self._payload, Exception):
+            raise self._payload
+        return self._payload
+
+
+def _start_judge():
+    server = create_judge_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_build_judge_payload_collects_forwarded_headers():
+    payload = build_judge_payload("9.9.9.9", {"Host": "judge", "Via": "1.1 squid", "X-Forwarded-For": "1.1.1.1"})
+
+    assert payload["ip"] == "9.9.9.9"
+    assert payload["headers"]["host"] == "judge"
+    assert payload["forwarded"] == {"via": "1.1 squid", "x-forwarded-for": "1.1.1.1"}
+
+
+def test_classify_anonymity_levels():
+    assert classify_anonymity({"ip": "5.5.5.5", "forwarded": {}}, "1.1.1.1") == ANONYMITY_ELITE
+    assert classify_anonymity({"ip": "5.5.5.5", "forwarded": {"via": "1.1 squid"}}, "1.1.1.1") == ANONYMITY_ANONYMOUS
+    assert (
+        classify_anonymity({"ip": "5.5.5.5", "forwarded": {"x-forwarded-for": "1.1.1.1, 5.5.5.5"}}, "1.1.1.1")
+        == ANONYMITY_TRANSPARENT
+    )
+    assert classify_anonymity({"ip": "1.1.1.1", "forwarded": {}}, "1.1.1.1") == ANONYMITY_TRANSPARENT
+
+
+def test_judge_server_echoes_client_ip_and_headers():
+    server = _start_judge()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        payload = requests.get(url, headers={"Via": "1.1 test"}, timeout=2).json()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert payload["ip"] == "127.0.0.1"
+    assert payload["forwarded"] == {"via": "1.1 test"}
+
+
+def test_validate_with_judge_through_local_proxy():
+    # Judge 同时充当 HTTP 代理：绝对地址 GET 同样由 do_GET 处理
+    server = _start_judge()
+    try:
+        port = server.server_address[1]
+        url = f"http://127.0.0.1:{port}/"
+        elite = HTTPValidator.validate_with_judge("127.0.0.1", port, "http", 2, url, real_ip="10.0.0.1")
+        transparent = HTTPValidator.validate_with_judge("127.0.0.1", port, "http", 2, url, real_ip="127.0.0.1")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert elite.is_reachable is True
+    assert elite.anonymity == ANONYMITY_ELITE
+    assert transparent.anonymity == ANONYMITY_TRANSPARENT
+
+
+def test_validate_with_judge_rejects_non_json_body():
+    with patch("crawler.http_validator.validation_get", return_value=_JsonResponse(200, ValueError("bad json"))):
+        result = HTTPValidator.validate_with_judge("1.2.3.4", 8080, "http", 2, "http://judge/")
+
+    assert result.is_reachable is False
+    assert result.protocol_verified is True
+    assert result.anonymity is None
+
+
+def test_validate_with_judge_request_error():
+    with patch("crawler.http_validator.validation_get", side_effect=requests.ConnectionError("refused")):
+        result = HTTPValidator.validate_with_judge("1.2.3.4", 8080, "http", 2, "http://judge/")
+
+    assert result.protocol_verified is False
+    assert result.errors
+
+
+def test_resolve_real_ip_prefers_configured_and_caches(monkeypatch):
+    calls = []
+
+    def fake_get(url, timeout):
+        calls.append(url)
+        return _JsonResponse(200, {"ip": "8.8.4.4"})
+
+    monkeypatch.setattr(judge, "_real_ip_cache", {})
+    monkeypatch.setattr(judge.requests, "get", fake_get)
+
+    assert judge.resolve_real_ip("http://judge/", configured_ip="1.1.1.1") == "1.1.1.1"
+    assert judge.resolve_real_ip("http://judge/") == "8.8.4.4"
+    assert judge.resolve_real_ip("http://judge/") == "8.8.4.4"
+    assert calls == ["http://judge/"]
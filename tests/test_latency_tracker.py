@@ -0,0 +1,37 @@
+from crawler.latency_tracker import LatencyTracker
+
+
+def test_timeout_uses_ceiling_until_enough_samples():
+    tracker = LatencyTracker(ceiling=10, floor=0.5, min_samples=3)
+    tracker.record(100)
+    tracker.record(120)
+
+    assert tracker.timeout() == 10
+
+
+def test_timeout_follows_percentile_with_multiplier():
+    tracker = LatencyTracker(ceiling=10, floor=0.1, percentile=0.9, multiplier=2, min_samples=10)
+    for latency in range(100, 1100, 100):
+        tracker.record(latency)
+
+    assert tracker.quantile_ms() == 1000
+    assert tracker.timeout() == 2.0
+
+
+def test_timeout_is_clamped_to_floor_and_ceiling():
+    fast = LatencyTracker(ceiling=5, floor=0.5, min_samples=1)
+    fast.record(10)
+    assert fast.timeout() == 0.5
+
+    slow = LatencyTracker(ceiling=5, floor=0.5, min_samples=1)
+    slow.record(60000)
+    assert slow.timeout() == 5
+
+
+def test_window_keeps_recent_samples_only():
+    tracker = LatencyTracker(ceiling=10, window=3, min_samples=1)
+    for latency in (5000, 5000, 5000, 100, 100, 100):
+        tracker.record(latency)
+
+    assert tracker.size() == 3
+    assert tracker.quantile_ms() == 100
@@ -5,6 +5,37 @@ from crawler.sources import Source
 from crawler.config import Settings
 
 
+class _RecordingRedis:
+    def __init__(self):
+        self.alive = {}
+        self.executions = 0
+
+    def pipeline(self, transaction=True):
+        return _RecordingPipeline(self)
+
+
+class _RecordingPipeline:
+    def __init__(self, rds):
+        self.rds = rds
+        self.ops = []
+
+    def zadd(self, _key, mapping):
+        self.ops.append(("zadd", dict(mapping)))
+
+    def zrem(self, _key, *members):
+        self.ops.append(("zrem", members))
+
+    def execute(self, raise_on_error=True):
+        self.rds.executions += 1
+        for op, payload in self.ops:
+            if op == "zadd":
+                self.rds.alive.update(payload)
+            else:
+                for member in payload:
+                    self.rds.alive.pop(member, None)
+        return [len(payload) for _op, payload in self.ops]
+
+
 def test_normalize_record_min_fields():
     record = normalize_record({"ip": "1.1.1.1", "port": "80"})
     assert record["ip"] == "1.1.1.1"
@@ -92,13 +123,12 @@ def test_run_once_quick_test_stops_after_first_success_source(monkeypatch):
     monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
     monkeypatch.setattr(pipeline, "get_sources", fake_get_sources)
     monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
-    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: object())
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: _RecordingRedis())
     monkeypatch.setattr(pipeline, "upsert_source", fake_upsert_source)
     monkeypatch.setattr(pipeline, "_fetch_and_parse", fake_fetch_and_parse)
     monkeypatch.setattr(pipeline, "_check_record", lambda record, timeout: (True, 10))
-    monkeypatch.setattr(pipeline, "upsert_proxy", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pipeline, "upsert_proxies", lambda *args, **kwargs: 0)
     monkeypatch.setattr(pipeline, "update_proxy_check", lambda *args, **kwargs: None)
-    monkeypatch.setattr(pipeline, "upsert_redis_pool", lambda *args, **kwargs: None)
 
     pipeline.run_once(settings, quick_test=True, quick_record_limit=1)
 
@@ -149,17 +179,288 @@ def test_run_once_non_quick_handles_fetch_exception(monkeypatch):
     monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
     monkeypatch.setattr(pipeline, "get_sources", fake_get_sources)
     monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
-    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: object())
+    redis_client = _RecordingRedis()
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: redis_client)
     monkeypatch.setattr(pipeline, "upsert_source", lambda *_args, **_kwargs: 1)
     monkeypatch.setattr(pipeline, "_fetch_and_parse", lambda *_args, **_kwargs: (_ for _ in ()).throw(RuntimeError("fetch failed")))
 
-    called = {"upsert_proxy": 0, "update": 0, "redis": 0}
-    monkeypatch.setattr(pipeline, "upsert_proxy", lambda *args, **kwargs: called.__setitem__("upsert_proxy", called["upsert_proxy"] + 1))
+    called = {"upsert_proxy": 0, "update": 0}
+    monkeypatch.setattr(
+        pipeline,
+        "upsert_proxies",
+        lambda _conn, records, _source_id, **_kwargs: called.__setitem__("upsert_proxy", called["upsert_proxy"] + len(records)),
+    )
     monkeypatch.setattr(pipeline, "update_proxy_check", lambda *args, **kwargs: called.__setitem__("update", called["update"] + 1))
-    monkeypatch.setattr(pipeline, "upsert_redis_pool", lambda *args, **kwargs: called.__setitem__("redis", called["redis"] + 1))
 
     pipeline.run_once(settings, quick_test=False)
 
     assert called["upsert_proxy"] == 0
     assert called["update"] == 0
-    assert called["redis"] == 0
+    assert redis_client.executions == 0
+
+
+def test_run_once_tcp_prescan_skips_unreachable(monkeypatch):
+    class DummyConn:
+        def close(self):
+            return None
+
+    settings = Settings.from_env()
+    settings.source_workers = 1
+    settings.validate_workers = 1
+    settings.tcp_scan_enabled = True
+
+    monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
+    monkeypatch.setattr(pipeline, "get_sources", lambda: [Source(name="source-a", url="http://a", parser_key="a")])
+    monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: _RecordingRedis())
+    monkeypatch.setattr(pipeline, "upsert_source", lambda *_args, **_kwargs: 1)
+    monkeypatch.setattr(
+        pipeline,
+        "_fetch_and_parse",
+        lambda *_args, **_kwargs: [
+            {"ip": "1.2.3.4", "port": 8080, "protocol": "http"},
+            {"ip": "5.6.7.8", "port": 9090, "protocol": "http"},
+        ],
+    )
+    monkeypatch.setattr(pipeline, "tcp_check_many", lambda targets, timeout, concurrency: [(True, 5), (False, 0)])
+
+    checked = []
+    updates = []
+    monkeypatch.setattr(pipeline, "_check_record", lambda record, timeout: checked.append(record["ip"]) or (True, 10))
+    monkeypatch.setattr(pipeline, "upsert_proxies", lambda *args, **kwargs: 0)
+    monkeypatch.setattr(pipeline, "update_proxy_check", lambda _conn, ip, _port, _protocol, success, *args: updates.append((ip, success)))
+
+    pipeline.run_once(settings, quick_test=False)
+
+    assert checked == ["1.2.3.4"]
+    assert sorted(updates) == [("1.2.3.4", True), ("5.6.7.8", False)]
+
+
+def test_select_check_uses_handshake_mode(monkeypatch):
+    settings = Settings()
+    assert pipeline._select_check(settings) is pipeline._check_record
+
+    settings.validate_probe_mode = "handshake"
+    assert pipeline._select_check(settings) is pipeline._check_record_handshake
+
+    monkeypatch.setattr(
+        pipeline.HTTPValidator,
+        "validate_with_handshake",
+        lambda ip, port, protocol, timeout: HTTPValidationResult(
+            is_reachable=False,
+            status_code=None,
+            response_time_ms=30,
+            protocol_verified=False,
+            errors=["not a socks5 reply"],
+        ),
+    )
+    assert pipeline._check_record_handshake({"ip": "1.2.3.4", "port": 1080, "protocol": "socks5"}, timeout=1) == (False, 0)
+
+
+def test_select_check_uses_judge_and_records_anonymity(monkeypatch):
+    settings = Settings()
+    settings.judge_url = "http://judge.local:8899/"
+    settings.judge_real_ip = "1.1.1.1"
+
+    seen = {}
+
+    def fake_validate(ip, port, protocol, timeout, judge_url, real_ip):
+        seen.update(judge_url=judge_url, real_ip=real_ip)
+        return HTTPValidationResult(
+            is_reachable=True,
+            status_code=200,
+            response_time_ms=25,
+            protocol_verified=True,
+            anonymity="elite",
+        )
+
+    monkeypatch.setattr(pipeline.HTTPValidator, "validate_with_judge", fake_validate)
+
+    record = {"ip": "1.2.3.4", "port": 8080, "protocol": "http", "anonymity": None}
+    assert pipeline._select_check(settings)(record, 2) == (True, 25)
+    assert record["anonymity"] == record["judged_anonymity"] == "elite"
+    assert seen == {"judge_url": "http://judge.local:8899/", "real_ip": "1.1.1.1"}
+
+
+def test_store_check_result_only_writes_judged_anonymity(monkeypatch):
+    updates = []
+    monkeypatch.setattr(pipeline, "update_proxy_check", lambda _conn, ip, *args: updates.append((ip, args[-1])))
+
+    class _Writer:
+        def add(self, *args, **kwargs):
+            return None
+
+        def remove(self, *args, **kwargs):
+            return None
+
+    listed = {"ip": "1.2.3.4", "port": 8080, "protocol": "http", "anonymity": "elite"}
+    judged = {"ip": "5.6.7.8", "port": 8080, "protocol": "http", "anonymity": "anonymous", "judged_anonymity": "anonymous"}
+    for record in (listed, judged):
+        pipeline._store_check_result(None, _Writer(), record, True, 10, settings=Settings())
+
+    assert updates == [("1.2.3.4", None), ("5.6.7.8", "anonymous")]
+
+
+def test_funnel_rejects_dead_proxy_without_http(monkeypatch):
+    settings = Settings()
+    settings.validate_funnel_enabled = True
+    check = pipeline._select_check(settings)
+
+    timeouts = []
+    http_calls = []
+    monkeypatch.setattr(pipeline, "tcp_check", lambda ip, port, timeout: timeouts.append(timeout) or (ip == "1.1.1.1", 40))
+    monkeypatch.setattr(
+        pipeline.HTTPValidator,
+        "validate_with_http",
+        lambda ip, port, protocol, timeout: http_calls.append((ip, timeout))
+        or HTTPValidationResult(is_reachable=True, status_code=200, response_time_ms=80, protocol_verified=True),
+    )
+
+    assert check({"ip": "9.9.9.9", "port": 80, "protocol": "http"}, settings.http_timeout) == (False, 0)
+    assert check({"ip": "1.1.1.1", "port": 80, "protocol": "http"}, settings.http_timeout) == (True, 80)
+    assert timeouts == [settings.funnel_prefilter_timeout, settings.funnel_prefilter_timeout]
+    assert http_calls == [("1.1.1.1", settings.http_timeout)]
+
+
+def test_funnel_rejects_timed_out_http_probe(monkeypatch):
+    settings = Settings()
+    settings.validate_funnel_enabled = True
+    check = pipeline._select_check(settings)
+
+    monkeypatch.setattr(pipeline, "tcp_check", lambda ip, port, timeout: (True, 40))
+    monkeypatch.setattr(
+        pipeline.HTTPValidator,
+        "validate_with_http",
+        lambda ip, port, protocol, timeout: HTTPValidationResult(
+            is_reachable=False,
+            status_code=None,
+            response_time_ms=3000,
+            protocol_verified=False,
+            errors=["Read timed out."],
+        ),
+    )
+    assert check({"ip": "1.1.1.1", "port": 80, "protocol": "http"}, settings.http_timeout) == (False, 0)
+
+    monkeypatch.setattr(
+        pipeline.HTTPValidator,
+        "validate_with_http",
+        lambda ip, port, protocol, timeout: HTTPValidationResult(
+            is_reachable=False,
+            status_code=None,
+            response_time_ms=0,
+            protocol_verified=False,
+            unsupported_protocol=True,
+        ),
+    )
+    assert check({"ip": "1.1.1.1", "port": 80, "protocol": "ftp"}, settings.http_timeout) == (True, 40)
+
+
+def test_funnel_timeouts_adapt_to_observed_latency(monkeypatch):
+    settings = Settings()
+    settings.validate_funnel_enabled = True
+    check = pipeline._select_check(settings)
+
+    timeouts = []
+    monkeypatch.setattr(pipeline, "tcp_check", lambda ip, port, timeout: timeouts.append(timeout) or (True, 100))
+    monkeypatch.setattr(
+        pipeline.HTTPValidator,
+        "validate_with_http",
+        lambda ip, port, protocol, timeout: HTTPValidationResult(
+            is_reachable=True, status_code=200, response_time_ms=400, protocol_verified=True
+        ),
+    )
+
+    for _ in range(25):
+        check({"ip": "1.1.1.1", "port": 80, "protocol": "http"}, settings.http_timeout)
+
+    assert timeouts[0] == settings.funnel_prefilter_timeout
+    assert timeouts[-1] == settings.funnel_timeout_floor
+
+
+def test_run_once_skips_recently_validated_records(monkeypatch):
+    class DummyConn:
+        def close(self):
+            return None
+
+    from crawler.validation_cache import ValidationCache
+
+    cache = ValidationCache()
+    cache.set("1.2.3.4", 8080, "http", True, 30)
+
+    settings = Settings()
+    settings.source_workers = 1
+    monkeypatch.setattr(pipeline, "get_validation_cache", lambda _settings, _redis: cache)
+    monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
+    monkeypatch.setattr(pipeline, "get_sources", lambda: [Source(name="a", url="http://a", parser_key="a")])
+    monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: _RecordingRedis())
+    monkeypatch.setattr(pipeline, "upsert_source", lambda *_args, **_kwargs: 1)
+    monkeypatch.setattr(
+        pipeline,
+        "_fetch_and_parse",
+        lambda *_args, **_kwargs: [
+            {"ip": "1.2.3.4", "port": 8080, "protocol": "http"},
+            {"ip": "5.6.7.8", "port": 9090, "protocol": "http"},
+        ],
+    )
+
+    checked = []
+    monkeypatch.setattr(pipeline, "_check_record", lambda record, timeout: checked.append(record["ip"]) or (False, 0))
+    monkeypatch.setattr(pipeline, "upsert_proxies", lambda *args, **kwargs: 0)
+    monkeypatch.setattr(pipeline, "update_proxy_check", lambda *args, **kwargs: None)
+
+    pipeline.run_once(settings, quick_test=False)
+
+    assert checked == ["5.6.7.8"]
+    assert cache.get("5.6.7.8", 9090, "http") == (False, 0)
+
+
+def test_run_once_write_behind_persists_from_writer_thread(monkeypatch):
+    import threading
+
+    import crawler.write_behind as write_behind
+
+    class DummyConn:
+        def close(self):
+            return None
+
+    settings = Settings.from_env()
+    settings.source_workers = 1
+    settings.validate_workers = 2
+    settings.write_behind_enabled = True
+    settings.write_behind_batch_size = 10
+
+    redis_client = _RecordingRedis()
+    monkeypatch.setattr(pipeline, "set_settings_for_retry", lambda _settings: None)
+    monkeypatch.setattr(pipeline, "get_sources", lambda: [Source(name="source-a", url="http://a", parser_key="a")])
+    monkeypatch.setattr(pipeline, "get_mysql_connection", lambda _settings: DummyConn())
+    monkeypatch.setattr(pipeline, "get_redis_client", lambda _settings: redis_client)
+    monkeypatch.setattr(pipeline, "upsert_source", lambda *_args, **_kwargs: 1)
+    monkeypatch.setattr(pipeline, "upsert_proxies", lambda *args, **kwargs: 0)
+    monkeypatch.setattr(
+        pipeline,
+        "_fetch_and_parse",
+        lambda *_args, **_kwargs: [
+            {"ip": "1.2.3.4", "port": 8080, "protocol": "http"},
+            {"ip": "5.6.7.8", "port": 9090, "protocol": "http"},
+        ],
+    )
+    monkeypatch.setattr(pipeline, "_check_record", lambda record, timeout: (record["ip"] == "1.2.3.4", 10))
+    monkeypatch.setattr(
+        pipeline,
+        "update_proxy_check",
+        lambda *_args, **_kwargs: (_ for _ in ()).throw(AssertionError("main thread should not write")),
+    )
+
+    written = []
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: DummyConn())
+    monkeypatch.setattr(
+        write_behind,
+        "update_proxy_checks",
+        lambda _conn, rows, _window: written.extend((row[0], row[3], threading.current_thread().name) for row in rows),
+    )
+
+    pipeline.run_once(settings, quick_test=False)
+
+    assert sorted(written) == [("1.2.3.4", True, "write-behind"), ("5.6.7.8", False, "write-behind")]
+    assert list(redis_client.alive) == ["1.2.3.4:8080:http"]
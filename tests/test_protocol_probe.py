@@ -0,0 +1,170 @@
+import asyncio
+import socket
+import struct
+import threading
+
+import pytest
+
+from crawler.protocol_probe import (
+    HandshakeError,
+    async_probe_handshake,
+    build_socks4_request,
+    build_socks5_connect,
+    detect_protocols,
+    parse_connect_reply,
+    probe_handshake,
+    probe_target,
+    socks5_reply_length,
+)
+
+
+TARGET = ("example.com", 443)
+
+
+def _recv_exact(conn, size):
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _socks5_handler(conn):
+    _recv_exact(conn, 3)
+    conn.sendall(b"\x05\x00")
+    head = _recv_exact(conn, 5)
+    _recv_exact(conn, (head[4] + 2) if head[3] == 0x03 else (4 + 2 - 1))
+    conn.sendall(b"\x05\x00\x00\x01" + b"\x7f\x00\x00\x01" + struct.pack(">H", 443))
+
+
+def _socks4_handler(conn):
+    conn.recv(1024)
+    conn.sendall(b"\x00\x5a" + b"\x00" * 6)
+
+
+def _connect_handler(conn):
+    conn.recv(4096)
+    conn.sendall(b"HTTP/1.1 200 Connection established\r\n\r\n")
+
+
+def _silent_close_handler(conn):
+    conn.recv(1024)
+
+
+class _FakeServer:
+    def __init__(self, handler):
+        self._handler = handler
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(16)
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _addr = self._sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    self._handler(conn)
+                except OSError:
+                    pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self._sock.close()
+
+
+def test_probe_target_defaults_port_by_scheme():
+    assert probe_target("https://httpbin.org/ip") == ("httpbin.org", 443)
+    assert probe_target("http://judge.local:8080/judge") == ("judge.local", 8080)
+
+
+def test_build_socks4_request_ipv4_and_4a():
+    plain = build_socks4_request("1.2.3.4", 80, allow_hostname=False)
+    assert plain == b"\x04\x01\x00\x50\x01\x02\x03\x04\x00"
+
+    socks4a = build_socks4_request("example.com", 443, allow_hostname=True)
+    assert socks4a[4:8] == b"\x00\x00\x00\x01"
+    assert socks4a.endswith(b"example.com\x00")
+
+
+def test_build_socks5_connect_domain():
+    payload = build_socks5_connect("example.com", 443)
+    assert payload[:4] == b"\x05\x01\x00\x03"
+    assert payload[4] == len("example.com")
+    assert payload[-2:] == b"\x01\xbb"
+
+
+def test_socks5_reply_length_rejects_failure_code():
+    assert socks5_reply_length(b"\x05\x00\x00\x01\x00") == 10
+    with pytest.raises(HandshakeError):
+        socks5_reply_length(b"\x05\x05\x00\x01\x00")
+
+
+def test_parse_connect_reply_rejects_non_200():
+    parse_connect_reply(b"HTTP/1.0 200 OK\r\n\r\n")
+    with pytest.raises(HandshakeError):
+        parse_connect_reply(b"HTTP/1.1 407 Proxy Authentication Required\r\n\r\n")
+    with pytest.raises(HandshakeError):
+        parse_connect_reply(b"SSH-2.0-OpenSSH\r\n")
+
+
+@pytest.mark.parametrize(
+    "handler,protocol",
+    [(_socks5_handler, "socks5"), (_socks4_handler, "socks4"), (_connect_handler, "http")],
+)
+def test_probe_handshake_success(handler, protocol):
+    with _FakeServer(handler) as server:
+        result = probe_handshake("127.0.0.1", server.port, protocol, 2, ("93.184.216.34", 443))
+
+    assert result.supported is True
+    assert result.error is None
+    assert result.latency_ms >= 0
+
+
+def test_probe_handshake_detects_non_proxy():
+    with _FakeServer(_silent_close_handler) as server:
+        result = probe_handshake("127.0.0.1", server.port, "socks5", 2, TARGET)
+
+    assert result.supported is False
+    assert result.error
+
+
+def test_probe_handshake_unsupported_protocol():
+    result = probe_handshake("127.0.0.1", 1, "ftp", 1, TARGET)
+
+    assert result.supported is False
+    assert "unsupported protocol" in result.error
+
+
+def test_detect_protocols_reports_supported_list():
+    with _FakeServer(_socks5_handler) as server:
+        report = detect_protocols("127.0.0.1", server.port, 1, TARGET, protocols=("socks5",))
+
+    assert report.supported == ["socks5"]
+
+
+def test_async_probe_handshake_socks5():
+    with _FakeServer(_socks5_handler) as server:
+        result = asyncio.run(async_probe_handshake("127.0.0.1", server.port, "socks5", 2, TARGET))
+
+    assert result.supported is True
+
+
+def test_async_probe_handshake_connect_rejected():
+    def handler(conn):
+        conn.recv(4096)
+        conn.sendall(b"HTTP/1.1 403 Forbidden\r\n\r\n")
+
+    with _FakeServer(handler) as server:
+        result = asyncio.run(async_probe_handshake("127.0.0.1", server.port, "https", 2, TARGET))
+
+    assert result.supported is False
+    assert "403" in result.error
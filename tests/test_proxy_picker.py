@@ -58,3 +58,261 @@ def test_pick_proxies_country_fallback(monkeypatch):
 
     assert result["status"] == "not_found_country_fallback"
     assert result["data"]["ip"] == "2.2.2.2"
+
+
+def test_validate_candidate_consults_cache(monkeypatch):
+    from crawler import proxy_picker
+    from crawler.validation_cache import ValidationCache
+
+    settings = Settings()
+    cache = ValidationCache()
+    cache.set("1.1.1.1", 80, "http", True, 42)
+    cache.set("2.2.2.2", 80, "http", False, 0)
+
+    probes = []
+    monkeypatch.setattr(proxy_picker, "tcp_check", lambda ip, port, timeout: probes.append(ip) or (True, 15))
+    monkeypatch.setattr(proxy_picker, "_http_check", lambda *_args: True)
+
+    alive = proxy_picker._validate_candidate({"ip": "1.1.1.1", "port": 80, "protocol": "http"}, settings, None, cache)
+    dead = proxy_picker._validate_candidate({"ip": "2.2.2.2", "port": 80, "protocol": "http"}, settings, None, cache)
+    fresh = proxy_picker._validate_candidate({"ip": "3.3.3.3", "port": 80, "protocol": "http"}, settings, None, cache)
+
+    assert alive["latency_ms"] == 42
+    assert dead is None
+    assert fresh["latency_ms"] == 15
+    assert probes == ["3.3.3.3"]
+    # 取代理的结果另存在检测 URL 下，不冒充流水线的验证结果
+    assert cache.get("3.3.3.3", 80, "http") is None
+    assert cache.get("3.3.3.3", 80, "http", target="http://example.com") == (True, 15)
+
+
+def test_validate_candidate_keys_cache_by_custom_check_url(monkeypatch):
+    from crawler import proxy_picker
+    from crawler.validation_cache import ValidationCache
+
+    settings = Settings()
+    cache = ValidationCache()
+    cache.set("1.1.1.1", 80, "http", True, 42)
+
+    checked = []
+    monkeypatch.setattr(proxy_picker, "tcp_check", lambda ip, port, timeout: (True, 15))
+    monkeypatch.setattr(proxy_picker, "_http_check", lambda url, *_args: checked.append(url) or False)
+
+    candidate = {"ip": "1.1.1.1", "port": 80, "protocol": "http"}
+    assert proxy_picker._validate_candidate(candidate, settings, "https://target.example/", cache) is None
+    assert proxy_picker._validate_candidate(candidate, settings, "https://target.example/", cache) is None
+
+    assert checked == ["https://target.example/"]
+    assert cache.get("1.1.1.1", 80, "http") == (True, 42)
+    assert cache.get("1.1.1.1", 80, "http", target="https://target.example/") == (False, 0)
+
+
+def test_pick_proxies_filters_country_from_redis_meta(monkeypatch):
+    from crawler import proxy_picker
+
+    class _MetaRedis:
+        def __init__(self):
+            self.calls = []
+
+        def eval(self, script, numkeys, *args):
+            self.calls.append((numkeys, args))
+            return [
+                "1.1.1.1:80:http",
+                "US|elite|50|1700000000",
+                "2.2.2.2:80:http",
+                "DE|anonymous|80|1700000000",
+                "3.3.3.3:80:http",
+                None,
+            ]
+
+    def _no_mysql(*_args, **_kwargs):
+        raise AssertionError("country lookup should not hit MySQL")
+
+    settings = Settings(redis_meta_enabled=True)
+    redis_client = _MetaRedis()
+    monkeypatch.setattr(proxy_picker, "_filter_candidates_by_countries", _no_mysql)
+    monkeypatch.setattr(proxy_picker, "_fetch_mysql_candidates", _no_mysql)
+
+    result = pick_proxies(
+        settings,
+        protocols=["http"],
+        countries=["de"],
+        count=1,
+        require_check=False,
+        redis_client=redis_client,
+        mysql_conn=object(),
+    )
+
+    assert result["status"] == "ok"
+    assert result["data"] == {"ip": "2.2.2.2", "port": 80, "protocol": "http", "country": "DE", "latency_ms": 80}
+    assert redis_client.calls == [(2, ("proxy:alive", "proxy:meta", 20))]
+
+
+def test_pick_proxies_reads_protocol_country_index(monkeypatch):
+    from crawler import proxy_picker
+
+    class _IndexPipeline:
+        def __init__(self, owner):
+            self.owner = owner
+            self.queued = []
+
+        def zrevrange(self, key, start, end, withscores=False):
+            self.queued.append((key, start, end, withscores))
+
+        def execute(self):
+            self.owner.calls.extend(self.queued)
+            return [self.owner.data.get(key, []) for key, *_rest in self.queued]
+
+    class _IndexRedis:
+        def __init__(self):
+            self.calls = []
+            self.data = {
+                "proxy:alive:socks5:de": [("1.1.1.1:1080:socks5", 9500.0)],
+                "proxy:alive:http:de": [("2.2.2.2:80:http", 9900.0)],
+            }
+
+        def pipeline(self, transaction=True):
+            return _IndexPipeline(self)
+
+    def _no_mysql(*_args, **_kwargs):
+        raise AssertionError("index lookup should not hit MySQL")
+
+    monkeypatch.setattr(proxy_picker, "_filter_candidates_by_countries", _no_mysql)
+    monkeypatch.setattr(proxy_picker, "_fetch_mysql_candidates", _no_mysql)
+    redis_client = _IndexRedis()
+
+    result = pick_proxies(
+        Settings(redis_index_enabled=True),
+        protocols=["socks5"],
+        countries=["DE"],
+        count=1,
+        require_check=False,
+        redis_client=redis_client,
+        mysql_conn=object(),
+    )
+
+    assert result["status"] == "ok"
+    assert result["data"] == {"ip": "1.1.1.1", "port": 1080, "protocol": "socks5", "country": "DE", "latency_ms": None}
+    assert redis_client.calls == [("proxy:alive:socks5:de", 0, 19, True)]
+
+    redis_client.calls.clear()
+    result = pick_proxies(
+        Settings(redis_index_enabled=True),
+        protocols=["socks5", "http"],
+        countries=["de"],
+        count=2,
+        require_check=False,
+        redis_client=redis_client,
+        mysql_conn=object(),
+    )
+    assert [proxy["ip"] for proxy in result["data"]] == ["1.1.1.1", "2.2.2.2"]
+    assert [call[0] for call in redis_client.calls] == ["proxy:alive:socks5:de", "proxy:alive:http:de"]
+
+
+def test_parallel_pick_returns_without_waiting_for_stalled_probe(monkeypatch):
+    import threading
+
+    from crawler import proxy_picker
+
+    release = threading.Event()
+    started = []
+
+    def fake_validate(candidate, _settings, _check_url, _cache=None):
+        started.append(candidate["ip"])
+        if candidate["ip"] == "1.1.1.1":
+            release.wait(5)
+            return None
+        return {**candidate, "latency_ms": 10}
+
+    monkeypatch.setattr(proxy_picker, "_validate_candidate", fake_validate)
+    candidates = [{"ip": ip, "port": 80, "protocol": "http"} for ip in ("1.1.1.1", "2.2.2.2", "3.3.3.3", "4.4.4.4")]
+
+    try:
+        selected = proxy_picker._pick_candidates(
+            candidates, ["http", "http"], True, Settings(pick_validate_concurrency=3), None
+        )
+        # 卡住的探测尚未结束时已返回
+        assert not release.is_set()
+    finally:
+        release.set()
+
+    assert len(selected) == 2
+    assert "1.1.1.1" not in {proxy["ip"] for proxy in selected}
+    assert {"1.1.1.1", "2.2.2.2", "3.3.3.3"} <= set(started)
+
+
+def test_parallel_pick_shares_one_bounded_pool(monkeypatch):
+    import threading
+
+    from crawler import proxy_picker
+
+    monkeypatch.setattr(proxy_picker, "_validate_pool", None)
+    threads = set()
+
+    def fake_validate(candidate, _settings, _check_url, _cache=None):
+        threads.add(threading.current_thread().name)
+        return {**candidate, "latency_ms": 10}
+
+    monkeypatch.setattr(proxy_picker, "_validate_candidate", fake_validate)
+    candidates = [{"ip": f"10.0.0.{index}", "port": 80, "protocol": "http"} for index in range(8)]
+    settings = Settings(pick_validate_concurrency=4, pick_validate_pool_size=2)
+
+    for _ in range(5):
+        assert len(proxy_picker._pick_candidates(list(candidates), ["http"] * 3, True, settings, None)) == 3
+
+    pool = proxy_picker._validate_pool
+    assert pool is proxy_picker._get_validate_pool(settings)
+    assert pool._max_workers == 2
+    assert threads and all(name.startswith("pick-validate") for name in threads)
+    assert len(threads) <= 2
+    pool.shutdown(wait=True)
+
+
+def test_parallel_pick_hedges_after_delay(monkeypatch):
+    import threading
+
+    from crawler import proxy_picker
+
+    release = threading.Event()
+    started = []
+
+    def fake_validate(candidate, _settings, _check_url, _cache=None):
+        started.append(candidate["ip"])
+        if candidate["ip"] == "1.1.1.1":
+            release.wait(5)
+            return None
+        return {**candidate, "latency_ms": 10}
+
+    monkeypatch.setattr(proxy_picker, "_validate_candidate", fake_validate)
+    candidates = [{"ip": ip, "port": 80, "protocol": "http"} for ip in ("1.1.1.1", "2.2.2.2", "3.3.3.3")]
+    settings = Settings(pick_validate_concurrency=4, pick_hedge_delay=0.05)
+
+    try:
+        selected = proxy_picker._pick_candidates(candidates, ["http"], True, settings, None)
+    finally:
+        release.set()
+
+    assert [proxy["ip"] for proxy in selected] == ["2.2.2.2"]
+    assert started[:2] == ["1.1.1.1", "2.2.2.2"]
+    assert "3.3.3.3" not in started
+
+
+def test_parallel_pick_fills_protocol_gaps_with_other_protocols(monkeypatch):
+    from crawler import proxy_picker
+
+    monkeypatch.setattr(
+        proxy_picker,
+        "_validate_candidate",
+        lambda candidate, *_args: None if candidate["ip"] == "3.3.3.3" else {**candidate, "latency_ms": 10},
+    )
+    candidates = [
+        {"ip": "1.1.1.1", "port": 80, "protocol": "http"},
+        {"ip": "2.2.2.2", "port": 80, "protocol": "http"},
+        {"ip": "3.3.3.3", "port": 443, "protocol": "https"},
+    ]
+
+    selected = proxy_picker._pick_candidates(
+        candidates, ["http", "https"], True, Settings(pick_validate_concurrency=2), None
+    )
+
+    assert sorted(proxy["ip"] for proxy in selected) == ["1.1.1.1", "2.2.2.2"]
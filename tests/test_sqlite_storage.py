@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from crawler import storage
+from crawler.config import Settings
+
+
+@pytest.fixture()
+def conn(tmp_path):
+    settings = Settings(storage_backend="sqlite", sqlite_path=str(tmp_path / "pool.db"))
+    connection = storage.get_mysql_connection(settings)
+    yield connection
+    connection.close()
+
+
+def _row(conn, ip, port, protocol, columns):
+    return conn.raw.execute(
+        f"SELECT {columns} FROM proxy_ips WHERE ip=? AND port=? AND protocol=?",
+        (ip, port, protocol),
+    ).fetchone()
+
+
+def test_get_connection_returns_wal_sqlite(conn):
+    assert storage.is_sqlite_connection(conn)
+    assert conn.raw.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_upserts_revive_deleted_rows(conn):
+    source_id = storage.upsert_source(conn, "demo", "http://example.com/a", "plain")
+    assert storage.upsert_source(conn, "demo", "http://example.com/b", "plain") == source_id
+
+    records = [
+        {"ip": "1.1.1.1", "port": 80, "protocol": "http"},
+        {"ip": "2.2.2.2", "port": 1080, "protocol": "socks5", "country": "US"},
+    ]
+    assert storage.upsert_proxies(conn, records, source_id, chunk_size=1) == 2
+    conn.raw.execute("UPDATE proxy_ips SET is_deleted=1, fail_count=4 WHERE ip='1.1.1.1'")
+
+    storage.upsert_proxy(conn, "1.1.1.1", 80, "http", "elite", None, source_id)
+
+    assert _row(conn, "1.1.1.1", 80, "http", "is_deleted, fail_count, anonymity") == (0, 0, "elite")
+    assert conn.raw.execute("SELECT COUNT(*) FROM proxy_ips").fetchone()[0] == 2
+
+
+def test_check_updates_follow_fail_window(conn):
+    storage.upsert_proxies(conn, [{"ip": "1.1.1.1", "port": 80, "protocol": "http"}], None)
+
+    storage.update_proxy_check(conn, "1.1.1.1", 80, "http", False, 0, 24)
+    storage.update_proxy_checks(conn, [("1.1.1.1", 80, "http", False, 0, None)], 24)
+    is_alive, fail_count, window_start = _row(conn, "1.1.1.1", 80, "http", "is_alive, fail_count, fail_window_start")
+    assert (is_alive, fail_count) == (0, 2)
+    assert isinstance(window_start, datetime)
+
+    # 窗口过期后重新计数
+    conn.raw.execute("UPDATE proxy_ips SET fail_window_start=?", (datetime.now() - timedelta(hours=30),))
+    storage.update_proxy_checks(conn, [("1.1.1.1", 80, "http", False, 0, None)], 24)
+    assert _row(conn, "1.1.1.1", 80, "http", "fail_count")[0] == 1
+
+    storage.update_proxy_checks(conn, [("1.1.1.1", 80, "http", True, 120, "anonymous")], 24)
+    assert _row(conn, "1.1.1.1", 80, "http", "is_alive, latency_ms, fail_count, fail_window_start, anonymity") == (
+        1,
+        120,
+        0,
+        None,
+        "anonymous",
+    )
+
+
+def test_check_batch_orders_unchecked_first_and_shards(conn):
+    records = [{"ip": f"10.0.0.{index}", "port": 80, "protocol": "http"} for index in range(1, 7)]
+    storage.upsert_proxies(conn, records, None)
+    conn.raw.execute("UPDATE proxy_ips SET last_checked_at=? WHERE id<=2", (datetime.now(),))
+
+    batch = storage.fetch_check_batch(conn, 3)
+    assert [row[0] for row in batch] == [3, 4, 5]
+
+    shard = storage.fetch_check_batch(conn, 10, shard_index=1, shard_count=2)
+    assert {row[0] for row in shard} == {3, 5, 1}
+
+    storage.update_proxy_checks_with_window(
+        conn,
+        [(3, False, 0, datetime(2026, 1, 1, 8, 0, 0), 5, True), (4, True, 90, None, 0, False)],
+    )
+    assert conn.raw.execute("SELECT is_deleted, fail_window_start FROM proxy_ips WHERE id=3").fetchone() == (
+        1,
+        datetime(2026, 1, 1, 8, 0, 0),
+    )
+    assert conn.raw.execute("SELECT is_alive, latency_ms FROM proxy_ips WHERE id=4").fetchone() == (1, 90)
+
+
+def test_candidates_and_country_lookup(conn):
+    storage.upsert_proxies(
+        conn,
+        [
+            {"ip": "1.1.1.1", "port": 80, "protocol": "http", "country": "US"},
+            {"ip": "2.2.2.2", "port": 80, "protocol": "http", "country": "DE"},
+            {"ip": "3.3.3.3", "port": 1080, "protocol": "socks5", "country": "US"},
+            {"ip": "4.4.4.4", "port": 80, "protocol": "http", "country": "US"},
+        ],
+        None,
+    )
+    storage.update_proxy_checks(
+        conn,
+        [
+            ("1.1.1.1", 80, "http", True, 300, None),
+            ("2.2.2.2", 80, "http", True, 100, None),
+            ("3.3.3.3", 1080, "socks5", True, 200, None),
+        ],
+        24,
+    )
+    conn.raw.execute("UPDATE proxy_ips SET is_alive=1, latency_ms=NULL WHERE ip='4.4.4.4'")
+
+    rows = storage.fetch_mysql_candidates(conn, ["http", "socks5"], None, 10)
+    assert [row["ip"] for row in rows] == ["2.2.2.2", "3.3.3.3", "1.1.1.1", "4.4.4.4"]
+
+    rows = storage.fetch_mysql_candidates(conn, ["http"], ["US"], 1)
+    assert rows == [{"ip": "1.1.1.1", "port": 80, "protocol": "http", "country": "US", "latency_ms": 300}]
+
+    mapping = storage.fetch_proxy_countries(
+        conn,
+        [{"ip": "2.2.2.2", "port": 80, "protocol": "http"}, {"ip": "9.9.9.9", "port": 80, "protocol": "http"}],
+    )
+    assert mapping == {("2.2.2.2", 80, "http"): "DE"}
+
+    subnet = storage.fetch_proxies_in_subnet(conn, "2.0.0.0/7")
+    assert [row["ip"] for row in subnet] == ["2.2.2.2", "3.3.3.3"]
+
+
+def test_archive_and_rehydrate_round_trip(conn):
+    storage.upsert_proxies(
+        conn,
+        [{"ip": "1.1.1.1", "port": 80, "protocol": "http", "country": "US"}, {"ip": "2.2.2.2", "port": 80, "protocol": "http"}],
+        None,
+    )
+    old = datetime.now() - timedelta(days=10)
+    conn.raw.execute("UPDATE proxy_ips SET is_deleted=1, fail_count=5, last_checked_at=?", (old,))
+
+    assert storage.archive_deleted_proxies(conn, 168, chunk_size=1) == 2
+    assert conn.raw.execute("SELECT COUNT(*) FROM proxy_ips").fetchone()[0] == 0
+    assert conn.raw.execute("SELECT COUNT(*) FROM proxy_ips_archive").fetchone()[0] == 2
+
+    storage.upsert_proxies(conn, [{"ip": "1.1.1.1", "port": 80, "protocol": "http"}], None, rehydrate=True)
+
+    assert _row(conn, "1.1.1.1", 80, "http", "is_deleted, fail_count") == (0, 0)
+    assert conn.raw.execute("SELECT ip FROM proxy_ips_archive").fetchall() == [("2.2.2.2",)]
+
+
+def test_session_logging_runs_portable_sql(conn):
+    session_id = storage.insert_crawl_session(conn, {"user_url": "http://example.com"})
+    page_log_id = storage.insert_page_log(conn, {"session_id": session_id, "page_url": "http://example.com"})
+    storage.insert_review_queue_item(
+        conn,
+        {"session_id": session_id, "page_log_id": page_log_id, "ip": "1.1.1.1", "port": 80, "protocol": "http"},
+    )
+    storage.insert_llm_call_log(conn, {"session_id": session_id, "page_log_id": page_log_id})
+
+    assert storage.check_duplicate(conn, "1.1.1.1", 80, "http", session_id=session_id)
+    assert not storage.check_duplicate(conn, "1.1.1.1", 80, "http")
+
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "UPDATE crawl_session SET status='completed', completed_at=CURRENT_TIMESTAMP WHERE id=%s",
+            (session_id,),
+        )
+        cursor.execute("SELECT status, completed_at FROM crawl_session WHERE id=%s", (session_id,))
+        status, completed_at = cursor.fetchone()
+    assert status == "completed"
+    assert abs(completed_at - datetime.now()) < timedelta(minutes=1)
+
+
+def test_iter_pool_rows_streams_by_id(conn):
+    records = [{"ip": f"10.0.0.{index}", "port": 80, "protocol": "http", "country": "US"} for index in range(1, 6)]
+    storage.upsert_proxies(conn, records, None)
+    storage.update_proxy_checks(conn, [("10.0.0.2", 80, "http", True, 90, None)], 24)
+
+    chunks = list(storage.iter_pool_rows(conn, chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    ip, port, protocol, country, _anonymity, latency_ms, last_checked_at, is_alive, is_deleted = chunks[0][1]
+    assert (ip, port, protocol, country, latency_ms, is_alive, is_deleted) == ("10.0.0.2", 80, "http", "US", 90, 1, 0)
+    assert isinstance(last_checked_at, datetime)
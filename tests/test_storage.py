@@ -44,6 +44,218 @@ def test_upsert_proxy_restores_deleted_flag():
     assert "fail_count=0" in query
 
 
+def test_upsert_proxies_chunks_multi_row_values():
+    executed = []
+
+    class DummyCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params):
+            executed.append((query, list(params)))
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+    from crawler.storage import upsert_proxies
+
+    records = [
+        {"ip": "1.1.1.1", "port": "80", "protocol": "http"},
+        {"ip": "2.2.2.2", "port": 1080, "protocol": "socks5", "anonymity": "elite", "country": "US"},
+        {"ip": "3.3.3.3", "port": 8080, "protocol": "http"},
+    ]
+    stored = upsert_proxies(DummyConn(), records, 7, chunk_size=2)
+
+    assert stored == 3
+    assert len(executed) == 2
+    first_query, first_params = executed[0]
+    assert first_query.count("(%s, %s, %s, %s, %s, %s)") == 2
+    assert "ON DUPLICATE KEY UPDATE" in first_query
+    assert "is_deleted=0" in first_query
+    assert first_params == ["1.1.1.1", 80, "http", None, None, 7, "2.2.2.2", 1080, "socks5", "elite", "US", 7]
+    assert executed[1][0].count("(%s, %s, %s, %s, %s, %s)") == 1
+    assert upsert_proxies(DummyConn(), [], 7) == 0
+    assert len(executed) == 2
+
+
+
+def test_upsert_proxies_rehydrates_archived_rows_first():
+    executed = []
+
+    class DummyCursor:
+        rowcount = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params):
+            executed.append((" ".join(query.split()), list(params)))
+            # 仅第一块命中归档表
+            self.rowcount = 1 if query.lstrip().startswith("INSERT IGNORE") and len(executed) == 1 else 0
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+    from crawler.storage import upsert_proxies
+
+    records = [
+        {"ip": "1.1.1.1", "port": 80, "protocol": "http"},
+        {"ip": "2.2.2.2", "port": 1080, "protocol": "socks5"},
+        {"ip": "3.3.3.3", "port": 8080, "protocol": "http"},
+    ]
+    assert upsert_proxies(DummyConn(), records, 7, chunk_size=2, rehydrate=True) == 3
+
+    statements = [query.split(" ")[0] + " " + query.split(" ")[1] for query, _params in executed]
+    assert statements == ["INSERT IGNORE", "DELETE FROM", "INSERT INTO", "INSERT IGNORE", "INSERT INTO"]
+    assert "FROM proxy_ips_archive" in executed[0][0]
+    assert executed[0][1] == ["1.1.1.1", 80, "http", "2.2.2.2", 1080, "socks5"]
+    assert executed[1][1] == executed[0][1]
+
+
+def test_archive_deleted_proxies_moves_chunks_in_transactions():
+    executed = []
+    events = []
+    batches = [[(1,), (2,)], [(3,)]]
+
+    class DummyCursor:
+        rowcount = 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params):
+            executed.append((" ".join(query.split()), list(params)))
+            self.rowcount = len(params) if query.lstrip().startswith("DELETE") else 0
+
+        def fetchall(self):
+            return batches.pop(0) if batches else []
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+        def begin(self):
+            events.append("begin")
+
+        def commit(self):
+            events.append("commit")
+
+        def rollback(self):
+            events.append("rollback")
+
+    from crawler.storage import archive_deleted_proxies
+
+    moved = archive_deleted_proxies(DummyConn(), 168, chunk_size=2)
+
+    assert moved == 3
+    assert events == ["begin", "commit", "begin", "commit"]
+    select_query, select_params = executed[0]
+    assert "is_deleted=1 AND last_checked_at < NOW() - INTERVAL %s HOUR" in select_query
+    assert select_params == [168, 2]
+    assert executed[1][0].startswith("INSERT INTO proxy_ips_archive")
+    assert executed[2] == ("DELETE FROM proxy_ips WHERE id IN (%s, %s) AND is_deleted=1", [1, 2])
+    # 第二块不足 chunk_size，视为已归档完毕，不再查询
+    assert len(executed) == 6
+
+
+def test_update_proxy_checks_with_window_uses_chunked_case_updates():
+    executed = []
+
+    class DummyCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params):
+            executed.append((query, list(params)))
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+    from crawler.storage import update_proxy_checks_with_window
+
+    rows = [
+        (1, True, 100, None, 0, False),
+        (2, False, 0, None, 3, False),
+        (3, False, 0, None, 5, True),
+        (1, False, 0, None, 1, False),
+    ]
+    written = update_proxy_checks_with_window(DummyConn(), rows, chunk_size=2)
+
+    assert written == 3
+    assert len(executed) == 2
+    query, params = executed[0]
+    assert query.count("CASE id WHEN %s THEN %s WHEN %s THEN %s END") == 5
+    assert "last_checked_at=CURRENT_TIMESTAMP" in query
+    assert "WHERE id IN (%s, %s)" in query
+    # 同一 id 以最后一条结果为准
+    assert params[:4] == [1, 0, 2, 0]
+    assert params[-2:] == [1, 2]
+    assert executed[1][1][-1] == 3
+    assert update_proxy_checks_with_window(DummyConn(), []) == 0
+
+
+def test_update_proxy_checks_bulk_keeps_window_semantics():
+    executed = []
+
+    class DummyCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params):
+            executed.append((query, list(params)))
+
+        def fetchall(self):
+            # 2.2.2.2 已归档，不在热表中
+            return [(7, "1.1.1.1", 80, "HTTP"), (9, "3.3.3.3", 3128, "http")]
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+    from crawler.storage import update_proxy_checks
+
+    rows = [
+        ("1.1.1.1", 80, "http", True, 120, "elite"),
+        ("2.2.2.2", 1080, "socks5", False, 0, None),
+        ("1.1.1.1", 80, "http", False, 0, None),
+        ("3.3.3.3", 3128, "http", True, 50, "anonymous"),
+    ]
+    assert update_proxy_checks(DummyConn(), rows, 24, chunk_size=500) == 2
+
+    assert len(executed) == 2
+    select_query, select_params = executed[0]
+    assert "(ip, port, protocol) IN ((%s, %s, %s), (%s, %s, %s), (%s, %s, %s))" in select_query
+    assert select_params == ["1.1.1.1", 80, "http", "2.2.2.2", 1080, "socks5", "3.3.3.3", 3128, "http"]
+
+    query, params = executed[1]
+    assert "INSERT" not in query and "DUPLICATE" not in query
+    assert query.count("CASE id WHEN %s THEN %s WHEN %s THEN %s END") == 3
+    assert "anonymity=COALESCE(CASE id" in query
+    assert query.index("is_alive=CASE id") < query.index("fail_window_start=CASE") < query.index("fail_count=CASE")
+    assert "WHERE id IN (%s, %s)" in query
+    # 同一代理以最后一条为准
+    assert params == [7, 0, 9, 1, 7, 0, 9, 50, 7, None, 9, "anonymous", 24, 24, 7, 9]
+    assert update_proxy_checks(DummyConn(), [], 24) == 0
+
+
 def test_run_with_schema_retry_executes_schema_on_missing_table():
     import pymysql
 
@@ -266,3 +478,439 @@ def test_fetch_proxy_countries_uses_ip_port_protocol_key():
     )
 
     assert mapping[("1.2.3.4", 8080, "http")] == "US"
+
+
+
+def test_compact_key_helpers_round_trip():
+    from crawler.storage import (
+        bytes_to_ip,
+        ip_to_bytes,
+        make_proxy_key,
+        parse_proxy_key,
+        protocol_to_id,
+        subnet_bounds,
+    )
+
+    assert ip_to_bytes("1.2.3.4") == bytes([1, 2, 3, 4])
+    assert len(ip_to_bytes("2001:db8::1")) == 16
+    assert bytes_to_ip(ip_to_bytes("2001:db8::1")) == "2001:db8::1"
+    assert protocol_to_id("SOCKS5") == 4
+    assert protocol_to_id("ftp") == 0
+
+    key = make_proxy_key("1.2.3.4", 8080, "https")
+    assert key == (0x01020304 << 24) | (8080 << 8) | 2
+    assert parse_proxy_key(key) == ("1.2.3.4", 8080, "https")
+    assert make_proxy_key("2001:db8::1", 8080, "http") is None
+    assert make_proxy_key("1.2.3.4", 8080, "ftp") is None
+    assert make_proxy_key("1.2.3.4", 65536, "http") is None
+    assert parse_proxy_key(make_proxy_key("1.2.3.4", 1080, "socks4a")) == ("1.2.3.4", 1080, "socks4a")
+
+    assert subnet_bounds("10.1.2.3/16") == (bytes([10, 1, 0, 0]), bytes([10, 1, 255, 255]))
+
+
+def test_fetch_proxy_countries_compact_keys_splits_ipv6():
+    from crawler.storage import fetch_proxy_countries, make_proxy_key
+
+    v4_key = make_proxy_key("1.2.3.4", 8080, "http")
+    queries = []
+
+    class DummyCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params=None):
+            queries.append((query, list(params)))
+
+        def fetchall(self):
+            if "proxy_key IN" in queries[-1][0]:
+                return [(v4_key, "US")]
+            return [("2001:db8::1", 1080, "socks5", "DE")]
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+    mapping = fetch_proxy_countries(
+        DummyConn(),
+        [
+            {"ip": "1.2.3.4", "port": 8080, "protocol": "http"},
+            {"ip": "2001:db8::1", "port": 1080, "protocol": "socks5"},
+        ],
+        compact_keys=True,
+    )
+
+    assert mapping == {("1.2.3.4", 8080, "http"): "US", ("2001:db8::1", 1080, "socks5"): "DE"}
+    assert queries[0][1] == [v4_key]
+    assert queries[1][1] == ["2001:db8::1", 1080, "socks5"]
+
+
+def test_fetch_proxies_in_subnet_uses_ip_bin_range():
+    from crawler.storage import fetch_proxies_in_subnet
+
+    captured = {}
+
+    class DummyCursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, _exc_type, _exc, _tb):
+            return False
+
+        def execute(self, query, params=None):
+            captured["query"] = query
+            captured["params"] = params
+
+        def fetchall(self):
+            return [("10.1.0.9", 3128, "http", "CN", 120)]
+
+    class DummyConn:
+        def cursor(self):
+            return DummyCursor()
+
+    rows = fetch_proxies_in_subnet(DummyConn(), "10.1.0.0/16", limit=50)
+
+    assert "ip_bin BETWEEN %s AND %s" in captured["query"]
+    assert captured["params"] == (bytes([10, 1, 0, 0]), bytes([10, 1, 255, 255]), 4, 50)
+    assert rows[0]["ip"] == "10.1.0.9" and rows[0]["country"] == "CN"
+
+
+class _PoolConn:
+    created = 0
+
+    def __init__(self):
+        _PoolConn.created += 1
+        self.open = True
+        self.pings = 0
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def close(self):
+        self.closed = True
+        self.open = False
+
+
+def test_mysql_pool_reuses_released_connections():
+    from crawler.storage import MySQLConnectionPool
+
+    pool = MySQLConnectionPool(_PoolConn, min_size=1, max_size=2, timeout=0.1, ping_interval=3600)
+    first = pool.acquire()
+    raw = first.raw
+    first.close()
+    first.close()
+
+    second = pool.acquire()
+    assert second.raw is raw
+    assert raw.pings == 0
+    assert pool.stats() == {"total": 1, "idle": 0, "in_use": 1}
+
+    with pool.acquire() as third:
+        assert third.raw is not raw
+    assert pool.stats() == {"total": 2, "idle": 1, "in_use": 1}
+    second.close()
+
+
+def test_mysql_pool_waits_then_times_out_when_exhausted():
+    import threading
+
+    import pymysql
+    import pytest
+
+    from crawler.storage import MySQLConnectionPool
+
+    pool = MySQLConnectionPool(_PoolConn, min_size=0, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.acquire()
+
+    # 其他线程归还后，等待中的借用方拿到同一连接
+    pool.timeout = 2
+    raw = held.raw
+    threading.Timer(0.05, held.close).start()
+    assert pool.acquire().raw is raw
+
+
+def test_mysql_pool_pings_idle_and_drops_broken_connections():
+    from crawler.storage import MySQLConnectionPool
+
+    pool = MySQLConnectionPool(_PoolConn, min_size=1, max_size=2, ping_interval=0)
+    conn = pool.acquire()
+    raw = conn.raw
+    assert raw.pings == 1
+
+    raw.open = False
+    conn.close()
+    assert raw.closed is True
+    assert pool.stats()["total"] == 0
+
+    replacement = pool.acquire()
+    assert replacement.raw is not raw
+    replacement.close()
+    pool.close()
+    assert pool.stats()["total"] == 0
+
+
+def test_get_mysql_connection_uses_shared_pool(monkeypatch):
+    from crawler import storage
+    from crawler.config import Settings
+
+    opened = []
+    monkeypatch.setattr(storage, "_mysql_pools", {})
+    monkeypatch.setattr(storage, "_open_mysql_connection", lambda settings: opened.append(1) or _PoolConn())
+
+    settings = Settings.from_env()
+    settings.mysql_pool_enabled = True
+    settings.mysql_pool_min_size = 0
+    for _ in range(3):
+        storage.get_mysql_connection(settings).close()
+    assert len(opened) == 1
+
+    settings.mysql_pool_enabled = False
+    direct = storage.get_mysql_connection(settings)
+    assert isinstance(direct, _PoolConn)
+    storage.close_mysql_pools()
+
+
+class _FakeRedisPipeline:
+    def __init__(self, rds):
+        self.rds = rds
+        self.commands = []
+
+    def zadd(self, key, mapping):
+        self.commands.append(("zadd", key, dict(mapping)))
+
+    def zrem(self, key, *members):
+        self.commands.append(("zrem", key, set(members)))
+
+    def hset(self, key, mapping):
+        self.commands.append(("hset", key, dict(mapping)))
+
+    def hdel(self, key, *fields):
+        self.commands.append(("hdel", key, set(fields)))
+
+    def execute(self, raise_on_error=True):
+        self.rds.batches.append(self.commands)
+        if self.rds.fail_with is not None:
+            raise self.rds.fail_with
+        return [self.rds.zrem_reply if name == "zrem" else len(arg) for name, _key, arg in self.commands]
+
+
+class _FakePipelinedRedis:
+    def __init__(self):
+        self.batches = []
+        self.fail_with = None
+        self.zrem_reply = 0
+
+    def pipeline(self, transaction=True):
+        assert transaction is False
+        return _FakeRedisPipeline(self)
+
+
+def test_redis_pool_writer_batches_by_size_and_keeps_last_op():
+    from crawler.storage import RedisPoolWriter
+
+    rds = _FakePipelinedRedis()
+    writer = RedisPoolWriter(rds, batch_size=3, flush_interval=3600)
+    assert writer.add("1.1.1.1", 80, "http", 9900) is None
+    assert writer.remove("2.2.2.2", 80, "http") is None
+    assert writer.add("2.2.2.2", 80, "http", 9800) is None
+    result = writer.add("3.3.3.3", 80, "http", 9700)
+
+    assert result is not None and (result.sent, result.failed) == (3, 0)
+    assert rds.batches == [
+        [("zadd", "proxy:alive", {"1.1.1.1:80:http": 9900, "2.2.2.2:80:http": 9800, "3.3.3.3:80:http": 9700})]
+    ]
+
+    writer.remove("1.1.1.1", 80, "http")
+    assert writer.flush().sent == 1
+    assert rds.batches[-1] == [("zrem", "proxy:alive", {"1.1.1.1:80:http"})]
+    assert writer.flush().sent == 0
+    assert len(rds.batches) == 2
+
+
+def test_redis_pool_writer_reports_failures():
+    import redis as redis_lib
+
+    from crawler.storage import RedisPoolWriter
+
+    rds = _FakePipelinedRedis()
+    writer = RedisPoolWriter(rds, batch_size=100, flush_interval=3600)
+    writer.add("1.1.1.1", 80, "http", 1)
+    writer.remove("2.2.2.2", 80, "http")
+    rds.zrem_reply = redis_lib.ResponseError("WRONGTYPE")
+    result = writer.flush()
+    assert (result.sent, result.failed) == (1, 1)
+    assert "WRONGTYPE" in result.error
+
+    rds.fail_with = redis_lib.ConnectionError("down")
+    writer.add("3.3.3.3", 80, "http", 1)
+    result = writer.flush()
+    assert (result.sent, result.failed) == (0, 1)
+    assert (writer.sent, writer.failed) == (1, 2)
+    assert writer.last_error == "down"
+
+
+def test_redis_pool_writer_writes_meta_alongside_zset():
+    from crawler.storage import RedisPoolWriter, decode_proxy_meta
+
+    rds = _FakePipelinedRedis()
+    writer = RedisPoolWriter(rds, batch_size=100, flush_interval=3600, meta_key="proxy:meta")
+    meta = {"country": "DE", "anonymity": "elite", "latency_ms": 120, "checked_at": 1700000000}
+    writer.add("1.1.1.1", 80, "http", 9880, meta=meta)
+    writer.add("2.2.2.2", 80, "http", 9000)
+    writer.remove("3.3.3.3", 80, "http")
+
+    result = writer.flush()
+
+    assert (result.sent, result.failed) == (3, 0)
+    batch = {name: (key, arg) for name, key, arg in rds.batches[-1]}
+    assert batch["hset"] == ("proxy:meta", {"1.1.1.1:80:http": "DE|elite|120|1700000000"})
+    assert batch["hdel"] == ("proxy:meta", {"3.3.3.3:80:http"})
+    assert decode_proxy_meta(batch["hset"][1]["1.1.1.1:80:http"]) == meta
+
+
+def test_proxy_meta_decode_tolerates_blanks_and_garbage():
+    from crawler.storage import build_proxy_meta, decode_proxy_meta, encode_proxy_meta
+
+    meta = build_proxy_meta({"ip": "1.1.1.1"}, None, checked_at=5)
+    assert encode_proxy_meta(meta) == "|||5"
+    assert decode_proxy_meta(b"|||5") == {"country": None, "anonymity": None, "latency_ms": None, "checked_at": 5}
+    assert decode_proxy_meta(None) is None
+    assert decode_proxy_meta("US|elite") is None
+    assert decode_proxy_meta("US|elite|fast|5") is None
+
+
+def test_redis_pool_writer_maintains_protocol_and_country_indexes():
+    from crawler.storage import RedisPoolWriter
+
+    rds = _FakePipelinedRedis()
+    writer = RedisPoolWriter(rds, batch_size=100, flush_interval=3600, indexed=True)
+    writer.add("1.1.1.1", 1080, "SOCKS5", 9880, meta={"country": "DE"})
+    writer.add("2.2.2.2", 80, "http", 9000)
+    writer.remove("3.3.3.3", 1080, "socks5", "DE")
+    writer.remove("4.4.4.4", 80, "http")
+
+    assert writer.flush().sent == 4
+    batch = rds.batches[-1]
+    assert ("zadd", "proxy:alive:socks5", {"1.1.1.1:1080:SOCKS5": 9880}) in batch
+    assert ("zadd", "proxy:alive:socks5:de", {"1.1.1.1:1080:SOCKS5": 9880}) in batch
+    assert ("zadd", "proxy:alive:http", {"2.2.2.2:80:http": 9000}) in batch
+    assert ("zrem", "proxy:alive:socks5", {"3.3.3.3:1080:socks5"}) in batch
+    assert ("zrem", "proxy:alive:socks5:de", {"3.3.3.3:1080:socks5"}) in batch
+    assert ("zrem", "proxy:alive:http", {"4.4.4.4:80:http"}) in batch
+    assert len(batch) == 8
+
+
+def test_redis_pool_writer_records_check_time():
+    from crawler.storage import RedisPoolWriter
+
+    rds = _FakePipelinedRedis()
+    writer = RedisPoolWriter(rds, batch_size=100, flush_interval=3600, checked_key="proxy:checked")
+    writer.add("1.1.1.1", 80, "http", 9880, meta={"checked_at": 1700000000})
+    writer.remove("2.2.2.2", 80, "http")
+
+    assert writer.flush().sent == 2
+    batch = rds.batches[-1]
+    assert ("zadd", "proxy:checked", {"1.1.1.1:80:http": 1700000000}) in batch
+    assert ("zrem", "proxy:checked", {"2.2.2.2:80:http"}) in batch
+
+
+class _SweepRedis(_FakePipelinedRedis):
+    def __init__(self, replies, alive=(), checked=(), index_keys=()):
+        super().__init__()
+        self.replies = list(replies)
+        self.evals = []
+        self.alive = list(alive)
+        self.checked = dict.fromkeys(checked, 0)
+        self.index_keys = list(index_keys)
+        self.scans = 0
+
+    def zcard(self, key):
+        return len(self.alive) if key == "proxy:alive" else len(self.checked)
+
+    def zscan(self, key, cursor, count):
+        chunk = self.alive[cursor : cursor + count]
+        next_cursor = cursor + count if cursor + count < len(self.alive) else 0
+        return next_cursor, [(member, 1.0) for member in chunk]
+
+    def zadd(self, key, mapping, nx=False):
+        assert key == "proxy:checked" and nx is True
+        added = [member for member in mapping if member not in self.checked]
+        self.checked.update({member: mapping[member] for member in added})
+        return len(added)
+
+    def scan_iter(self, match):
+        assert match == "proxy:alive:*:*"
+        self.scans += 1
+        return iter(self.index_keys)
+
+    def eval(self, script, numkeys, *args):
+        self.evals.append((numkeys, args))
+        return self.replies.pop(0)
+
+
+def test_sweep_stale_proxies_steps_until_short_batch():
+    from crawler.storage import sweep_stale_proxies
+
+    rds = _SweepRedis(
+        [
+            ["1.1.1.1:80:http", "DE||80|100", "2.2.2.2:1080:socks5", "|||100"],
+            ["3.3.3.3:80:http", "|||100"],
+        ]
+    )
+
+    removed = sweep_stale_proxies(rds, 3600, batch_size=2, indexed=True, now=10000)
+
+    assert removed == 3
+    assert rds.evals == [
+        (3, ("proxy:checked", "proxy:alive", "proxy:meta", 6400, 2)),
+        (3, ("proxy:checked", "proxy:alive", "proxy:meta", 6400, 2)),
+    ]
+    assert rds.batches[0] == [
+        ("zrem", "proxy:alive:http", {"1.1.1.1:80:http"}),
+        ("zrem", "proxy:alive:http:de", {"1.1.1.1:80:http"}),
+        ("zrem", "proxy:alive:socks5", {"2.2.2.2:1080:socks5"}),
+    ]
+    assert rds.batches[1] == [("zrem", "proxy:alive:http", {"3.3.3.3:80:http"})]
+    assert rds.scans == 0
+
+    rds = _SweepRedis([["1.1.1.1:80:http", None, "2.2.2.2:80:http", None]])
+    assert sweep_stale_proxies(rds, 60, batch_size=2, max_batches=1, now=100) == 2
+    assert rds.batches == []
+
+
+def test_sweep_stale_proxies_cleans_country_indexes_without_meta():
+    from crawler.storage import sweep_stale_proxies
+
+    rds = _SweepRedis(
+        [["1.1.1.1:80:HTTP", None, "2.2.2.2:1080:socks5", None]],
+        index_keys=[b"proxy:alive:http:de", "proxy:alive:http:us", "proxy:alive:socks5:de"],
+    )
+
+    assert sweep_stale_proxies(rds, 60, batch_size=10, indexed=True, now=100) == 2
+    assert rds.scans == 1
+    assert rds.batches[0] == [
+        ("zrem", "proxy:alive:http", {"1.1.1.1:80:HTTP"}),
+        ("zrem", "proxy:alive:http:de", {"1.1.1.1:80:HTTP"}),
+        ("zrem", "proxy:alive:http:us", {"1.1.1.1:80:HTTP"}),
+        ("zrem", "proxy:alive:socks5", {"2.2.2.2:1080:socks5"}),
+        ("zrem", "proxy:alive:socks5:de", {"2.2.2.2:1080:socks5"}),
+    ]
+
+
+def test_sweep_stale_proxies_seeds_members_missing_check_time():
+    from crawler.storage import sweep_stale_proxies
+
+    alive = ["1.1.1.1:80:http", "2.2.2.2:80:http", "3.3.3.3:80:http"]
+    rds = _SweepRedis([[]], alive=alive, checked=["2.2.2.2:80:http"])
+
+    assert sweep_stale_proxies(rds, 60, batch_size=2, now=1000) == 0
+    assert rds.checked == {"1.1.1.1:80:http": 1000, "2.2.2.2:80:http": 0, "3.3.3.3:80:http": 1000}
+
+    rds = _SweepRedis([[]], alive=alive[:1], checked=alive[:1])
+    sweep_stale_proxies(rds, 60, now=1000)
+    assert rds.checked == {"1.1.1.1:80:http": 0}
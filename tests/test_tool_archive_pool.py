@@ -0,0 +1,44 @@
+import json
+
+from crawler.config import Settings
+
+
+def test_archive_cli_requires_enabled(monkeypatch, capsys):
+    from tools import archive_pool
+
+    monkeypatch.setattr(archive_pool, "load_settings", lambda _env=None: Settings(archive_enabled=False))
+    monkeypatch.setattr(
+        archive_pool,
+        "get_mysql_connection",
+        lambda _settings: (_ for _ in ()).throw(AssertionError("should not connect")),
+    )
+
+    exit_code = archive_pool.run([])
+
+    assert exit_code == 1
+    assert json.loads(capsys.readouterr().out)["status"] == "error"
+
+
+def test_archive_cli_uses_settings_defaults(monkeypatch, capsys):
+    from tools import archive_pool
+
+    called = {}
+
+    class DummyConn:
+        def close(self):
+            called["closed"] = True
+
+    def fake_archive(conn, older_than_hours, chunk_size, max_chunks):
+        called.update(older_than_hours=older_than_hours, chunk_size=chunk_size, max_chunks=max_chunks)
+        return 42
+
+    settings = Settings(archive_enabled=True, archive_after_hours=72, archive_chunk_size=200)
+    monkeypatch.setattr(archive_pool, "load_settings", lambda _env=None: settings)
+    monkeypatch.setattr(archive_pool, "get_mysql_connection", lambda _settings: DummyConn())
+    monkeypatch.setattr(archive_pool, "archive_deleted_proxies", fake_archive)
+
+    exit_code = archive_pool.run(["--max-chunks", "3"])
+
+    assert exit_code == 0
+    assert called == {"older_than_hours": 72, "chunk_size": 200, "max_chunks": 3, "closed": True}
+    assert json.loads(capsys.readouterr().out)["archived"] == 42
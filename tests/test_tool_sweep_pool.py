@@ -0,0 +1,40 @@
+import json
+
+from crawler.config import Settings
+
+
+def test_sweep_cli_requires_ttl(monkeypatch, capsys):
+    from tools import sweep_pool
+
+    monkeypatch.setattr(sweep_pool, "load_settings", lambda _env=None: Settings(redis_pool_ttl=0))
+    monkeypatch.setattr(
+        sweep_pool,
+        "get_redis_client",
+        lambda _settings: (_ for _ in ()).throw(AssertionError("should not connect")),
+    )
+
+    exit_code = sweep_pool.run([])
+
+    assert exit_code == 1
+    assert json.loads(capsys.readouterr().out)["status"] == "error"
+
+
+def test_sweep_cli_uses_settings_defaults(monkeypatch, capsys):
+    from tools import sweep_pool
+
+    called = {}
+
+    def fake_sweep(rds, ttl_seconds, batch_size, max_batches, indexed):
+        called.update(rds=rds, ttl=ttl_seconds, batch_size=batch_size, max_batches=max_batches, indexed=indexed)
+        return 7
+
+    settings = Settings(redis_pool_ttl=3600, redis_sweep_batch_size=200, redis_index_enabled=True)
+    monkeypatch.setattr(sweep_pool, "load_settings", lambda _env=None: settings)
+    monkeypatch.setattr(sweep_pool, "get_redis_client", lambda _settings: "redis")
+    monkeypatch.setattr(sweep_pool, "sweep_stale_proxies", fake_sweep)
+
+    exit_code = sweep_pool.run(["--max-batches", "3"])
+
+    assert exit_code == 0
+    assert called == {"rds": "redis", "ttl": 3600, "batch_size": 200, "max_batches": 3, "indexed": True}
+    assert json.loads(capsys.readouterr().out)["removed"] == 7
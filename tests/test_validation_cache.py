@@ -0,0 +1,95 @@
+import crawler.validation_cache as validation_cache
+from crawler.config import Settings
+from crawler.validation_cache import RedisValidationCache, ValidationCache, get_validation_cache
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+
+def test_memory_cache_uses_separate_alive_and_dead_ttls(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr(validation_cache.time, "monotonic", lambda: now["value"])
+
+    cache = ValidationCache(alive_ttl_seconds=60, dead_ttl_seconds=600)
+    cache.set("1.1.1.1", 80, "http", True, 120)
+    cache.set("2.2.2.2", 80, "http", False, 0)
+
+    assert cache.get("1.1.1.1", 80, "HTTP") == (True, 120)
+    assert cache.get("2.2.2.2", 80, "http") == (False, 0)
+
+    now["value"] += 120
+    assert cache.get("1.1.1.1", 80, "http") is None
+    assert cache.get("2.2.2.2", 80, "http") == (False, 0)
+    assert cache.size() == 1
+
+
+def test_memory_cache_bounds_entries():
+    cache = ValidationCache(max_entries=2)
+    for index in range(3):
+        cache.set(f"10.0.0.{index}", 80, "http", True, index)
+
+    assert cache.size() == 2
+    assert cache.get("10.0.0.0", 80, "http") is None
+    assert cache.get_many([{"ip": "10.0.0.2", "port": 80, "protocol": "http"}]) == [(True, 2)]
+
+
+def test_redis_cache_round_trip_with_ttls():
+    client = _FakeRedis()
+    cache = RedisValidationCache(client, alive_ttl_seconds=30, dead_ttl_seconds=900)
+    cache.set("1.1.1.1", 80, "http", True, 55)
+    cache.set("2.2.2.2", 1080, "socks5", False, 0)
+
+    assert client.ttls == {"proxy:vcache:1.1.1.1:80:http": 30, "proxy:vcache:2.2.2.2:1080:socks5": 900}
+    records = [
+        {"ip": "1.1.1.1", "port": 80, "protocol": "http"},
+        {"ip": "2.2.2.2", "port": 1080, "protocol": "socks5"},
+        {"ip": "3.3.3.3", "port": 80, "protocol": "http"},
+    ]
+    assert cache.get_many(records) == [(True, 55), (False, 0), None]
+
+
+def test_redis_cache_treats_errors_as_miss():
+    class _Broken:
+        def get(self, _key):
+            raise ConnectionError("down")
+
+    assert RedisValidationCache(_Broken()).get("1.1.1.1", 80, "http") is None
+
+
+def test_get_validation_cache_by_backend(monkeypatch):
+    monkeypatch.setattr(validation_cache, "_memory_cache", None)
+    settings = Settings()
+    assert get_validation_cache(settings, _FakeRedis()) is None
+
+    settings.validation_cache_backend = "memory"
+    first = get_validation_cache(settings)
+    assert isinstance(first, ValidationCache)
+    assert get_validation_cache(settings) is first
+
+    settings.validation_cache_backend = "redis"
+    assert isinstance(get_validation_cache(settings, _FakeRedis()), RedisValidationCache)
+
+
+def test_cache_key_separates_check_targets():
+    from crawler.validation_cache import build_cache_key
+
+    assert build_cache_key("1.1.1.1", 80, "HTTP") == "1.1.1.1:80:http"
+    assert build_cache_key("1.1.1.1", 80, "http", "https://a.example/") == "1.1.1.1:80:http@https://a.example/"
+
+    cache = ValidationCache()
+    cache.set("1.1.1.1", 80, "http", False, 0, target="https://a.example/")
+    assert cache.get("1.1.1.1", 80, "http") is None
+    assert cache.get("1.1.1.1", 80, "http", target="https://a.example/") == (False, 0)
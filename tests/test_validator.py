@@ -80,3 +80,70 @@ def test_validator_mark_suspicious_data():
     assert flagged["is_suspicious"] is True
     assert "low_confidence" in flagged["suspicious_reasons"]
     assert clean["is_suspicious"] is False
+
+
+def _listening_socket():
+    import socket
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    return server
+
+
+def _closed_port():
+    import socket
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_tcp_check_many_preserves_target_order():
+    from crawler.validator import tcp_check_many
+
+    server = _listening_socket()
+    open_port = server.getsockname()[1]
+    try:
+        results = tcp_check_many(
+            [("127.0.0.1", open_port), ("127.0.0.1", _closed_port()), ("127.0.0.1", open_port)],
+            timeout=1,
+            concurrency=2,
+        )
+    finally:
+        server.close()
+
+    assert [success for success, _latency in results] == [True, False, True]
+    assert results[1] == (False, 0)
+
+
+def test_tcp_check_many_times_out_unanswered_connects(monkeypatch):
+    import os
+
+    from crawler import validator
+
+    class _PendingSocket:
+        # 管道读端永远不可写，模拟无应答的 SYN
+        def __init__(self):
+            self._r, self._w = os.pipe()
+
+        def fileno(self):
+            return self._r
+
+        def close(self):
+            os.close(self._r)
+            os.close(self._w)
+
+    monkeypatch.setattr(validator, "_open_nonblocking", lambda host, port: (_PendingSocket(), validator.errno.EINPROGRESS))
+
+    results = validator.tcp_check_many([("10.255.255.1", 80)], timeout=0.05, concurrency=1)
+
+    assert results == [(False, 0)]
+
+
+def test_tcp_check_many_empty_targets():
+    from crawler.validator import tcp_check_many
+
+    assert tcp_check_many([], timeout=1) == []
@@ -0,0 +1,193 @@
+from crawler.config import Settings
+from crawler.proxy_picker import pick_proxies
+
+
+class _FakeReadyPipeline:
+    def __init__(self, owner):
+        self.owner = owner
+        self.queued = []
+
+    def zremrangebyscore(self, key, low, high):
+        self.queued.append(("zremrangebyscore", key, (low, high)))
+
+    def zcount(self, key, low, high):
+        self.queued.append(("zcount", key, (low, high)))
+
+    def zrangebyscore(self, key, low, high):
+        self.queued.append(("zrangebyscore", key, (low, high)))
+
+    def zadd(self, key, mapping):
+        self.queued.append(("zadd", key, dict(mapping)))
+
+    def expire(self, key, seconds):
+        self.queued.append(("expire", key, seconds))
+
+    def execute(self):
+        replies = []
+        for name, key, arg in self.queued:
+            self.owner.commands.append((name, key, arg))
+            members = self.owner.sets.setdefault(key, {})
+            if name == "zremrangebyscore":
+                expired = [member for member, score in members.items() if score <= arg[1]]
+                for member in expired:
+                    del members[member]
+                replies.append(len(expired))
+            elif name == "zcount":
+                replies.append(sum(1 for score in members.values() if score >= arg[0]))
+            elif name == "zrangebyscore":
+                replies.append([member for member, score in members.items() if score >= arg[0]])
+            elif name == "zadd":
+                members.update(arg)
+                replies.append(len(arg))
+            else:
+                replies.append(True)
+        return replies
+
+
+class _FakeReadyRedis:
+    def __init__(self):
+        self.sets = {}
+        self.meta = {}
+        self.commands = []
+
+    def hmget(self, key, fields):
+        assert key == "proxy:meta"
+        return [self.meta.get(field) for field in fields]
+
+    def pipeline(self, transaction=True):
+        assert transaction is False
+        return _FakeReadyPipeline(self)
+
+
+def test_refill_once_tops_up_short_pools_only(monkeypatch):
+    from crawler import warmer
+
+    rds = _FakeReadyRedis()
+    rds.sets["proxy:ready:http"] = {f"9.9.9.{index}:80:http": 10**12 for index in range(2)}
+    picks = []
+
+    def fake_pick(settings, protocols, countries, count, require_check, redis_client, use_ready_pool, use_cache):
+        assert use_cache is False
+        picks.append((protocols, countries, count, use_ready_pool))
+        if countries:
+            return {"status": "not_found_country_fallback", "data": [{"ip": "8.8.8.8", "port": 1080, "protocol": "socks5"}]}
+        return {
+            "status": "insufficient_valid",
+            "data": [{"ip": "1.1.1.1", "port": 1080, "protocol": "socks5"}, {"ip": "2.2.2.2", "port": 1080, "protocol": "socks5"}],
+        }
+
+    monkeypatch.setattr(warmer, "pick_proxies", fake_pick)
+    settings = Settings(warmer_protocols="http, SOCKS5", warmer_countries="DE", warmer_pool_size=2, warmer_ttl=30)
+    proxy_warmer = warmer.ProxyWarmer(settings, rds)
+
+    assert proxy_warmer.targets == [("http", None), ("http", "DE"), ("socks5", None), ("socks5", "DE")]
+    assert proxy_warmer.refill_once() == 2
+
+    # http 热池已满，不再验证；国家回退的结果不写入国家热池
+    assert picks == [(["http"], ["DE"], 2, False), (["socks5"], None, 2, False), (["socks5"], ["DE"], 2, False)]
+    assert set(rds.sets["proxy:ready:socks5"]) == {"1.1.1.1:1080:socks5", "2.2.2.2:1080:socks5"}
+    assert rds.sets["proxy:ready:socks5:de"] == {}
+    assert ("expire", "proxy:ready:socks5", 30) in rds.commands
+
+
+def test_pick_proxies_serves_from_ready_pool(monkeypatch):
+    from crawler import proxy_picker
+
+    rds = _FakeReadyRedis()
+    rds.sets["proxy:ready:http"] = {"1.1.1.1:80:http": 10**12, "2.2.2.2:80:http": 0}
+    rds.sets["proxy:ready:socks5:de"] = {"3.3.3.3:1080:socks5": 10**12}
+
+    def _no_mysql(*_args, **_kwargs):
+        raise AssertionError("ready pool hit should not touch MySQL")
+
+    monkeypatch.setattr(proxy_picker, "get_mysql_connection", _no_mysql)
+    settings = Settings(warmer_enabled=True)
+
+    result = pick_proxies(settings, protocols=["http"], count=1, redis_client=rds)
+    assert result == {
+        "status": "ok",
+        "data": {"ip": "1.1.1.1", "port": 80, "protocol": "http", "country": None, "latency_ms": None},
+    }
+
+    result = pick_proxies(settings, protocols=["socks5"], countries=["DE"], count=1, redis_client=rds)
+    assert result["data"]["ip"] == "3.3.3.3"
+    assert result["data"]["country"] == "DE"
+
+
+def test_pick_proxies_falls_back_when_ready_pool_short(monkeypatch):
+    from crawler import proxy_picker
+
+    rds = _FakeReadyRedis()
+    rds.sets["proxy:ready:http"] = {"1.1.1.1:80:http": 10**12}
+    fallback = {"ip": "5.5.5.5", "port": 80, "protocol": "http", "country": None, "latency_ms": 10}
+
+    monkeypatch.setattr(proxy_picker, "_fetch_redis_candidates", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(proxy_picker, "_fetch_mysql_candidates", lambda *_args, **_kwargs: [dict(fallback), dict(fallback)])
+    monkeypatch.setattr(proxy_picker, "_validate_candidate", lambda candidate, *_args: candidate)
+
+    result = pick_proxies(
+        Settings(warmer_enabled=True),
+        protocols=["http"],
+        count=2,
+        redis_client=rds,
+        mysql_conn=object(),
+    )
+
+    assert [proxy["ip"] for proxy in result["data"]] == ["5.5.5.5", "5.5.5.5"]
+
+
+def test_ready_pool_skipped_for_custom_check_url_and_fills_latency_from_meta(monkeypatch):
+    from crawler import proxy_picker
+
+    rds = _FakeReadyRedis()
+    rds.sets["proxy:ready:http"] = {"1.1.1.1:80:http": 10**12}
+    rds.meta["1.1.1.1:80:http"] = "US|elite|120|1700000000"
+    inline = {"ip": "5.5.5.5", "port": 80, "protocol": "http", "country": None, "latency_ms": 10}
+    checked_urls = []
+
+    monkeypatch.setattr(proxy_picker, "_fetch_redis_candidates", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(proxy_picker, "_fetch_mysql_candidates", lambda *_args, **_kwargs: [dict(inline)])
+    monkeypatch.setattr(
+        proxy_picker,
+        "_validate_candidate",
+        lambda candidate, _settings, check_url, *_args: checked_urls.append(check_url) or candidate,
+    )
+    settings = Settings(warmer_enabled=True, redis_meta_enabled=True)
+
+    result = pick_proxies(settings, protocols=["http"], count=1, redis_client=rds, mysql_conn=object())
+    assert result["data"]["ip"] == "1.1.1.1"
+    assert result["data"]["latency_ms"] == 120
+    assert checked_urls == []
+
+    result = pick_proxies(
+        settings,
+        protocols=["http"],
+        count=1,
+        check_url="https://target.example/",
+        redis_client=rds,
+        mysql_conn=object(),
+    )
+    assert result["data"]["ip"] == "5.5.5.5"
+    assert checked_urls == ["https://target.example/"]
+
+
+def test_pick_proxies_can_bypass_validation_cache(monkeypatch):
+    from crawler import proxy_picker
+    from crawler.validation_cache import ValidationCache
+
+    cache = ValidationCache()
+    cache.set("5.5.5.5", 80, "http", True, 1)
+    candidate = {"ip": "5.5.5.5", "port": 80, "protocol": "http", "country": None, "latency_ms": 10}
+    probes = []
+
+    monkeypatch.setattr(proxy_picker, "get_validation_cache", lambda *_args: cache)
+    monkeypatch.setattr(proxy_picker, "_fetch_redis_candidates", lambda *_args, **_kwargs: [])
+    monkeypatch.setattr(proxy_picker, "_fetch_mysql_candidates", lambda *_args, **_kwargs: [dict(candidate)])
+    monkeypatch.setattr(proxy_picker, "tcp_check", lambda ip, port, timeout: probes.append(ip) or (True, 30))
+    monkeypatch.setattr(proxy_picker, "_http_check", lambda *_args: True)
+
+    kwargs = dict(protocols=["http"], count=1, redis_client=_FakeReadyRedis(), mysql_conn=object(), use_ready_pool=False)
+    assert pick_proxies(Settings(), **kwargs)["data"]["latency_ms"] == 1
+    assert probes == []
+    assert pick_proxies(Settings(), use_cache=False, **kwargs)["data"]["latency_ms"] == 30
+    assert probes == ["5.5.5.5"]
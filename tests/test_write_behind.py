@@ -0,0 +1,180 @@
+import threading
+import time
+
+import crawler.write_behind as write_behind
+from crawler.config import Settings
+from crawler.write_behind import WriteBehindWriter
+
+
+class _DummyConn:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _RecordingRedisWriter:
+    def __init__(self):
+        self.added = []
+        self.removed = []
+
+    def add(self, ip, port, protocol, score, meta=None):
+        self.added.append(f"{ip}:{port}:{protocol}")
+
+    def remove(self, ip, port, protocol, country=None):
+        self.removed.append(f"{ip}:{port}:{protocol}")
+
+
+def _record(index):
+    return {"ip": f"10.0.0.{index}", "port": 8080, "protocol": "http"}
+
+
+def test_write_behind_batches_and_flushes_on_close(monkeypatch):
+    batches = []
+    conns = []
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: conns.append(_DummyConn()) or conns[-1])
+    monkeypatch.setattr(
+        write_behind,
+        "update_proxy_checks",
+        lambda conn, rows, window_hours: batches.append([row[0] for row in rows]),
+    )
+
+    redis_writer = _RecordingRedisWriter()
+    writer = WriteBehindWriter(Settings(), redis_writer, batch_size=2, flush_interval=3600).start()
+    writer.submit(_record(1), True, 10)
+    writer.submit(_record(2), False, 0)
+    writer.submit(_record(3), True, 20)
+    writer.close()
+
+    assert batches == [["10.0.0.1", "10.0.0.2"], ["10.0.0.3"]]
+    assert (writer.written, writer.failed, writer.batches) == (3, 0, 2)
+    assert redis_writer.added == ["10.0.0.1:8080:http", "10.0.0.3:8080:http"]
+    assert redis_writer.removed == ["10.0.0.2:8080:http"]
+    assert len(conns) == 1 and conns[0].closed is True
+
+
+def test_write_behind_flushes_partial_batch_after_interval(monkeypatch):
+    flushed = threading.Event()
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: _DummyConn())
+    monkeypatch.setattr(write_behind, "update_proxy_checks", lambda conn, rows, window_hours: flushed.set())
+
+    writer = WriteBehindWriter(Settings(), _RecordingRedisWriter(), batch_size=100, flush_interval=0.05).start()
+    try:
+        writer.submit(_record(1), True, 10)
+        assert flushed.wait(2)
+    finally:
+        writer.close()
+
+
+def test_write_behind_applies_backpressure_when_queue_full(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: _DummyConn())
+    monkeypatch.setattr(write_behind, "update_proxy_checks", lambda conn, rows, window_hours: release.wait(5))
+
+    writer = WriteBehindWriter(Settings(), _RecordingRedisWriter(), queue_size=1, batch_size=1).start()
+    writer.submit(_record(1), True, 10)
+    deadline = time.monotonic() + 2
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.submit(_record(2), True, 10)
+
+    blocked = threading.Thread(target=writer.submit, args=(_record(3), True, 10))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join(2)
+    assert not blocked.is_alive()
+    writer.close()
+    assert writer.written == 3
+
+
+def test_write_behind_counts_failed_batches_and_keeps_running(monkeypatch):
+    calls = []
+
+    def flaky_update(conn, rows, window_hours):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise RuntimeError("deadlock")
+
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: _DummyConn())
+    monkeypatch.setattr(write_behind, "update_proxy_checks", flaky_update)
+
+    writer = WriteBehindWriter(Settings(), _RecordingRedisWriter(), batch_size=1, flush_interval=3600).start()
+    writer.submit(_record(1), True, 10)
+    writer.submit(_record(2), True, 10)
+    writer.close()
+
+    assert calls == [1, 1]
+    assert (writer.written, writer.failed) == (1, 1)
+    assert writer.last_error == "deadlock"
+
+
+class _FailingRedisWriter(_RecordingRedisWriter):
+    def add(self, ip, port, protocol, score, meta=None):
+        raise RuntimeError("redis down")
+
+
+class _FailingCache:
+    def set(self, ip, port, protocol, success, latency_ms):
+        raise RuntimeError("cache down")
+
+
+def test_write_behind_survives_cache_and_redis_errors(monkeypatch):
+    calls = []
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: _DummyConn())
+    monkeypatch.setattr(write_behind, "update_proxy_checks", lambda conn, rows, window_hours: calls.append(len(rows)))
+
+    writer = WriteBehindWriter(
+        Settings(), _FailingRedisWriter(), cache=_FailingCache(), batch_size=1, flush_interval=3600
+    ).start()
+    assert writer.submit(_record(1), True, 10) is True
+    assert writer.submit(_record(2), True, 10) is True
+    writer.close()
+
+    assert calls == [1, 1]
+    assert (writer.written, writer.cache_failed, writer.redis_failed) == (2, 2, 2)
+    assert writer.last_error == "redis down"
+
+
+def test_write_behind_submit_drops_when_thread_dead(monkeypatch):
+    monkeypatch.setattr(write_behind, "get_mysql_connection", lambda _settings: _DummyConn())
+    monkeypatch.setattr(write_behind, "update_proxy_checks", lambda conn, rows, window_hours: None)
+
+    writer = WriteBehindWriter(Settings(), _RecordingRedisWriter(), queue_size=1, batch_size=1).start()
+    # 模拟写线程意外退出：队列已满且无人消费
+    writer._queue.put(write_behind._STOP)
+    writer._thread.join(2)
+    writer._queue.put(_record(0))
+
+    assert writer.submit(_record(1), True, 10) is False
+    assert writer.dropped == 1
+    writer.close()
+
+
+def test_write_behind_reconnects_after_failed_batch(monkeypatch):
+    conns = []
+    used = []
+
+    def connect(_settings):
+        conns.append(_DummyConn())
+        return conns[-1]
+
+    def update(conn, rows, window_hours):
+        used.append(conn)
+        if len(used) == 1:
+            raise RuntimeError("MySQL server has gone away")
+
+    monkeypatch.setattr(write_behind, "get_mysql_connection", connect)
+    monkeypatch.setattr(write_behind, "update_proxy_checks", update)
+
+    writer = WriteBehindWriter(Settings(), _RecordingRedisWriter(), batch_size=1, flush_interval=3600).start()
+    writer.submit(_record(1), True, 10)
+    writer.submit(_record(2), True, 10)
+    writer.close()
+
+    assert (writer.written, writer.failed) == (1, 1)
+    assert len(conns) == 2 and used == conns
+    assert conns[0].closed is True and conns[1].closed is True
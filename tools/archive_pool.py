@@ -0,0 +1,65 @@
+import argparse
+import json
+from typing import List, Optional
+
+from crawler.runtime import load_settings
+from crawler.storage import archive_deleted_proxies, get_mysql_connection, set_settings_for_retry
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--older-than-hours",
+        type=int,
+        default=None,
+        help="Archive proxies soft-deleted for at least N hours (default: from .env ARCHIVE_AFTER_HOURS)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Rows moved per transaction (default: from .env ARCHIVE_CHUNK_SIZE)",
+    )
+    parser.add_argument("--max-chunks", type=int, default=None, help="Stop after N chunks (default: until done)")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Move long soft-deleted proxies to proxy_ips_archive")
+    add_arguments(parser)
+    return parser
+
+
+def run_from_args(args: argparse.Namespace, env_path: Optional[str] = None) -> int:
+    # 分块归档软删除代理并输出 JSON 统计
+    settings = load_settings(env_path)
+    set_settings_for_retry(settings)
+    if not settings.archive_enabled:
+        result = {"status": "error", "message": "ARCHIVE_ENABLED=false，已禁用 archive"}
+        print(json.dumps(result, ensure_ascii=False))
+        return 1
+
+    older_than_hours = args.older_than_hours if args.older_than_hours is not None else settings.archive_after_hours
+    chunk_size = args.chunk_size if args.chunk_size is not None else settings.archive_chunk_size
+
+    conn = get_mysql_connection(settings)
+    try:
+        moved = archive_deleted_proxies(conn, older_than_hours, chunk_size=chunk_size, max_chunks=args.max_chunks)
+    except Exception as exc:
+        result = {"status": "error", "message": f"{type(exc).__name__}: {exc}"}
+        print(json.dumps(result, ensure_ascii=False))
+        return 1
+    finally:
+        conn.close()
+
+    result = {"status": "ok", "archived": moved, "older_than_hours": older_than_hours, "chunk_size": chunk_size}
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    return run_from_args(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -0,0 +1,397 @@
+"""
+离线吞吐基准：在本机启动假代理、假代理源与 Judge，驱动 run_once / run_check_batch / pick_proxies。
+
+存储层替换为内存记录器，不需要 MySQL / Redis 与外网。输出每个场景的
+探测吞吐（probes/s）、成功探测延迟 p50/p99 与进程峰值内存，用于上线前发现吞吐回退。
+"""
+
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, replace
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows 无 resource 模块
+    resource = None
+
+import crawler.pipeline as pipeline
+import crawler.proxy_picker as proxy_picker
+import crawler.write_behind as write_behind
+from crawler.config import Settings
+from crawler.http_validator import HTTPValidator
+from crawler.runtime import load_settings
+from crawler.sources import Source
+from tools import check_pool
+from tools.fake_servers import PROXY_KINDS, FakeProxyBehavior, FakeProxyFarm, serve_fake_farm
+
+
+DEFAULT_SCENARIOS = ("pipeline", "check", "pick")
+
+_PROTOCOL_PARSER = {"http": "proxy_list_download_http", "socks5": "proxy_list_download_socks5"}
+
+
+def _parse_csv(value: str) -> List[str]:
+    return [part.strip().lower() for part in value.split(",") if part.strip()]
+
+
+def _percentile(values: Sequence[int], q: float) -> Optional[int]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # Linux 下 ru_maxrss 单位为 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+@contextmanager
+def _patched(target: object, **attrs: object) -> Iterator[None]:
+    originals = {name: getattr(target, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(target, name, value)
+
+
+class _DummyConn:
+    def close(self) -> None:
+        return None
+
+
+class _PoolRedis:
+    # pick_proxies 只读取 proxy:alive 排行
+    def __init__(self, keys: List[str]):
+        self.keys = keys
+
+    def zrevrange(self, _name: str, start: int, end: int) -> List[str]:
+        return self.keys[start : end + 1]
+
+
+class MemoryRecorder:
+    """替代 MySQL / Redis 的内存记录器，收集每次验证的结果。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.upserts = 0
+        self.results: List[tuple] = []
+        self.alive: Dict[str, int] = {}
+
+    def upsert_source(self, *_args, **_kwargs) -> int:
+        return 1
+
+    def upsert_proxies(self, _conn, records, *_args, **_kwargs) -> int:
+        with self._lock:
+            self.upserts += len(records)
+        return len(records)
+
+    def update_proxy_check(self, _conn, ip, port, protocol, is_alive, latency_ms, *_args, **_kwargs) -> None:
+        with self._lock:
+            self.results.append((ip, port, protocol, bool(is_alive), int(latency_ms)))
+
+    def update_proxy_checks(self, _conn, rows, *_args, **_kwargs) -> int:
+        with self._lock:
+            for ip, port, protocol, is_alive, latency_ms, _anonymity in rows:
+                self.results.append((ip, port, protocol, bool(is_alive), int(latency_ms)))
+        return len(rows)
+
+    def update_proxy_checks_with_window(self, _conn, rows, *_args, **_kwargs) -> int:
+        with self._lock:
+            for proxy_id, is_alive, latency_ms, *_window in rows:
+                self.results.append((proxy_id, None, None, bool(is_alive), int(latency_ms)))
+        return len(rows)
+
+    def pipeline(self, transaction: bool = True) -> "_RecorderPipeline":
+        # 充当存活池 Redis 客户端，接收 RedisPoolWriter 的批量写入
+        return _RecorderPipeline(self)
+
+    def apply_redis_ops(self, adds: Dict[str, int], removes: Sequence[str]) -> None:
+        with self._lock:
+            self.alive.update(adds)
+            for member in removes:
+                self.alive.pop(member, None)
+
+    def latencies(self) -> List[int]:
+        with self._lock:
+            return [item[4] for item in self.results if item[3]]
+
+    def alive_count(self) -> int:
+        with self._lock:
+            return sum(1 for item in self.results if item[3])
+
+
+class _RecorderPipeline:
+    def __init__(self, recorder: MemoryRecorder) -> None:
+        self.recorder = recorder
+        self.adds: Dict[str, int] = {}
+        self.removes: List[str] = []
+
+    def zadd(self, _key: str, mapping: Dict[str, int]) -> None:
+        self.adds.update(mapping)
+
+    def zrem(self, _key: str, *members: str) -> None:
+        self.removes.extend(members)
+
+    # 元数据写入不影响统计，仅保证开启 REDIS_META_ENABLED 时不报错
+    def hset(self, _key: str, mapping: Dict[str, str]) -> None:
+        return None
+
+    def hdel(self, _key: str, *fields: str) -> None:
+        return None
+
+    def execute(self, raise_on_error: bool = True) -> List[int]:
+        self.recorder.apply_redis_ops(self.adds, self.removes)
+        return [count for count in (len(self.adds), len(self.removes)) if count]
+
+
+class BenchmarkEnvironment:
+    """
+    假服务运行环境。isolated=True 时假服务运行在独立子进程，
+    避免与被测代码争用 GIL 导致吞吐失真；测试中可关闭以加快启动。
+    """
+
+    def __init__(
+        self,
+        proxies_per_kind: int = 20,
+        kinds: Sequence[str] = PROXY_KINDS,
+        dead: int = 100,
+        behavior: Optional[FakeProxyBehavior] = None,
+        seed: Optional[int] = None,
+        isolated: bool = True,
+    ):
+        self.farm_args = (proxies_per_kind, list(kinds), dead, asdict(behavior or FakeProxyBehavior()), seed)
+        self.isolated = isolated
+        self.judge_url = ""
+        self.records: List[Dict[str, object]] = []
+        self.sources: List[Source] = []
+        self._stack = ExitStack()
+
+    def _start_isolated(self) -> Dict[str, object]:
+        context = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=serve_fake_farm, args=(child_conn, *self.farm_args), daemon=True)
+        process.start()
+
+        def stop() -> None:
+            try:
+                parent_conn.send("stop")
+            except OSError:
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+        self._stack.callback(stop)
+        return parent_conn.recv()
+
+    def __enter__(self) -> "BenchmarkEnvironment":
+        if self.isolated:
+            description = self._start_isolated()
+        else:
+            proxies_per_kind, kinds, dead, behavior, seed = self.farm_args
+            farm = FakeProxyFarm(proxies_per_kind, kinds, dead, FakeProxyBehavior(**behavior), seed)
+            description = self._stack.enter_context(farm).describe()
+        self.judge_url = description["judge_url"]
+        self.records = list(description["records"])
+        self.sources = [
+            Source(name=f"bench-{protocol}", url=url, parser_key=_PROTOCOL_PARSER[protocol])
+            for protocol, url in description["source_urls"].items()
+        ]
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._stack.close()
+
+
+def _summarize(name: str, probes: int, elapsed: float, latencies: List[int], **extra: object) -> Dict[str, object]:
+    return {
+        "scenario": name,
+        "probes": probes,
+        "seconds": round(elapsed, 3),
+        "probes_per_sec": round(probes / elapsed, 1) if elapsed > 0 else None,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p99_ms": _percentile(latencies, 0.99),
+        "peak_rss_mb": _peak_rss_mb(),
+        **extra,
+    }
+
+
+def bench_pipeline(env: BenchmarkEnvironment, settings: Settings) -> Dict[str, object]:
+    recorder = MemoryRecorder()
+    with ExitStack() as stack:
+        stack.enter_context(_patched(HTTPValidator, TEST_URL=env.judge_url))
+        stack.enter_context(
+            _patched(
+                pipeline,
+                get_sources=lambda: list(env.sources),
+                get_mysql_connection=lambda _settings: _DummyConn(),
+                get_redis_client=lambda _settings: recorder,
+                set_settings_for_retry=lambda _settings: None,
+                upsert_source=recorder.upsert_source,
+                upsert_proxies=recorder.upsert_proxies,
+                update_proxy_check=recorder.update_proxy_check,
+            )
+        )
+        stack.enter_context(
+            _patched(
+                write_behind,
+                get_mysql_connection=lambda _settings: _DummyConn(),
+                update_proxy_checks=recorder.update_proxy_checks,
+            )
+        )
+        start = time.perf_counter()
+        pipeline.run_once(settings, quick_test=False)
+        elapsed = time.perf_counter() - start
+    return _summarize(
+        "pipeline",
+        len(recorder.results),
+        elapsed,
+        recorder.latencies(),
+        upserts=recorder.upserts,
+        alive=recorder.alive_count(),
+        engine=settings.validate_engine,
+    )
+
+
+def bench_check(env: BenchmarkEnvironment, settings: Settings) -> Dict[str, object]:
+    recorder = MemoryRecorder()
+    rows = [
+        (index + 1, record["ip"], record["port"], record["protocol"], None, 0)
+        for index, record in enumerate(env.records)
+    ]
+    check_settings = replace(settings, check_batch_size=max(1, len(rows)))
+    with _patched(
+        check_pool,
+        get_mysql_connection=lambda _settings: _DummyConn(),
+        get_redis_client=lambda _settings: recorder,
+        set_settings_for_retry=lambda _settings: None,
+        fetch_check_batch=lambda _conn, _batch_size, *_args, **_kwargs: rows,
+        update_proxy_checks_with_window=recorder.update_proxy_checks_with_window,
+    ):
+        start = time.perf_counter()
+        check_pool.run_check_batch(check_settings)
+        elapsed = time.perf_counter() - start
+    return _summarize("check", len(recorder.results), elapsed, recorder.latencies(), alive=recorder.alive_count())
+
+
+def bench_pick(env: BenchmarkEnvironment, settings: Settings, rounds: int = 50) -> Dict[str, object]:
+    keys = [f"{record['ip']}:{record['port']}:{record['protocol']}" for record in env.records]
+    redis_client = _PoolRedis(keys)
+    durations: List[int] = []
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(max(1, int(rounds))):
+        call_start = time.perf_counter()
+        result = proxy_picker.pick_proxies(
+            settings,
+            protocols=sorted({str(record["protocol"]) for record in env.records}) or None,
+            count=1,
+            check_url=env.judge_url,
+            require_check=True,
+            redis_client=redis_client,
+            mysql_conn=_DummyConn(),
+        )
+        durations.append(int((time.perf_counter() - call_start) * 1000))
+        if result.get("data"):
+            hits += 1
+        # 轮换候选顺序，避免每轮只验证排行前几个代理
+        keys.append(keys.pop(0))
+    elapsed = time.perf_counter() - start
+    return _summarize("pick", len(durations), elapsed, durations, hits=hits)
+
+
+def run_benchmark(
+    settings: Settings,
+    scenarios: Sequence[str] = DEFAULT_SCENARIOS,
+    proxies_per_kind: int = 20,
+    kinds: Sequence[str] = PROXY_KINDS,
+    dead: int = 100,
+    behavior: Optional[FakeProxyBehavior] = None,
+    pick_rounds: int = 50,
+    seed: Optional[int] = None,
+    isolated: bool = True,
+) -> Dict[str, object]:
+    # 基准只测本机链路：关闭结果缓存，单次探测、不重试
+    settings = replace(settings, validation_cache_backend="off", judge_url="", check_retries=1, source_workers=2)
+    results = []
+    with BenchmarkEnvironment(proxies_per_kind, kinds, dead, behavior, seed, isolated) as env:
+        for scenario in scenarios:
+            if scenario == "pipeline":
+                results.append(bench_pipeline(env, settings))
+            elif scenario == "check":
+                results.append(bench_check(env, settings))
+            elif scenario == "pick":
+                results.append(bench_pick(env, settings, pick_rounds))
+        candidates = len(env.records)
+    return {"status": "ok", "candidates": candidates, "results": results}
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS), help="Comma-separated: pipeline,check,pick")
+    parser.add_argument("--kinds", default=",".join(PROXY_KINDS), help="Fake proxy kinds: http,connect,socks5")
+    parser.add_argument("--proxies", type=int, default=20, help="Live fake proxies per kind (default: 20)")
+    parser.add_argument("--dead", type=int, default=100, help="Dead entries pointing at closed ports (default: 100)")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Added latency per proxy response")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of connections closed right after accept")
+    parser.add_argument("--blackhole-rate", type=float, default=0.0, help="Share of connections that never answer")
+    parser.add_argument("--timeout", type=float, default=2.0, help="Probe timeout in seconds (default: 2)")
+    parser.add_argument("--engine", choices=["thread", "asyncio"], default=None, help="Override VALIDATE_ENGINE")
+    parser.add_argument("--pick-rounds", type=int, default=50, help="pick_proxies calls in the pick scenario")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for drop/blackhole decisions")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run fake servers in this process instead of a child process (less accurate)",
+    )
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline throughput benchmark against local fake proxies")
+    add_arguments(parser)
+    return parser
+
+
+def run_from_args(args: argparse.Namespace, env_path: Optional[str] = None) -> int:
+    settings = load_settings(env_path)
+    settings.http_timeout = args.timeout
+    if args.engine:
+        settings.validate_engine = args.engine
+    behavior = FakeProxyBehavior(
+        latency_ms=args.latency_ms,
+        drop_rate=args.drop_rate,
+        blackhole_rate=args.blackhole_rate,
+    )
+    report = run_benchmark(
+        settings,
+        scenarios=_parse_csv(args.scenarios),
+        proxies_per_kind=args.proxies,
+        kinds=_parse_csv(args.kinds),
+        dead=args.dead,
+        behavior=behavior,
+        pick_rounds=args.pick_rounds,
+        seed=args.seed,
+        isolated=not args.in_process,
+    )
+    print(json.dumps(report, ensure_ascii=True))
+    return 0
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    return run_from_args(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
@@ -1,12 +1,31 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+import heapq
+import json
 import time
+from typing import Iterator, Optional
 
 from crawler.checker import apply_fail_window
 from crawler.config import Settings
-from crawler.storage import fetch_check_batch, get_mysql_connection, set_settings_for_retry, update_proxy_check_with_window
+from crawler.storage import (
+    ALIVE_POOL_KEY,
+    PROXY_META_KEY,
+    RedisPoolWriter,
+    build_proxy_meta,
+    build_redis_pool_writer,
+    decode_proxy_meta,
+    fetch_check_batch,
+    get_mysql_connection,
+    get_redis_client,
+    iter_pool_rows,
+    list_country_index_keys,
+    make_redis_key,
+    set_settings_for_retry,
+    update_proxy_checks_with_window,
+)
 from crawler.runtime import load_settings
-from crawler.validator import tcp_check
+from crawler.validator import score_proxy, tcp_check, tcp_check_many
 
 
 def _row_get(record: object, key: str, index: int):
@@ -29,63 +48,322 @@ def check_proxy(ip: str, port: int, timeout: int, retries: int, retry_delay: int
     return False, 0
 
 
+def scan_proxies(
+    targets: list[tuple[str, int]],
+    timeout: int,
+    retries: int,
+    retry_delay: int,
+    concurrency: int,
+) -> list[tuple[bool, int]]:
+    # 批量扫描版重试：每轮只重扫失败目标，整轮共用一次等待
+    results = tcp_check_many(targets, timeout=timeout, concurrency=concurrency)
+    for _attempt in range(1, retries):
+        failed = [index for index, (success, _latency) in enumerate(results) if not success]
+        if not failed:
+            break
+        if retry_delay > 0:
+            time.sleep(retry_delay)
+        rescanned = tcp_check_many([targets[index] for index in failed], timeout=timeout, concurrency=concurrency)
+        for index, result in zip(failed, rescanned):
+            results[index] = result
+    return results
+
+
+def schedule_checks(
+    executor: ThreadPoolExecutor,
+    targets: list[tuple[str, int]],
+    timeout: int,
+    retries: int,
+    retry_delay: int,
+) -> Iterator[tuple[int, bool, int]]:
+    """
+    线程池版延迟重试：每次提交只做单次探测，失败目标进入按到期时间排序的重试堆。
+
+    等待重试期间不占用工作线程，按完成顺序产出 (目标下标, 是否可用, 延迟毫秒)。
+    """
+    attempts_allowed = max(1, int(retries))
+    retry_heap: list[tuple[float, int]] = []
+    attempts = [0] * len(targets)
+    in_flight = {}
+
+    def submit(index: int) -> None:
+        attempts[index] += 1
+        ip, port = targets[index]
+        in_flight[executor.submit(check_proxy, ip, port, timeout, 1, 0)] = index
+
+    for index in range(len(targets)):
+        submit(index)
+
+    while in_flight or retry_heap:
+        now = time.monotonic()
+        while retry_heap and retry_heap[0][0] <= now:
+            _ready_at, index = heapq.heappop(retry_heap)
+            submit(index)
+
+        wait_timeout = max(0.0, retry_heap[0][0] - now) if retry_heap else None
+        if not in_flight:
+            time.sleep(wait_timeout)
+            continue
+
+        done, _pending = wait(list(in_flight), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = in_flight.pop(future)
+            try:
+                success, latency_ms = future.result()
+            except Exception:
+                success, latency_ms = False, 0
+            if success or attempts[index] >= attempts_allowed:
+                yield index, success, latency_ms if success else 0
+            else:
+                heapq.heappush(retry_heap, (time.monotonic() + max(0, retry_delay), index))
+
+
+class CheckResultBuffer:
+    """
+    累积检测结果并批量回写：条数达到 flush_size 或距上次回写超过 flush_interval 秒时触发。
+
+    仅在收集结果的线程中使用，无需加锁；结束时须调用 flush() 写出剩余结果。
+    """
+
+    def __init__(self, mysql_conn, flush_size: int = 500, flush_interval: float = 2.0):
+        self.mysql_conn = mysql_conn
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval = max(0.0, float(flush_interval))
+        self.pending: list[tuple] = []
+        self.flushed = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, row: tuple) -> None:
+        self.pending.append(row)
+        if len(self.pending) >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        rows, self.pending = self.pending, []
+        self._last_flush = time.monotonic()
+        if not rows:
+            return 0
+        update_proxy_checks_with_window(self.mysql_conn, rows)
+        self.flushed += len(rows)
+        return len(rows)
+
+
+def _build_check_update(record: object, success: bool, latency_ms: int, settings: Settings) -> tuple:
+    now = datetime.now()
+    fail_count = _row_get(record, "fail_count", 5) or 0
+    # 基于失败窗口更新计数与软删除标记
+    result = apply_fail_window(
+        now=now,
+        fail_window_start=_row_get(record, "fail_window_start", 4),
+        fail_count=fail_count,
+        success=success,
+        window_hours=settings.fail_window_hours,
+        threshold=settings.fail_threshold,
+    )
+    return (
+        int(_row_get(record, "id", 0)),
+        success,
+        latency_ms,
+        result.fail_window_start,
+        result.fail_count,
+        result.is_deleted,
+    )
+
+
+def _sync_redis(redis_writer: Optional[RedisPoolWriter], record: object, update: tuple) -> None:
+    # 检测结果同步到存活池：成功则加入并刷新分数，失败或软删除则移出
+    if redis_writer is None:
+        return
+    _proxy_id, success, latency_ms, _window_start, _fail_count, is_deleted = update
+    ip = _row_get(record, "ip", 1)
+    port = int(_row_get(record, "port", 2))
+    protocol = _row_get(record, "protocol", 3)
+    country = _row_get(record, "country", 6)
+    if success and not is_deleted:
+        meta = build_proxy_meta({"country": country, "anonymity": _row_get(record, "anonymity", 7)}, latency_ms)
+        redis_writer.add(ip, port, protocol, score_proxy(latency_ms=latency_ms, success=True), meta=meta)
+    else:
+        redis_writer.remove(ip, port, protocol, country)
+
+
 def run_check_batch(settings: Settings) -> None:
-    # 从数据库取批次并并发检测
+    # 从数据库取批次并并发检测，结果经缓冲批量回写，并同步到 Redis 存活池
     set_settings_for_retry(settings)
     
     mysql_conn = get_mysql_connection(settings)
     try:
-        records = fetch_check_batch(mysql_conn, settings.check_batch_size)
+        records = fetch_check_batch(
+            mysql_conn,
+            settings.check_batch_size,
+            shard_index=settings.check_shard_index,
+            shard_count=settings.check_shard_count,
+        )
         if not records:
             return
 
-        # 线程池并发执行 TCP 探测
-        with ThreadPoolExecutor(max_workers=settings.check_workers) as executor:
-            future_map = {
-                executor.submit(
-                    check_proxy,
-                    _row_get(record, "ip", 1),
-                    int(_row_get(record, "port", 2)),
+        buffer = CheckResultBuffer(mysql_conn, settings.check_flush_size, settings.check_flush_interval)
+        redis_writer = build_redis_pool_writer(settings, get_redis_client(settings)) if settings.check_redis_sync else None
+
+        def record_result(record: object, success: bool, latency_ms: int) -> None:
+            update = _build_check_update(record, success, latency_ms, settings)
+            buffer.add(update)
+            _sync_redis(redis_writer, record, update)
+
+        targets = [(_row_get(record, "ip", 1), int(_row_get(record, "port", 2))) for record in records]
+        try:
+            if settings.tcp_scan_enabled:
+                # 单线程事件驱动扫描整批，替代线程池逐条阻塞探测
+                scanned = scan_proxies(
+                    targets,
                     settings.http_timeout,
                     settings.check_retries,
                     settings.check_retry_delay,
-                ): record
-                for record in records
-            }
-
-            for future in as_completed(future_map):
-                record = future_map[future]
-                try:
-                    success, latency_ms = future.result()
-                except Exception:
-                    success, latency_ms = False, 0
-
-                now = datetime.now()
-                fail_count = _row_get(record, "fail_count", 5) or 0
-                # 基于失败窗口更新计数与软删除标记
-                result = apply_fail_window(
-                    now=now,
-                    fail_window_start=_row_get(record, "fail_window_start", 4),
-                    fail_count=fail_count,
-                    success=success,
-                    window_hours=settings.fail_window_hours,
-                    threshold=settings.fail_threshold,
-                )
-                update_proxy_check_with_window(
-                    mysql_conn,
-                    int(_row_get(record, "id", 0)),
-                    success,
-                    latency_ms,
-                    result.fail_window_start,
-                    result.fail_count,
-                    result.is_deleted,
+                    settings.tcp_scan_concurrency,
                 )
+                for record, (success, latency_ms) in zip(records, scanned):
+                    record_result(record, success, latency_ms)
+                return
+
+            # 线程池并发执行单次 TCP 探测，重试间隔由调度器计时，不阻塞工作线程
+            with ThreadPoolExecutor(max_workers=settings.check_workers) as executor:
+                for index, success, latency_ms in schedule_checks(
+                    executor,
+                    targets,
+                    settings.http_timeout,
+                    settings.check_retries,
+                    settings.check_retry_delay,
+                ):
+                    record_result(records[index], success, latency_ms)
+        finally:
+            buffer.flush()
+            if redis_writer is not None:
+                redis_writer.flush()
+    finally:
+        mysql_conn.close()
+
+
+def _remove_orphans(rds, redis_writer: RedisPoolWriter, keep: set, chunk_size: int) -> int:
+    # ZSCAN 存活池，移出 MySQL 中已不存活或已不存在（归档、物理删除）的成员，连同元数据与二级索引
+    removed = 0
+    country_keys: Optional[dict] = None
+    cursor = 0
+    while True:
+        cursor, items = rds.zscan(ALIVE_POOL_KEY, cursor, count=chunk_size)
+        orphans = []
+        for member, _score in items:
+            if isinstance(member, bytes):
+                member = member.decode("utf-8", "replace")
+            if member not in keep:
+                orphans.append(member)
+        if orphans:
+            metas = rds.hmget(PROXY_META_KEY, orphans) if redis_writer.meta_key else [None] * len(orphans)
+            unindexed: dict = {}
+            for member, raw_meta in zip(orphans, metas):
+                ip, port, protocol = member.rsplit(":", 2)
+                meta = decode_proxy_meta(raw_meta)
+                redis_writer.remove(ip, int(port), protocol, (meta or {}).get("country"))
+                if redis_writer.indexed and meta is None:
+                    # 不知道国家时从该协议的全部国家索引中移除
+                    if country_keys is None:
+                        country_keys = list_country_index_keys(rds)
+                    for index_key in country_keys.get(protocol.lower(), []):
+                        unindexed.setdefault(index_key, []).append(member)
+            redis_writer.flush()
+            if unindexed:
+                pipe = rds.pipeline(transaction=False)
+                for index_key, members in unindexed.items():
+                    pipe.zrem(index_key, *members)
+                pipe.execute()
+            removed += len(orphans)
+        if not cursor:
+            return removed
+
+
+def reconcile_redis_pool(settings: Settings, chunk_size: int = 1000) -> dict:
+    """
+    按 MySQL 重建 Redis 存活池：按 id 分块流式读取全表，存活且未删除的代理以最近检测结果加入，
+    其余移出；之后 ZSCAN 存活池，移出 MySQL 中已没有对应存活行的成员（如已归档或被删除）。
+    内存占用为 chunk_size 加上存活成员集合，可在池较大时定期执行。
+    """
+    set_settings_for_retry(settings)
+    mysql_conn = get_mysql_connection(settings)
+    rds = get_redis_client(settings)
+    redis_writer = build_redis_pool_writer(settings, rds)
+    added = 0
+    removed = 0
+    alive_members: set = set()
+    try:
+        for rows in iter_pool_rows(mysql_conn, chunk_size):
+            for ip, port, protocol, country, anonymity, latency_ms, last_checked_at, is_alive, is_deleted in rows:
+                if is_alive and not is_deleted:
+                    checked_at = last_checked_at.timestamp() if isinstance(last_checked_at, datetime) else None
+                    meta = build_proxy_meta({"country": country, "anonymity": anonymity}, latency_ms, checked_at)
+                    score = score_proxy(latency_ms=latency_ms or 0, success=True)
+                    redis_writer.add(ip, int(port), protocol, score, meta=meta)
+                    alive_members.add(make_redis_key(ip, int(port), protocol))
+                    added += 1
+                else:
+                    redis_writer.remove(ip, int(port), protocol, country)
+                    removed += 1
+            redis_writer.flush()
     finally:
         mysql_conn.close()
+    orphaned = _remove_orphans(rds, redis_writer, alive_members, max(1, int(chunk_size)))
+    return {
+        "status": "ok" if not redis_writer.failed else "partial",
+        "added": added,
+        "removed": removed,
+        "orphaned": orphaned,
+        "failed": redis_writer.failed,
+    }
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    # "i/N" -> (i, N)，要求 0 <= i < N
+    index_raw, sep, count_raw = str(value).partition("/")
+    try:
+        index, count = int(index_raw), int(count_raw)
+    except ValueError:
+        index, count = -1, 0
+    if not sep or count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard must be i/N with 0 <= i < N, got {value!r}")
+    return index, count
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        help="Check only proxies with id %% N == i, e.g. 0/4 (default: from .env CHECK_SHARD_INDEX/CHECK_SHARD_COUNT)",
+    )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Rebuild the Redis alive pool from MySQL instead of running a check batch",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Rows read from MySQL per chunk in --reconcile mode (default: 1000)",
+    )
+
+
+def apply_shard(settings: Settings, shard: tuple[int, int] | None) -> Settings:
+    if shard is not None:
+        settings.check_shard_index, settings.check_shard_count = shard
+    return settings
 
 
-def main() -> None:
-    settings = load_settings()
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run TCP check batch")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    settings = apply_shard(load_settings(), args.shard)
+    if args.reconcile:
+        print(json.dumps(reconcile_redis_pool(settings, args.chunk_size), ensure_ascii=False))
+        return
     run_check_batch(settings)
 
 
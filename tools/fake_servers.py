@@ -0,0 +1,367 @@
+"""
+离线基准测试用的本地假服务：HTTP / CONNECT / SOCKS5 代理与代理列表源。
+
+代理可配置固定延迟、断连率（接受后立即关闭）与黑洞率（接受后不再响应），
+用于在没有外网的环境下复现验证与入库链路的吞吐表现。
+"""
+
+from __future__ import annotations
+
+import random
+import selectors
+import socket
+import socketserver
+import struct
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from crawler.judge import create_judge_server
+
+
+PROXY_KINDS = ("http", "connect", "socks5")
+
+# 假代理类型与入库协议的对应关系（CONNECT 代理同样以 http 协议登记）
+KIND_PROTOCOL = {"http": "http", "connect": "http", "socks5": "socks5"}
+
+_MAX_HEAD = 8192
+
+
+@dataclass
+class FakeProxyBehavior:
+    latency_ms: float = 0.0
+    drop_rate: float = 0.0
+    blackhole_rate: float = 0.0
+
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("client closed")
+        data += chunk
+    return data
+
+
+def _recv_head(conn: socket.socket) -> bytes:
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = conn.recv(1024)
+        if not chunk:
+            raise ConnectionError("client closed")
+        data += chunk
+        if len(data) > _MAX_HEAD:
+            raise ConnectionError("request head too large")
+    return data
+
+
+def _set_nodelay(sock: socket.socket) -> None:
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
+
+
+def _relay(client: socket.socket, upstream: socket.socket, stopped: threading.Event) -> None:
+    # 双向转发直到任一端关闭
+    selector = selectors.DefaultSelector()
+    selector.register(client, selectors.EVENT_READ, upstream)
+    selector.register(upstream, selectors.EVENT_READ, client)
+    try:
+        while not stopped.is_set():
+            for key, _mask in selector.select(timeout=0.5):
+                data = key.fileobj.recv(65536)
+                if not data:
+                    return
+                key.data.sendall(data)
+    except OSError:
+        return
+    finally:
+        selector.close()
+
+
+class _ProxyHandler(socketserver.BaseRequestHandler):
+    server: "FakeProxyServer"
+
+    def handle(self) -> None:
+        conn: socket.socket = self.request
+        _set_nodelay(conn)
+        action = self.server.next_action()
+        if action == "drop":
+            return
+        if action == "blackhole":
+            # 接受连接后不做任何响应，直到服务关闭
+            self.server.stopped.wait()
+            return
+        try:
+            if self.server.kind == "socks5":
+                self._handle_socks5(conn)
+            else:
+                self._handle_http(conn)
+        except (OSError, ConnectionError, ValueError):
+            return
+
+    def _delay(self) -> None:
+        if self.server.behavior.latency_ms > 0:
+            time.sleep(self.server.behavior.latency_ms / 1000)
+
+    def _open_upstream(self, host: str, port: int) -> Optional[socket.socket]:
+        try:
+            upstream = socket.create_connection((host, port), timeout=5)
+        except OSError:
+            return None
+        _set_nodelay(upstream)
+        return upstream
+
+    def _handle_http(self, conn: socket.socket) -> None:
+        head = _recv_head(conn)
+        method, target = head.split(b"\r\n", 1)[0].split()[:2]
+        self._delay()
+        if method == b"CONNECT":
+            if self.server.kind != "connect":
+                conn.sendall(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n")
+                return
+            host, _, port = target.decode("ascii").rpartition(":")
+            upstream = self._open_upstream(host, int(port))
+            if upstream is None:
+                conn.sendall(b"HTTP/1.1 502 Bad Gateway\r\n\r\n")
+                return
+            with upstream:
+                conn.sendall(b"HTTP/1.1 200 Connection established\r\n\r\n")
+                _relay(conn, upstream, self.server.stopped)
+            return
+
+        parts = urlsplit(target.decode("ascii"))
+        upstream = self._open_upstream(parts.hostname or "", parts.port or 80)
+        if upstream is None:
+            conn.sendall(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\n\r\n")
+            return
+        with upstream:
+            # 上游（Judge）可直接处理绝对地址请求，原样转发即可
+            upstream.sendall(head)
+            _relay(conn, upstream, self.server.stopped)
+
+    def _handle_socks5(self, conn: socket.socket) -> None:
+        greeting = _recv_exact(conn, 2)
+        _recv_exact(conn, greeting[1])
+        conn.sendall(b"\x05\x00")
+        head = _recv_exact(conn, 4)
+        atyp = head[3]
+        if atyp == 0x01:
+            host = socket.inet_ntoa(_recv_exact(conn, 4))
+        elif atyp == 0x03:
+            host = _recv_exact(conn, _recv_exact(conn, 1)[0]).decode("idna")
+        elif atyp == 0x04:
+            host = socket.inet_ntop(socket.AF_INET6, _recv_exact(conn, 16))
+        else:
+            raise ValueError("unknown address type")
+        port = struct.unpack(">H", _recv_exact(conn, 2))[0]
+        self._delay()
+        upstream = self._open_upstream(host, port)
+        if upstream is None:
+            conn.sendall(b"\x05\x05\x00\x01" + b"\x00" * 6)
+            return
+        with upstream:
+            conn.sendall(b"\x05\x00\x00\x01" + b"\x7f\x00\x00\x01" + struct.pack(">H", port))
+            _relay(conn, upstream, self.server.stopped)
+
+
+class FakeProxyServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 256
+
+    def __init__(
+        self,
+        kind: str = "http",
+        behavior: Optional[FakeProxyBehavior] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: Optional[int] = None,
+    ):
+        if kind not in PROXY_KINDS:
+            raise ValueError(f"unsupported fake proxy kind: {kind}")
+        self.kind = kind
+        self.behavior = behavior or FakeProxyBehavior()
+        self.stopped = threading.Event()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        super().__init__((host, port), _ProxyHandler)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server_address[0], self.server_address[1]
+
+    def handle_error(self, request, client_address) -> None:
+        return
+
+    def next_action(self) -> str:
+        with self._random_lock:
+            roll = self._random.random()
+        if roll < self.behavior.drop_rate:
+            return "drop"
+        if roll < self.behavior.drop_rate + self.behavior.blackhole_rate:
+            return "blackhole"
+        return "serve"
+
+    def start(self) -> "FakeProxyServer":
+        self._thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeProxyServer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+
+class _SourceHandler(BaseHTTPRequestHandler):
+    server: "FakeSourceServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:  # noqa: N802
+        body = self.server.payloads.get(urlsplit(self.path).path)
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        encoded = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        return
+
+
+class FakeSourceServer(ThreadingHTTPServer):
+    # 按路径返回预置的代理列表文本，模拟大规模代理源
+    daemon_threads = True
+
+    def __init__(self, payloads: Dict[str, str], host: str = "127.0.0.1", port: int = 0):
+        self.payloads = dict(payloads)
+        super().__init__((host, port), _SourceHandler)
+
+    def handle_error(self, request, client_address) -> None:
+        return
+
+    def url(self, path: str) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}{path}"
+
+    def start(self) -> "FakeSourceServer":
+        threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "FakeSourceServer":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+
+def closed_ports(count: int) -> List[int]:
+    # 绑定后立即释放，得到一批大概率无人监听的端口，模拟死代理
+    sockets = []
+    try:
+        for _ in range(count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            sockets.append(sock)
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+class FakeProxyFarm:
+    """
+    一组假服务：Judge（作为验证目标）、每种类型若干假代理、指向死端口的条目，
+    以及按协议分组返回代理列表（ip:port 文本）的假代理源。
+    """
+
+    def __init__(
+        self,
+        proxies_per_kind: int = 20,
+        kinds: Sequence[str] = PROXY_KINDS,
+        dead: int = 100,
+        behavior: Optional[FakeProxyBehavior] = None,
+        seed: Optional[int] = None,
+    ):
+        self.proxies_per_kind = max(0, int(proxies_per_kind))
+        self.kinds = [kind for kind in kinds if kind in PROXY_KINDS]
+        self.dead = max(0, int(dead))
+        self.behavior = behavior or FakeProxyBehavior()
+        self.seed = seed
+        self.judge_url = ""
+        self.records: List[Dict[str, object]] = []
+        self.source_urls: Dict[str, str] = {}
+        self._stack = ExitStack()
+
+    def __enter__(self) -> "FakeProxyFarm":
+        judge = create_judge_server()
+        threading.Thread(target=judge.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True).start()
+        self._stack.callback(judge.server_close)
+        self._stack.callback(judge.shutdown)
+        self.judge_url = f"http://127.0.0.1:{judge.server_address[1]}/"
+
+        lines: Dict[str, List[str]] = {}
+        for index, kind in enumerate(self.kinds):
+            protocol = KIND_PROTOCOL[kind]
+            for offset in range(self.proxies_per_kind):
+                seed = None if self.seed is None else self.seed + index * 100000 + offset
+                server = self._stack.enter_context(FakeProxyServer(kind, self.behavior, seed=seed))
+                host, port = server.address
+                lines.setdefault(protocol, []).append(f"{host}:{port}")
+                self.records.append({"ip": host, "port": port, "protocol": protocol})
+        for port in closed_ports(self.dead):
+            lines.setdefault("http", []).append(f"127.0.0.1:{port}")
+            self.records.append({"ip": "127.0.0.1", "port": port, "protocol": "http"})
+
+        source = self._stack.enter_context(
+            FakeSourceServer({f"/{protocol}.txt": "\n".join(items) for protocol, items in lines.items()})
+        )
+        self.source_urls = {protocol: source.url(f"/{protocol}.txt") for protocol in lines}
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._stack.close()
+
+    def describe(self) -> Dict[str, object]:
+        return {"judge_url": self.judge_url, "records": self.records, "source_urls": self.source_urls}
+
+
+def serve_fake_farm(
+    conn,
+    proxies_per_kind: int,
+    kinds: Sequence[str],
+    dead: int,
+    behavior: Dict[str, float],
+    seed: Optional[int],
+) -> None:
+    # 子进程入口：启动假服务后回传地址，收到任意消息即退出
+    with FakeProxyFarm(proxies_per_kind, kinds, dead, FakeProxyBehavior(**behavior), seed) as farm:
+        conn.send(farm.describe())
+        try:
+            conn.recv()
+        except EOFError:
+            pass
+
@@ -0,0 +1,57 @@
+import argparse
+import json
+from dataclasses import asdict
+from typing import List, Optional
+
+from crawler.http_validator import HTTPValidator
+from crawler.protocol_probe import DEFAULT_PROBE_PROTOCOLS, detect_protocols, probe_target
+from crawler.runtime import load_settings
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("target", help="Proxy address in ip:port form")
+    parser.add_argument(
+        "--protocols",
+        default=",".join(DEFAULT_PROBE_PROTOCOLS),
+        help="Comma-separated protocols to probe (default: http,socks4,socks5)",
+    )
+    parser.add_argument("--timeout", type=float, default=None, help="Handshake timeout in seconds")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Detect which proxy protocols an ip:port speaks")
+    add_arguments(parser)
+    return parser
+
+
+def run_from_args(args: argparse.Namespace, env_path: Optional[str] = None) -> int:
+    # 逐协议握手探测并输出 JSON
+    ip, _, port_raw = str(args.target).rpartition(":")
+    if not ip or not port_raw.isdigit():
+        print(json.dumps({"status": "error", "message": "target must be ip:port"}, ensure_ascii=True))
+        return 1
+
+    settings = load_settings(env_path)
+    timeout = args.timeout if args.timeout is not None else settings.http_timeout
+    protocols = [part.strip().lower() for part in args.protocols.split(",") if part.strip()]
+
+    report = detect_protocols(ip, int(port_raw), timeout, probe_target(HTTPValidator.TEST_URL), protocols)
+    result = {
+        "status": "ok",
+        "ip": report.ip,
+        "port": report.port,
+        "supported": report.supported,
+        "results": {protocol: asdict(item) for protocol, item in report.results.items()},
+    }
+    print(json.dumps(result, ensure_ascii=True))
+    return 0
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    return run_from_args(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())
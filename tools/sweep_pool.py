@@ -0,0 +1,66 @@
+import argparse
+import json
+from typing import List, Optional
+
+from crawler.runtime import load_settings
+from crawler.storage import get_redis_client, sweep_stale_proxies
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--ttl",
+        type=int,
+        default=None,
+        help="Evict members not re-verified within N seconds (default: from .env REDIS_POOL_TTL)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Members evicted per step (default: from .env REDIS_SWEEP_BATCH_SIZE)",
+    )
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after N steps (default: until done)")
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Evict stale members from the Redis alive pool")
+    add_arguments(parser)
+    return parser
+
+
+def run_from_args(args: argparse.Namespace, env_path: Optional[str] = None) -> int:
+    # 分步清理超时未复检的存活池成员并输出 JSON 统计
+    settings = load_settings(env_path)
+    ttl = args.ttl if args.ttl is not None else settings.redis_pool_ttl
+    if ttl <= 0:
+        result = {"status": "error", "message": "REDIS_POOL_TTL<=0，未记录验证时间，已禁用 sweep"}
+        print(json.dumps(result, ensure_ascii=False))
+        return 1
+
+    batch_size = args.batch_size if args.batch_size is not None else settings.redis_sweep_batch_size
+    try:
+        removed = sweep_stale_proxies(
+            get_redis_client(settings),
+            ttl,
+            batch_size=batch_size,
+            max_batches=args.max_batches,
+            indexed=settings.redis_index_enabled,
+        )
+    except Exception as exc:
+        result = {"status": "error", "message": f"{type(exc).__name__}: {exc}"}
+        print(json.dumps(result, ensure_ascii=False))
+        return 1
+
+    result = {"status": "ok", "removed": removed, "ttl": ttl, "batch_size": batch_size}
+    print(json.dumps(result, ensure_ascii=False))
+    return 0
+
+
+def run(argv: Optional[List[str]] = None) -> int:
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    return run_from_args(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(run())